@@ -1,16 +1,39 @@
-from .camera_processing import CameraProcessor
-from .display_manager import DisplayManager
-from .frame_utils import crop_frame, prepare_text_frame
-from .tag_processing import draw_tag, calculate_tag_area, process_frame
-from .snapshot_client import SnapshotClient  
+import importlib
 
-__all__ = [
-    'CameraProcessor',
-    'DisplayManager',
-    'crop_frame',
-    'prepare_text_frame',
-    'draw_tag',
-    'calculate_tag_area',
-    'process_frame',
-    'SnapshotClient'
-]
\ No newline at end of file
+# Модули загружаются при первом обращении к имени: тяжелые зависимости
+# (cv2, pupil_apriltags, pymodbus) не замедляют импорт пакета
+_EXPORTS = {
+    'CameraProcessor': '.camera_processing',
+    'DisplayManager': '.display_manager',
+    'crop_frame': '.frame_utils',
+    'prepare_text_frame': '.frame_utils',
+    'decode_jpeg': '.frame_utils',
+    'make_tile': '.frame_utils',
+    'draw_tag': '.tag_processing',
+    'calculate_tag_area': '.tag_processing',
+    'process_frame': '.tag_processing',
+    'SnapshotClient': '.snapshot_client',
+    'SnapshotScheduler': '.snapshot_scheduler',
+    'DetectionScheduler': '.detection_scheduler',
+    'create_detector': '.detector_factory',
+    'TagDetection': '.detector_backends',
+    'FrameRecorder': '.frame_recorder',
+    'read_recording': '.frame_recorder',
+    'ReplayClient': '.replay_client',
+    'PreviewServer': '.preview_server',
+    'FrameMailbox': '.frame_mailbox',
+    'CircuitBreaker': '.circuit_breaker',
+    'ActivityMonitor': '.activity_monitor',
+    'DetectionStateStore': '.detection_state',
+    'ResultBus': '.result_bus'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,66 @@
+# activity_monitor.py
+import time
+import cv2
+import numpy as np
+
+# Размер уменьшенного кадра для оценки движения (ширина, высота)
+MOTION_SIZE = (64, 48)
+
+
+class ActivityMonitor:
+    """Отслеживание активности на посту камеры для редкого опроса в простое.
+
+    Активность - переданные теги в кадре или движение: среднее абсолютное
+    различие яркости уменьшенного ROI с предыдущим снимком больше
+    motion_threshold (в градациях 0-255). Без активности в течение idle_after
+    секунд камера переходит в простой (idle); первый же снимок с тегами или
+    движением возвращает ее в рабочий режим.
+    """
+
+    def __init__(self, idle_after, motion_threshold=3.0):
+        self.idle_after = idle_after
+        self.motion_threshold = motion_threshold
+        self.idle = False
+        self.last_activity = None  # time.monotonic() последнего снимка с активностью (или первого снимка)
+        self.previous = None      # Уменьшенный ROI предыдущего снимка (float32)
+        self.motion = 0.0         # Оценка движения последнего снимка
+
+    def measure(self, roi_frame):
+        """
+        Оценка движения: среднее различие уменьшенного ROI с предыдущим снимком.
+
+        Вызывается до отрисовки тегов на кадре (контуры тегов давали бы ложное движение).
+
+        Returns:
+            float или None: Оценка движения; None для первого снимка.
+        """
+        # Прореживание перед INTER_AREA: уменьшение полного кадра занимает меньше миллисекунды
+        step = max(1, min(roi_frame.shape[0] // (MOTION_SIZE[1] * 4), roi_frame.shape[1] // (MOTION_SIZE[0] * 4)))
+        small = cv2.resize(roi_frame[::step, ::step], MOTION_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = small.astype(np.float32)
+        previous, self.previous = self.previous, small
+        self.motion = 0.0 if previous is None else float(np.mean(np.abs(small - previous)))
+        return None if previous is None else self.motion
+
+    def update(self, motion, has_tags, now=None):
+        """
+        Учет обработанного снимка.
+
+        Args:
+            motion (float): Оценка движения из measure() (None - движение не оценивалось).
+            has_tags (bool): Есть ли в снимке переданные теги.
+            now (float): time.monotonic() снимка.
+
+        Returns:
+            bool или None: Новое состояние простоя, если оно изменилось, иначе None.
+        """
+        now = time.monotonic() if now is None else now
+        if self.last_activity is None or has_tags or (motion is not None and motion > self.motion_threshold):
+            self.last_activity = now
+        idle = now - self.last_activity >= self.idle_after
+        if idle == self.idle:
+            return None
+        self.idle = idle
+        return idle
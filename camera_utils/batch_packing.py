@@ -0,0 +1,65 @@
+# batch_packing.py
+import math
+
+import numpy as np
+
+# Зазор между фрагментами на общем холсте (однотонный, теги через него не находятся)
+PADDING = 8
+FILL_VALUE = 128
+
+
+def pack_rois(crops, padding=PADDING):
+    """
+    Раскладывает фрагменты ROI в оттенках серого на один холст (полками по высоте).
+
+    Args:
+        crops (list[np.ndarray]): Фрагменты ROI разных камер.
+        padding (int): Зазор между фрагментами и от края холста.
+
+    Returns:
+        tuple: Холст и список положений фрагментов (x, y, w, h) в порядке crops.
+    """
+    max_width = max(crop.shape[1] for crop in crops)
+    total_area = sum((crop.shape[0] + padding) * (crop.shape[1] + padding) for crop in crops)
+    canvas_width = max(max_width + 2 * padding, int(math.sqrt(total_area)))
+
+    placements = [None] * len(crops)
+    x, y, shelf_height = padding, padding, 0
+    for i in sorted(range(len(crops)), key=lambda i: crops[i].shape[0], reverse=True):
+        h, w = crops[i].shape[:2]
+        if x + w + padding > canvas_width:
+            x, y = padding, y + shelf_height + padding
+            shelf_height = 0
+        placements[i] = (x, y, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h)
+
+    canvas_height = y + shelf_height + padding
+    canvas = np.full((canvas_height, canvas_width), FILL_VALUE, dtype=np.uint8)
+    for crop, (x, y, w, h) in zip(crops, placements):
+        canvas[y:y + h, x:x + w] = crop
+    return canvas, placements
+
+
+def route_detections(tags, placements):
+    """
+    Распределяет теги, найденные на холсте, по фрагментам.
+
+    Тег относится к фрагменту, внутри которого лежат все его углы; координаты
+    переводятся в систему фрагмента. Теги, пересекающие зазор, отбрасываются.
+
+    Returns:
+        list[list]: Теги каждого фрагмента в порядке placements.
+    """
+    routed = [[] for _ in placements]
+    for tag in tags:
+        x_min, y_min = tag.corners.min(axis=0)
+        x_max, y_max = tag.corners.max(axis=0)
+        for i, (x, y, w, h) in enumerate(placements):
+            if x <= x_min and x_max <= x + w and y <= y_min and y_max <= y + h:
+                offset = np.array([x, y], dtype=np.float64)
+                tag.corners = tag.corners - offset
+                tag.center = tag.center - offset
+                routed[i].append(tag)
+                break
+    return routed
@@ -1,59 +1,246 @@
 import time
 import threading
-import queue
 import cv2
-from pupil_apriltags import Detector
-from dataclasses import dataclass
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-from .tag_processing import process_frame
-from .frame_utils import prepare_text_frame
+from .tag_processing import process_frame, annotate_tags
+from .frame_utils import prepare_text_frame, make_tile, decode_jpeg
 from .snapshot_client import SnapshotClient  # Новый импорт
+from .snapshot_scheduler import SnapshotScheduler
+from .detection_scheduler import DetectionScheduler
+from .batch_packing import pack_rois, route_detections
+from .detection_state import DetectionStateStore, DetectedTag
+from .result_bus import ResultBus
+from .result_sinks import create_sink
+from .replay_client import ReplayClient
+from .frame_mailbox import FrameMailbox
+from .activity_monitor import ActivityMonitor
+from .detector_factory import create_detector, profile_key
 from network.modbus_handler import ModbusHandler
-from roi.read_roi import load_roi_for_ip
+from roi.read_roi import RoiCache
 from logger_setup import logger
-
-@dataclass
-class DetectedTag:
-    tag_id: int
-    camera_index: int
+from diagnostics.tracing import tracer
 
 class CameraProcessor:
-    def __init__(self, camera_configs=None, roi_file='roi/roi.xml'):
-        self.camera_configs = camera_configs or []
-        self.roi_file = roi_file
+    def __init__(self, camera_configs=None, roi_file='roi/roi.xml', preview_config=None, tile_size=None,
+                 detection_workers=2, client_factory=None, detection_batch_size=16, result_sinks=None,
+                 tracing=None, memory_watchdog=None):
+        # Текущие конфигурации камер по индексу (меняются при перезагрузке конфигурации)
+        self.configs = {config.index: config for config in camera_configs or []}
+        self.config_lock = threading.Lock()
+        self.roi_cache = RoiCache(roi_file)
         self.modbus_handler = ModbusHandler()
-        self.output_queue = queue.Queue(maxsize=2)  # Еще меньше буфер
         self.stop_event = threading.Event()
         self.threads = []
-        self.detector_lock = threading.Lock()
-        self.last_sent_tags = {}
+
+        # Результаты детекции по камерам: неизменяемые записи, подмена ссылки и счетчик версий
+        self.detection_state = DetectionStateStore()
+        # Последние записанные в Modbus значения по камерам: индекс -> (ID тегов, цель Modbus)
+        self.modbus_written = {}
+
+        # Шина результатов для дополнительных приемников (файл, сокет, Modbus); подключаются при запуске
+        self.result_bus = ResultBus()
+        self.result_sinks = result_sinks or []
+
+        # Трассировка выборки снимков от запроса до записи в Modbus
+        if tracing:
+            tracer.configure(tracing)
+
+        # Замеры RSS и tracemalloc при долгой работе (предупреждение об устойчивом росте);
+        # модуль загружается, только если наблюдение включено
+        self.memory_watchdog = None
+        if memory_watchdog:
+            from diagnostics.memory_watchdog import MemoryWatchdog
+            self.memory_watchdog = MemoryWatchdog(memory_watchdog)
+
+        # Готовность: время первого обработанного кадра и первой записи в Modbus по камерам
+        self.started_at = time.monotonic()
+        self.warmed_up = False
+        self.first_frame_times = {}
+        self.first_write_times = {}
         
-        # Клиенты для снимков
+        # Клиенты для снимков; общее расписание разносит запросы камер по фазе внутри периода.
+        # client_factory(config, scheduler) подменяет источник снимков (например, синтетические камеры)
+        self.scheduler = SnapshotScheduler()
         self.snapshot_clients = {}
+        self.client_factory = client_factory
+
+        # Общий пул обработки снимков с приоритетами камер (вместо потока на камеру);
+        # снимки камер с batch: true и общим детектором обрабатываются пакетами
+        self.detection_scheduler = DetectionScheduler(
+            self._process_cameras, detection_workers, max_batch=detection_batch_size
+        )
+        self.processed_seq = {}
+
+        # Последний обработанный кадр каждой камеры (перезапись, без очереди)
+        self.frame_event = threading.Event()
+        self.mailboxes = {}
+        self.camera_names = {}
+
+        # Активность на постах камер с idle_after: без тегов и движения клиент опрашивает камеру реже
+        self.activity_monitors = {}
+
+        # Счетчики обработчиков: обработанные (из них в пакетах), отброшенные устаревшие и битые снимки,
+        # средняя задержка от запроса снимка до публикации результата (сек)
+        self.frame_stats = {}
+
+        # Плитки мозаики масштабируются в потоках обработки, а не в GUI
+        self.tile_size = tile_size
+        self.tile_mailboxes = {}
+
+        # HTTP-просмотр обработанных кадров (кодирование только при зрителях)
+        self.preview = None
+        if preview_config:
+            from .preview_server import PreviewServer  # Отложенный импорт: http.server нужен только просмотру
+            self.preview = PreviewServer(
+                self.mailboxes,
+                self.camera_names,
+                port=preview_config.port,
+                host=preview_config.host,
+                width=preview_config.width,
+                quality=preview_config.quality
+            )
 
-        # Инициализация детектора
-        self.detector = Detector(
-            families='tag36h11',
-            nthreads=2,  # Меньше потоков для стабильности
-            quad_decimate=1.0,
-            quad_sigma=0.0,
-            refine_edges=1,
-            decode_sharpening=0.25,
-            debug=0
+        # Детекторы по профилям: камеры с одинаковыми параметрами делят один детектор.
+        # До запуска только регистрируются: создаются (с импортом библиотеки детекции)
+        # и прогреваются в start_processing параллельно с первыми запросами снимков
+        self.detectors = {}
+        self.detector_locks = {}
+        self.detector_profiles = {}
+        self.detector_futures = {}
+        for config in self.configs.values():
+            self._register_camera(config)
+
+    @property
+    def camera_configs(self):
+        """Список текущих конфигураций камер."""
+        return list(self.configs.values())
+
+    def _ensure_detector(self, profile):
+        """Регистрация детектора для профиля; после запуска новый детектор создается сразу."""
+        key = profile_key(profile)
+        if key not in self.detector_locks:
+            self.detector_locks[key] = threading.Lock()
+            self.detector_profiles[key] = profile
+            if self.warmed_up:
+                self._create_detector(key)
+        return key
+
+    def _create_detector(self, key):
+        """Создание детектора профиля и первый прогон (выделение внутренних буферов библиотеки)."""
+        profile = self.detector_profiles[key]
+        detector = create_detector(profile)
+        # Детектор еще не опубликован - прогрев без блокировки профиля
+        # (ее может держать обработчик, ожидающий этот детектор в _get_detector)
+        detector.detect(np.zeros((64, 64), dtype=np.uint8))
+        if key in self.detector_locks:
+            self.detectors[key] = detector
+        logger.info(f"Создан детектор для профиля '{profile.name}'")
+        return detector
+
+    def _get_detector(self, key):
+        """
+        Детектор профиля; при запуске ждет его создания в пуле start_processing.
+
+        Returns:
+            Детектор или None, если профиль удален при перезагрузке конфигурации.
+        """
+        detector = self.detectors.get(key)
+        if detector is None:
+            future = self.detector_futures.get(key)
+            detector = future.result() if future else None
+        return detector
+
+    def _release_unused_detectors(self):
+        """Удаление детекторов профилей, которые больше не использует ни одна камера (вызывается под config_lock)."""
+        used = {profile_key(config.detector) for config in self.configs.values()}
+        for key in [key for key in self.detector_locks if key not in used]:
+            lock = self.detector_locks.pop(key)
+            self.detector_profiles.pop(key, None)
+            # Дожидаемся детекции, начатой до смены профиля
+            with lock:
+                self.detector_futures.pop(key, None)
+                detector = self.detectors.pop(key, None)
+            close = getattr(detector, 'close', None)
+            if close:
+                close()
+            logger.info("Удален детектор профиля, который больше не используют камеры")
+
+    def _register_camera(self, config):
+        """Подготовка детектора и почтовых ящиков камеры."""
+        self._ensure_detector(config.detector)
+        self.camera_names[config.index] = config.name
+        self.frame_stats.setdefault(
+            config.index, {'processed_frames': 0, 'batched_frames': 0, 'stale_dropped': 0, 'decode_errors': 0,
+                           'avg_latency': 0.0}
         )
+        self.mailboxes.setdefault(config.index, FrameMailbox(self.frame_event))
+        if self.tile_size:
+            self.tile_mailboxes.setdefault(config.index, FrameMailbox(self.frame_event))
+
+    def _start_camera(self, config):
+        """Запуск клиента снимков камеры и ее регистрация в планировщике детекции."""
+        self._schedule_camera(config)
+        if self.client_factory:
+            client = self.client_factory(config, self.scheduler)
+        elif config.replay:
+            client = ReplayClient(config)
+        else:
+            client = SnapshotClient(config, self.scheduler)
+        client.frame_callback = lambda index=config.index: self.detection_scheduler.submit(index)
+        self.snapshot_clients[config.index] = client
+        client.start()
+
+    def _schedule_camera(self, config):
+        """Регистрация камеры в планировщике детекции (или обновление ее параметров)."""
+        # Пакетом обрабатываются только камеры с одинаковым детектором
+        group = profile_key(config.detector) if config.batch else None
+        self.detection_scheduler.add_camera(config.index, config.priority, 1.0 / config.interval, group)
+
+    def _detach_camera(self, index):
+        """
+        Удаление камеры из планировщика детекции и отключение ее клиента снимков.
+
+        Returns:
+            Клиент снимков (или None); останавливается вызывающим вне config_lock,
+            так как остановка ждет завершения потока клиента.
+        """
+        self.detection_scheduler.remove_camera(index)
+        client = self.snapshot_clients.pop(index, None)
+        self.processed_seq.pop(index, None)
+        self.activity_monitors.pop(index, None)
+        return client
 
     def start_processing(self):
         """Запуск потоков обработки камер и Modbus."""
-        if not self.camera_configs:
+        if not self.configs:
             raise ValueError("Не заданы конфигурации камер!")
 
-        logger.info(f"Запуск обработки {len(self.camera_configs)} камер через снимки (4 FPS)")
+        logger.info(f"Запуск обработки {len(self.configs)} камер через снимки (4 FPS)")
+        self._start_result_sinks()
+        tracer.start()
+        if self.memory_watchdog:
+            self.memory_watchdog.start()
+        self.detection_scheduler.start()
 
-        # Инициализация клиентов снимков
-        for config in self.camera_configs:
-            client = SnapshotClient(config)
-            self.snapshot_clients[config.index] = client
-            client.start()
+        # Камеры запускаются параллельно (первые снимки запрашиваются одновременно),
+        # детекторы создаются и прогреваются, пока идут первые запросы; обработчик,
+        # получивший снимок раньше, ждет создания своего детектора
+        configs = self.camera_configs
+        keys = [key for key in self.detector_locks if key not in self.detectors]
+        with ThreadPoolExecutor(max_workers=min(16, len(configs) + len(keys))) as pool:
+            for key in keys:
+                self.detector_futures[key] = pool.submit(self._create_detector, key)
+            futures = list(self.detector_futures.values())
+            futures += [pool.submit(self._start_camera, config) for config in configs]
+            for future in futures:
+                future.result()
+        self.warmed_up = True
+        logger.info(f"Камеры запущены, детекторы прогреты за {time.monotonic() - self.started_at:.2f}с")
+
+        if self.preview:
+            self.preview.start()
 
         # Запуск Modbus потока
         modbus_thread = threading.Thread(
@@ -63,143 +250,596 @@ class CameraProcessor:
         modbus_thread.start()
         self.threads.append(modbus_thread)
 
-        # Запуск потока обработки для каждой камеры
-        for config in self.camera_configs:
-            thread = threading.Thread(
-                target=self._processing_worker,
-                args=(config,),
-                daemon=True
-            )
-            thread.start()
-            self.threads.append(thread)
+    def _start_result_sinks(self):
+        """Подключение приемников результатов к шине (ошибка приемника не мешает запуску)."""
+        for config in self.result_sinks:
+            try:
+                self.result_bus.subscribe(
+                    create_sink(config, self.modbus_handler),
+                    name=config.name,
+                    queue_size=config.queue_size,
+                    policy=config.policy,
+                    changes_only=config.changes_only
+                )
+            except Exception as e:
+                logger.error(f"Не удалось подключить приемник результатов {config.name}: {e}")
+
+    def add_camera(self, config):
+        """Добавление и запуск камеры без перезапуска сервиса."""
+        with self.config_lock:
+            if config.index in self.configs:
+                raise ValueError(f"Камера с индексом {config.index} уже запущена")
+            self._register_camera(config)
+            self.configs[config.index] = config
+            if self.is_running():
+                self._start_camera(config)
+        logger.info(f"Камера {config.name} добавлена")
+
+    def remove_camera(self, index, release_detectors=True):
+        """
+        Остановка и удаление камеры без перезапуска сервиса.
+
+        Args:
+            index (int): Индекс камеры.
+            release_detectors (bool): Удалить детекторы, которые больше не нужны
+                (apply_config делает это один раз после всех изменений).
+        """
+        with self.config_lock:
+            config = self.configs.pop(index, None)
+            if config is None:
+                return
+            client = self._detach_camera(index)
+            self.mailboxes.pop(index, None)
+            self.tile_mailboxes.pop(index, None)
+            self.camera_names.pop(index, None)
+            self.frame_stats.pop(index, None)
+            self.detection_state.remove(index)
+            self.first_frame_times.pop(index, None)
+            self.first_write_times.pop(index, None)
+            # Камера, добавленная снова под тем же индексом, записывается сразу, а не при обновлении
+            self.modbus_written.pop(index, None)
+            if release_detectors:
+                self._release_unused_detectors()
+        if client:
+            client.stop()
+
+        # Сбрасываем теги камеры в Modbus, чтобы не оставлять устаревшее значение
+        if config.modbus:
+            self.modbus_handler.send_tags([], config.modbus)
+        logger.info(f"Камера {config.name} удалена")
+
+    def update_camera(self, config, release_detectors=True):
+        """
+        Применение новой конфигурации камеры.
+
+        Интервал (и параметры простоя), таймаут, параметры повторных попыток, ROI, площади тегов, профиль детектора и цель Modbus
+        меняются на лету; смена источника снимков перезапускает только эту камеру.
+
+        Args:
+            config (CameraConfig): Новая конфигурация камеры.
+            release_detectors (bool): Удалить детекторы, которые больше не нужны.
+        """
+        with self.config_lock:
+            old = self.configs.get(config.index)
+            if old is None:
+                raise ValueError(f"Камера с индексом {config.index} не найдена")
+            if old == config:
+                return
+
+            self._register_camera(config)
+            self.configs[config.index] = config
+            if release_detectors:
+                self._release_unused_detectors()
+            restart = _source_changed(old, config)
+            if restart:
+                old_client = self._detach_camera(config.index)
+
+        if restart:
+            # Старый клиент останавливается вне блокировки (до запуска нового: он снимает камеру с расписания)
+            if old_client:
+                old_client.stop()
+            with self.config_lock:
+                if self.is_running() and self.configs.get(config.index) is config:
+                    self._start_camera(config)
+            logger.info(f"Камера {config.name} перезапущена с новым источником снимков")
+            return
+
+        with self.config_lock:
+            client = self.snapshot_clients.get(config.index)
+            if client:
+                client.config = config
+                client.interval = config.interval
+                client.timeout = config.timeout
+                self._schedule_camera(config)
+                breaker = getattr(client, 'breaker', None)
+                if breaker:
+                    breaker.failure_threshold = config.failure_threshold
+                    breaker.base_delay = max(config.interval, config.timeout)
+                    breaker.max_delay = config.max_retry_delay
+
+        if old.modbus and old.modbus != config.modbus:
+            self.modbus_handler.send_tags([], old.modbus)
+        logger.info(f"Конфигурация камеры {config.name} обновлена на лету")
+
+    def apply_config(self, status_configs, camera_configs):
+        """
+        Применение перезагруженной конфигурации по разнице с текущей.
+
+        Сначала добавляются и обновляются камеры, затем удаляются лишние, и только
+        после этого удаляются детекторы, которые больше не нужны: детектор, общий
+        для удаленной и добавленной камеры, не пересоздается.
+        """
+        new_configs = {config.index: config for config in camera_configs}
+
+        for index, config in new_configs.items():
+            if index in self.configs:
+                self.update_camera(config, release_detectors=False)
+            else:
+                self.add_camera(config)
+        for index in list(self.configs.keys()):
+            if index not in new_configs:
+                self.remove_camera(index, release_detectors=False)
+        with self.config_lock:
+            self._release_unused_detectors()
+
+        self.modbus_handler.update_heartbeat(status_configs)
 
     def _modbus_sender_worker(self):
-        """Поток для периодической отправки тегов в Modbus."""
+        """
+        Поток отправки тегов в Modbus.
+
+        При изменении результатов записываются только камеры, теги которых
+        отличаются от последних записанных; раз в секунду записываются все
+        камеры (восстановление значений после сбоя связи или перезапуска ПЛК).
+        """
+        version = None
+        written = self.modbus_written
+        next_refresh = 0.0
         while not self.stop_event.is_set():
             try:
-                all_tags = []
-                for config in self.camera_configs:
-                    tags = self.last_sent_tags.get(config.index, [])
-                    for tag_id in tags:
-                        all_tags.append(DetectedTag(tag_id=tag_id, camera_index=config.index))
+                version, states = self.detection_state.snapshot()
+                now = time.monotonic()
+                refresh = now >= next_refresh
+                if refresh:
+                    next_refresh = now + 1.0
+                    # Записи камер, удаленных во время прохода, не должны пережить remove_camera
+                    for index in [index for index in written if index not in self.configs]:
+                        written.pop(index, None)
 
                 for config in self.camera_configs:
-                    if config.modbus:
-                        tags_for_camera = [
-                            tag for tag in all_tags if tag.camera_index == config.index
-                        ]
-                        self.modbus_handler.send_tags(
-                            tags_for_camera if tags_for_camera else [],
-                            config.modbus
+                    if not config.modbus:
+                        continue
+                    state = states.get(config.index)
+                    client = self.snapshot_clients.get(config.index)
+                    # Камера недоступна - не держим в Modbus устаревшие теги
+                    tag_ids = tuple(state.tags) if state and not (client and not client.is_connected()) else ()
+                    entry = (tag_ids, config.modbus)
+                    if not refresh and written.get(config.index) == entry:
+                        continue
+                    written[config.index] = entry
+
+                    future = self.modbus_handler.send_tags(
+                        [DetectedTag(tag_id=tag_id, camera_index=config.index) for tag_id in tag_ids],
+                        config.modbus,
+                        tracer.lookup(config.index, state.seq) if state else None
+                    )
+                    # Запись считается для готовности, только если камера уже дала результат
+                    if config.index in self.first_frame_times and config.index not in self.first_write_times:
+                        future.add_done_callback(
+                            lambda f, index=config.index: self._on_first_write(index, f)
                         )
 
-                time.sleep(1)  # Отправка каждую секунду
-                
+                # Изменение тегов (в том числе первый результат камеры) - сразу, иначе до следующего обновления
+                self.detection_state.wait_for_change(version, timeout=max(0.0, next_refresh - time.monotonic()))
+
             except Exception as e:
                 logger.warning(f"Ошибка в потоке отправки Modbus: {e}")
                 time.sleep(5)
 
-    def _processing_worker(self, config):
-        """Поток обработки снимков с камеры с синхронизацией."""
-        client = self.snapshot_clients[config.index]
-        last_processed_frame_id = 0
-        
-        while not self.stop_event.is_set():
-            try:
-                # Ждем новый кадр (синхронизация с получением)
-                if client.wait_for_new_frame(timeout=1.0):
-                    client.clear_new_frame_event()
-                    
-                    # Получаем свежий кадр
-                    frame = client.get_frame()
-                    
-                    if frame is None:
-                        continue
+    def _process_cameras(self, indices):
+        """
+        Обработка снимков камер, выбранных планировщиком детекции.
 
-                    # Загружаем ROI
-                    roi = load_roi_for_ip(config.camera_ip, self.roi_file) or {
-                        'x': 0, 'y': 0,
-                        'w': frame.shape[1],
-                        'h': frame.shape[0]
-                    }
+        Returns:
+            list: Индексы камер, снимки которых обработаны.
+        """
+        if len(indices) == 1:
+            return indices if self._process_camera(indices[0]) else []
+        return self._process_batch(indices)
 
-                    # Обрабатываем кадр
-                    processed_frame, detected_tags = self._process_frame(
-                        frame, roi, config.min_tag_area, config.max_tag_area, config.name
-                    )
+    def _take_frame(self, index):
+        """
+        Самый свежий необработанный снимок камеры.
+
+        Returns:
+            tuple: (конфигурация, кадр, номер снимка, время снимка, ROI) или None, если снимка нет,
+                он уже обработан, устарел или поврежден.
+        """
+        # Конфигурация читается при каждой обработке - изменения применяются на лету
+        config = self.configs.get(index)
+        client = self.snapshot_clients.get(index)
+        stats = self.frame_stats.get(index)
+        if config is None or client is None or stats is None or self.stop_event.is_set():
+            return None
+
+        # Берем только самый свежий снимок; перезаписанные не декодируются
+        snapshot = client.get_jpeg()
+        if snapshot is None:
+            return None
+        seq, capture_time, jpeg = snapshot
+        try:
+            if seq == self.processed_seq.get(index):
+                return None
+            self.processed_seq[index] = seq
+            trace = tracer.lookup(index, seq)
+            tracer.span(trace, 'queue_wait')
+
+            # Устаревший снимок отбрасываем до декодирования
+            if config.max_frame_age and time.monotonic() - capture_time > config.max_frame_age:
+                stats['stale_dropped'] += 1
+                tracer.finish(trace)
+                return None
+
+            frame = decode_jpeg(jpeg)
+            tracer.span(trace, 'decode')
+        finally:
+            # Буфер снимка возвращается клиенту для следующих снимков
+            client.release_jpeg(jpeg)
+        if frame is None:
+            stats['decode_errors'] += 1
+            tracer.finish(trace)
+            return None
+
+        # ROI из конфигурации камеры или из файла ROI (перечитывается при изменении)
+        roi = config.roi or self.roi_cache.get(config.camera_ip) or {
+            'x': 0, 'y': 0,
+            'w': frame.shape[1],
+            'h': frame.shape[0]
+        }
+        return config, frame, seq, capture_time, roi
+
+    def _publish_result(self, index, config, processed_frame, detected_tags, seq, capture_time, origin):
+        """
+        Публикация результата обработки снимка: кадр для отображения, теги и статистика.
+
+        Args:
+            detected_tags (dict): Переданные теги по ID (координаты относительно ROI).
+            origin (tuple): Левый верхний угол ROI в кадре (x, y).
+
+        Returns:
+            bool: False, если камеру удалили во время обработки.
+        """
+        # Камеру могли удалить во время обработки (в том числе между проверками ниже)
+        mailbox = self.mailboxes.get(index)
+        stats = self.frame_stats.get(index)
+        if index not in self.configs or mailbox is None or stats is None:
+            return False
+
+        # Публикуем кадр для отображения (перезаписывает предыдущий)
+        mailbox.put(processed_frame)
+        tile_mailbox = self.tile_mailboxes.get(index)
+        if self.tile_size and tile_mailbox:
+            tile_mailbox.put(make_tile(processed_frame, self.tile_size, f"Camera {index + 1}"))
 
-                    # Отправляем в очередь отображения
-                    try:
-                        self.output_queue.put_nowait((config.index, processed_frame))
-                    except queue.Full:
-                        pass  # Пропускаем кадр если очередь полна
-
-                    # Сохраняем обнаруженные теги
-                    with threading.Lock():
-                        if detected_tags:
-                            self.last_sent_tags[config.index] = list(detected_tags.keys())
-                        else:
-                            self.last_sent_tags[config.index] = []
-                            
-                else:
-                    # Таймаут ожидания нового кадра
-                    time.sleep(0.01)
+        stats['processed_frames'] += 1
+        latency = time.monotonic() - capture_time
+        stats['avg_latency'] = latency if stats['processed_frames'] == 1 else (
+            stats['avg_latency'] * 0.9 + latency * 0.1
+        )
+        self.first_frame_times.setdefault(index, time.monotonic())
+
+        trace = tracer.lookup(index, seq)
+        tracer.span(trace, 'publish', tags=len(detected_tags))
+
+        # Публикуем теги; изменение набора тегов будит поток отправки Modbus
+        offset = np.array(origin, dtype=np.float64)
+        changed = self.detection_state.publish(
+            index,
+            detected_tags.keys(),
+            (tuple(map(tuple, (tag.corners + offset).tolist())) for tag in detected_tags.values()),
+            capture_time,
+            seq
+        )
+        # Приемники шины получают событие через свои очереди, не задерживая обработку
+        self.result_bus.publish(index, config.name, self.detection_state.get(index), changed)
+
+        # Трасса продолжается до записи в Modbus, только если теги изменились (иначе запись не ждет снимок)
+        if not (changed and config.modbus):
+            tracer.finish(trace)
+        return True
+
+    def _process_camera(self, index):
+        """
+        Обработка самого свежего снимка камеры (вызывается потоком планировщика детекции).
+
+        Returns:
+            bool: True, если снимок обработан; False, если его нет, он устарел или поврежден.
+        """
+        config = None
+        try:
+            taken = self._take_frame(index)
+            if taken is None:
+                return False
+            config, frame, seq, capture_time, roi = taken
+            rect = _clip_roi(frame, roi)
+            motion = self._measure_motion(index, config, frame, rect)
 
+            # Обрабатываем кадр
+            result = self._process_frame(
+                frame, rect, config.min_tag_area, config.max_tag_area, config.name,
+                profile_key(config.detector), config.tag_ids
+            )
+            if result is None:
+                # Профиль детектора сменился после чтения конфигурации - снимок пропускается
+                tracer.finish(tracer.lookup(index, seq))
+                return False
+            processed_frame, detected_tags = result
+            tracer.span(tracer.lookup(index, seq), 'detect')
+            published = self._publish_result(
+                index, config, processed_frame, detected_tags, seq, capture_time, rect[:2] if rect else (0, 0)
+            )
+            if published:
+                self._update_activity(index, config, motion, detected_tags, capture_time)
+            return published
+
+        except Exception as e:
+            logger.warning(f"Ошибка обработки кадра {config.name if config else index + 1}: {e}")
+            return False
+
+    def _process_batch(self, indices):
+        """
+        Пакетная детекция: ROI нескольких камер с общим детектором раскладываются
+        на один холст, детектор вызывается один раз, а найденные теги возвращаются
+        камерам по положению их фрагментов на холсте.
+
+        Returns:
+            list: Индексы камер, снимки которых обработаны.
+        """
+        # Снимки группируются по детектору (профиль камеры мог смениться после постановки в пакет)
+        groups = {}
+        for index in indices:
+            try:
+                taken = self._take_frame(index)
             except Exception as e:
-                logger.warning(f"Ошибка обработки кадра {config.name}: {e}")
-                time.sleep(0.1)
+                logger.warning(f"Ошибка обработки кадра камеры {index + 1}: {e}")
+                continue
+            if taken is None:
+                continue
+            config, frame, seq, capture_time, roi = taken
+            rect = _clip_roi(frame, roi)
+            motion = self._measure_motion(index, config, frame, rect)
+            groups.setdefault(profile_key(config.detector), []).append(
+                (index, config, frame, seq, capture_time, rect, motion)
+            )
 
-    def _process_frame(self, frame, roi, min_tag_area, max_tag_area, camera_name):
-        """Обработка кадра: ROI, детекция AprilTag и отрисовка."""
-        display_frame = frame.copy()
-        x, y, w, h = roi['x'], roi['y'], roi['w'], roi['h']
+        processed = []
+        for key, items in groups.items():
+            try:
+                # Профиль детектора сменился после чтения конфигурации - снимки группы пропускаются
+                lock = self.detector_locks.get(key)
+                if lock is None:
+                    continue
+                crops = [
+                    cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+                    for frame, (x, y, w, h) in [(item[2], item[5]) for item in items if item[5]]
+                ]
+                routed = []
+                if len(crops) == 1:
+                    with lock:
+                        detector = self._get_detector(key)
+                        if detector is None:
+                            continue
+                        routed = [detector.detect(crops[0])]
+                elif crops:
+                    canvas, placements = pack_rois(crops)
+                    with lock:
+                        detector = self._get_detector(key)
+                        if detector is None:
+                            continue
+                        tags = detector.detect(canvas)
+                    routed = route_detections(tags, placements)
+                routed = iter(routed)
+
+                detect_end = time.monotonic()
+                for index, config, frame, seq, capture_time, rect, motion in items:
+                    tracer.span(tracer.lookup(index, seq), 'detect', end=detect_end, batch=len(crops))
+                    detected_tags = {}
+                    if rect:
+                        x, y, w, h = rect
+                        _, detected_tags = annotate_tags(
+                            frame[y:y + h, x:x + w], next(routed), config.min_tag_area,
+                            config.max_tag_area, config.name, config.tag_ids
+                        )
+                    processed_frame = _compose_display(frame, rect, detected_tags)
+                    origin = rect[:2] if rect else (0, 0)
+                    if self._publish_result(index, config, processed_frame, detected_tags, seq, capture_time, origin):
+                        self._update_activity(index, config, motion, detected_tags, capture_time)
+                        if len(crops) > 1:
+                            self.frame_stats[index]['batched_frames'] += 1
+                        processed.append(index)
+
+            except Exception as e:
+                names = ', '.join(item[1].name for item in items)
+                logger.warning(f"Ошибка пакетной обработки кадров {names}: {e}")
+        return processed
+
+    def _measure_motion(self, index, config, frame, rect):
+        """
+        Оценка движения в ROI камеры с idle_after (до детекции: отрисовка тегов меняет кадр).
+
+        Returns:
+            float или None: Оценка движения; None, если редкий опрос выключен или снимок первый.
+        """
+        if config.idle_after <= 0 or not rect:
+            return None
+        monitor = self.activity_monitors.get(index)
+        if monitor is None:
+            monitor = self.activity_monitors[index] = ActivityMonitor(config.idle_after, config.motion_threshold)
+        x, y, w, h = rect
+        return monitor.measure(frame[y:y + h, x:x + w])
 
-        # Проверка границ
-        h_img, w_img = frame.shape[:2]
-        x, y = max(0, x), max(0, y)
-        w, h = min(w, w_img - x), min(h, h_img - y)
+    def _update_activity(self, index, config, motion, detected_tags, capture_time):
+        """Учет активности на посту камеры и переключение клиента в простой и обратно."""
+        client = self.snapshot_clients.get(index)
+        set_idle = getattr(client, 'set_idle', None)
+        if set_idle is None:
+            return
+        if config.idle_after <= 0:
+            # Редкий опрос выключен (в том числе на лету)
+            if self.activity_monitors.pop(index, None):
+                set_idle(False)
+            return
 
-        if w <= 0 or h <= 0:
-            return display_frame, {}
+        monitor = self.activity_monitors.get(index)
+        if monitor is None:
+            monitor = self.activity_monitors[index] = ActivityMonitor(config.idle_after, config.motion_threshold)
+        monitor.idle_after = config.idle_after
+        monitor.motion_threshold = config.motion_threshold
 
+        idle = monitor.update(motion, bool(detected_tags), capture_time)
+        if idle is not None:
+            set_idle(idle)
+
+    def _process_frame(self, frame, rect, min_tag_area, max_tag_area, camera_name, detector_key, tag_ids):
+        """
+        Обработка кадра: ROI (x, y, w, h или None), детекция AprilTag и отрисовка.
+
+        Returns:
+            tuple: (кадр для отображения, теги по ID) или None, если детектор профиля
+                удален при перезагрузке конфигурации.
+        """
+        if rect is None:
+            return frame.copy(), {}
+
+        x, y, w, h = rect
         roi_frame = frame[y:y + h, x:x + w]
 
         # Детекция тегов
-        with self.detector_lock:
+        lock = self.detector_locks.get(detector_key)
+        if lock is None:
+            return None
+        with lock:
+            detector = self._get_detector(detector_key)
+            if detector is None:
+                return None
             processed_roi, tags = process_frame(
-                roi_frame, self.detector, min_tag_area, max_tag_area, camera_name
+                roi_frame, detector, min_tag_area, max_tag_area, camera_name, tag_ids
             )
 
-        display_frame[y:y + h, x:x + w] = processed_roi
-        cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-
-        # Добавление информации о тегах
-        if tags:
-            text_lines = [f"ID: {tag_id}" for tag_id in tags.keys()]
-            display_frame = prepare_text_frame(display_frame, text_lines)
-
-        return display_frame, tags
+        return _compose_display(frame, rect, tags), tags
 
     def stop_processing(self):
         """Остановка всех потоков."""
         self.stop_event.set()
         
-        # Останавливаем клиенты снимков
-        for client in self.snapshot_clients.values():
+        # Останавливаем клиенты снимков и пул обработки
+        for client in list(self.snapshot_clients.values()):
             client.stop()
+        self.detection_scheduler.stop()
+        self.result_bus.close()
+        tracer.stop()
+        if self.memory_watchdog:
+            self.memory_watchdog.stop()
         
         # Ожидаем завершения потоков
         for t in self.threads:
             if t.is_alive():
                 t.join(timeout=1.0)
                 
+        if self.preview:
+            self.preview.stop()
         self.modbus_handler.stop()
         logger.info("Все потоки обработки остановлены")
 
     def is_running(self):
         return not self.stop_event.is_set()
+
+    def _on_first_write(self, index, future):
+        """Фиксация первой успешной записи результата камеры в Modbus."""
+        if not future.cancelled() and future.exception() is None and future.result():
+            self.first_write_times.setdefault(index, time.monotonic())
+
+    def get_readiness(self):
+        """
+        Состояние готовности сервиса.
+
+        Returns:
+            dict: state ('warming_up', 'starting', 'ready'), elapsed - секунды с создания
+                процессора, ready_after - время достижения готовности (или None),
+                waiting - имена камер без первого результата или первой записи в Modbus.
+        """
+        waiting = []
+        ready_times = []
+        for config in self.camera_configs:
+            frame_time = self.first_frame_times.get(config.index)
+            write_time = self.first_write_times.get(config.index) if config.modbus else frame_time
+            if frame_time is None or write_time is None:
+                waiting.append(config.name)
+            else:
+                ready_times.append(max(frame_time, write_time))
+
+        if not self.warmed_up:
+            state = 'warming_up'
+        elif waiting:
+            state = 'starting'
+        else:
+            state = 'ready'
+
+        return {
+            'state': state,
+            'elapsed': time.monotonic() - self.started_at,
+            'ready_after': max(ready_times) - self.started_at if state == 'ready' and ready_times else None,
+            'waiting': waiting
+        }
     
     def get_client_stats(self, camera_index):
         """Получение статистики клиента."""
         client = self.snapshot_clients.get(camera_index)
-        return client.get_stats() if client else None
\ No newline at end of file
+        if not client:
+            return None
+        stats = client.get_stats()
+        stats.update(self.frame_stats.get(camera_index, {}))
+        stats.update(self.detection_scheduler.get_stats(camera_index) or {})
+        return stats
+
+    def get_memory_stats(self):
+        """Статистика наблюдения за памятью (None, если наблюдение выключено)."""
+        return self.memory_watchdog.get_stats() if self.memory_watchdog else None
+
+
+def _clip_roi(frame, roi):
+    """ROI, ограниченный границами кадра: (x, y, w, h) или None, если он пуст."""
+    h_img, w_img = frame.shape[:2]
+    x, y = max(0, roi['x']), max(0, roi['y'])
+    w, h = min(roi['w'], w_img - x), min(roi['h'], h_img - y)
+    if w <= 0 or h <= 0:
+        return None
+    return x, y, w, h
+
+
+def _compose_display(frame, rect, tags):
+    """Кадр для отображения: рамка ROI и список найденных тегов."""
+    display_frame = frame.copy()
+    if rect is None:
+        return display_frame
+
+    x, y, w, h = rect
+    cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+
+    # Добавление информации о тегах
+    if tags:
+        text_lines = [f"ID: {tag_id}" for tag_id in tags.keys()]
+        display_frame = prepare_text_frame(display_frame, text_lines)
+    return display_frame
+
+
+def _source_changed(old, new):
+    """Изменились ли параметры, требующие пересоздания клиента снимков."""
+    return (
+        old.snapshot_url != new.snapshot_url or
+        old.username != new.username or
+        old.password != new.password or
+        old.auth != new.auth or
+        old.recording != new.recording or
+        old.replay != new.replay
+    )
\ No newline at end of file
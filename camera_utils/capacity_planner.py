@@ -0,0 +1,287 @@
+# capacity_planner.py
+import os
+import sys
+import json
+import time
+import platform
+import logging
+import threading
+import contextlib
+from datetime import datetime
+
+import cv2
+
+from config_loader import ConfigLoader, CameraConfig, resolve_tiling
+from .camera_processing import CameraProcessor
+from logger_setup import logger
+
+# Пороги устойчивой работы: доля сброшенных снимков и средняя задержка в долях интервала
+MAX_DROP_RATE = 0.05
+MAX_LATENCY_RATIO = 1.0
+
+DEFAULT_RESOLUTIONS = ((1280, 720), (1920, 1080))
+
+# Площадь тега для расчета плиток режима tiled (max_tag_area камеры по умолчанию);
+# фильтр площади у синтетических камер не ограничен
+TILING_TAG_AREA = 10000.0
+
+
+class SyntheticClient:
+    """
+    Синтетическая камера: выдает один и тот же JPEG с заданным интервалом.
+
+    Повторяет интерфейс SnapshotClient и использует общее расписание
+    запросов, поэтому нагрузка распределяется так же, как с реальными камерами.
+    """
+
+    def __init__(self, config, scheduler, jpeg):
+        self.config = config
+        self.scheduler = scheduler
+        self.jpeg = jpeg
+        self.interval = config.interval
+
+        self.lock = threading.Lock()
+        self.frame_count = 0
+        self.last_capture_time = 0
+        self.running = False
+        self.thread = None
+        self.new_frame_event = threading.Event()
+        self.frame_callback = None
+
+    def start(self):
+        """Запуск выдачи снимков."""
+        self.running = True
+        self.scheduler.register(self.config.index)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка выдачи снимков."""
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.scheduler.unregister(self.config.index)
+
+    def _loop(self):
+        while self.running:
+            next_time = self.scheduler.next_slot(self.config.index, self.interval)
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            with self.lock:
+                self.frame_count += 1
+                self.last_capture_time = time.monotonic()
+            self.new_frame_event.set()
+            if self.frame_callback:
+                self.frame_callback()
+
+    def get_jpeg(self):
+        """Последний снимок: (номер, time.monotonic() выдачи, байты JPEG) или None."""
+        with self.lock:
+            if not self.frame_count:
+                return None
+            return self.frame_count, self.last_capture_time, self.jpeg
+
+    def release_jpeg(self, data):
+        """Снимки не хранятся в переиспользуемых буферах - освобождать нечего."""
+
+    def wait_for_new_frame(self, timeout=None):
+        return self.new_frame_event.wait(timeout)
+
+    def clear_new_frame_event(self):
+        self.new_frame_event.clear()
+
+    def is_connected(self):
+        return self.running
+
+    def get_stats(self):
+        """Число выданных снимков."""
+        with self.lock:
+            return {'offered_frames': self.frame_count}
+
+
+def make_sample_jpeg(sample_path, resolution):
+    """JPEG тестового изображения, приведенного к разрешению (ширина, высота)."""
+    image = cv2.imread(sample_path)
+    if image is None:
+        raise ValueError(f"Не удалось прочитать изображение {sample_path}")
+    image = cv2.resize(image, resolution, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise ValueError("Не удалось закодировать тестовое изображение")
+    return buffer.tobytes()
+
+
+def make_camera_configs(count, profile, fps, resolution):
+    """Конфигурации синтетических камер (без Modbus, ROI - весь кадр, любые ID тегов)."""
+    profile = resolve_tiling(profile, TILING_TAG_AREA)
+    return [
+        CameraConfig(
+            name=f"synthetic_{i}",
+            camera_ip=f"synthetic-{i}",
+            snapshot_url="",
+            username="",
+            password="",
+            index=i,
+            modbus=None,
+            interval=1.0 / fps,
+            min_tag_area=0.0,
+            max_tag_area=float('inf'),
+            detector=profile,
+            roi={'x': 0, 'y': 0, 'w': resolution[0], 'h': resolution[1]},
+            tag_ids=None,
+            max_frame_age=0.0
+        )
+        for i in range(count)
+    ]
+
+
+def measure_load(count, profile, jpeg, resolution, fps, workers, warmup=2.0, duration=5.0):
+    """
+    Прогон конвейера CameraProcessor с count синтетическими камерами.
+
+    Returns:
+        dict: cameras, achieved_fps (на камеру), drop_rate, avg_latency_ms, passed.
+    """
+    configs = make_camera_configs(count, profile, fps, resolution)
+    processor = CameraProcessor(
+        configs,
+        detection_workers=workers,
+        client_factory=lambda config, scheduler: SyntheticClient(config, scheduler, jpeg)
+    )
+    processor.start_processing()
+    try:
+        time.sleep(warmup)
+        before = {i: processor.get_client_stats(i) for i in range(count)}
+        time.sleep(duration)
+        after = {i: processor.get_client_stats(i) for i in range(count)}
+    finally:
+        processor.stop_processing()
+
+    offered = sum(after[i]['offered_frames'] - before[i]['offered_frames'] for i in range(count))
+    processed = sum(after[i]['processed_frames'] - before[i]['processed_frames'] for i in range(count))
+    drop_rate = 1.0 - processed / offered if offered else 1.0
+    avg_latency = sum(after[i]['avg_latency'] for i in range(count)) / count
+    passed = drop_rate <= MAX_DROP_RATE and avg_latency <= MAX_LATENCY_RATIO / fps
+    return {
+        'cameras': count,
+        'achieved_fps': round(processed / duration / count, 2),
+        'drop_rate': round(max(drop_rate, 0.0), 4),
+        'avg_latency_ms': round(avg_latency * 1000, 1),
+        'passed': passed
+    }
+
+
+def find_capacity(profile, jpeg, resolution, fps, workers, max_cameras=64, **measure_args):
+    """
+    Поиск наибольшего числа камер, обрабатываемых без превышения порогов.
+
+    Число камер удваивается до первого провала, затем граница уточняется делением пополам.
+
+    Returns:
+        tuple: (наибольшее устойчивое число камер, список результатов прогонов).
+    """
+    steps = []
+
+    def run(count):
+        result = measure_load(count, profile, jpeg, resolution, fps, workers, **measure_args)
+        steps.append(result)
+        print(
+            f"{profile.name} {resolution[0]}x{resolution[1]}, {count} камер: "
+            f"{result['achieved_fps']} FPS на камеру, сброшено {result['drop_rate']:.1%}, "
+            f"задержка {result['avg_latency_ms']} мс", file=sys.stderr
+        )
+        return result['passed']
+
+    good, bad = 0, None
+    count = 1
+    while count <= max_cameras:
+        if not run(count):
+            bad = count
+            break
+        good = count
+        count *= 2
+
+    if bad is None:
+        bad = min(count, max_cameras + 1)
+    while bad - good > 1:
+        middle = (good + bad) // 2
+        if run(middle):
+            good = middle
+        else:
+            bad = middle
+
+    steps.sort(key=lambda step: step['cameras'])
+    return good, steps
+
+
+def run_capacity_plan(config_path, sample_path='test/tag_1.jpg', resolutions=DEFAULT_RESOLUTIONS,
+                      profile_names=None, fps=4.0, report_path=None, max_cameras=64):
+    """
+    Команда оценки емкости: устойчивое число камер на ядро по профилям детектора и разрешениям.
+
+    Отчет JSON печатается в stdout и, при указании report_path, сохраняется в файл.
+    Журнал и прочий вывод на время прогонов перенаправляются в stderr, чтобы stdout
+    содержал только отчет.
+    """
+    loader = ConfigLoader(config_path)
+    profiles = loader.load_detector_profiles()
+    workers = loader.load_service_config().detection_workers
+    if profile_names:
+        missing = [name for name in profile_names if name not in profiles]
+        if missing:
+            raise ValueError(f"Неизвестные профили детектора: {', '.join(missing)}")
+        profiles = {name: profiles[name] for name in profile_names}
+
+    cpu_count = os.cpu_count() or 1
+    # Детекция идет в workers потоках: прогон занимает не больше min(workers, cpu_count) ядер
+    cores = min(workers, cpu_count)
+    results = []
+    # Журнал детекций по каждому кадру на время прогонов отключается,
+    # консольный журнал (и print) переводится в stderr
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    console_handlers = [
+        handler for handler in logger.handlers
+        if type(handler) is logging.StreamHandler and handler.stream is sys.stdout
+    ]
+    for handler in console_handlers:
+        handler.setStream(sys.stderr)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            for resolution in resolutions:
+                jpeg = make_sample_jpeg(sample_path, resolution)
+                for name, profile in profiles.items():
+                    max_count, steps = find_capacity(profile, jpeg, resolution, fps, workers, max_cameras)
+                    results.append({
+                        'profile': name,
+                        'resolution': f"{resolution[0]}x{resolution[1]}",
+                        'max_cameras': max_count,
+                        'cameras_per_core': round(max_count / cores, 2),
+                        'steps': steps
+                    })
+    finally:
+        logger.setLevel(level)
+        for handler in console_handlers:
+            handler.setStream(sys.stdout)
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'host': {
+            'cpu_count': cpu_count,
+            'cores_used': cores,
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__
+        },
+        'sample': sample_path,
+        'target_fps': fps,
+        'detection_workers': workers,
+        'thresholds': {'max_drop_rate': MAX_DROP_RATE, 'max_latency_ms': round(MAX_LATENCY_RATIO / fps * 1000, 1)},
+        'results': results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    sys.stdout.write(text + "\n")
+    return report
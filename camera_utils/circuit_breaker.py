@@ -0,0 +1,84 @@
+# circuit_breaker.py
+import time
+import random
+import threading
+
+
+class CircuitBreaker:
+    """Автомат защиты для недоступной камеры.
+
+    closed - запросы идут по расписанию; после failure_threshold ошибок подряд
+    автомат размыкается (open) и запросы не выполняются до истечения паузы.
+    Пауза растет экспоненциально (base_delay * 2^n, не более max_delay) со
+    случайным разбросом, чтобы камеры не опрашивались синхронно. По истечении
+    паузы выполняется один пробный запрос (half_open): успех замыкает автомат,
+    ошибка снова размыкает его с удвоенной паузой.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, base_delay=1.0, max_delay=60.0, jitter=0.2):
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0       # Размыканий подряд (определяет длину паузы)
+        self.retry_at = 0.0       # time.monotonic() следующей попытки
+        self.total_opens = 0
+
+    def allow_request(self):
+        """Можно ли выполнить запрос сейчас (переводит open -> half_open по таймеру)."""
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() < self.retry_at:
+                    return False
+                self.state = self.HALF_OPEN
+            return True
+
+    def retry_delay(self):
+        """Секунды до следующей разрешенной попытки."""
+        with self.lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(self):
+        """Успешный запрос. Возвращает True, если автомат был разомкнут."""
+        with self.lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.open_count = 0
+            return recovered
+
+    def record_failure(self):
+        """Неудачный запрос. Возвращает паузу до повтора, если автомат разомкнулся, иначе None."""
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state == self.OPEN:
+                    return None
+                self.open_count += 1
+                self.total_opens += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (self.open_count - 1))
+                delay *= 1 + random.uniform(-self.jitter, self.jitter)
+                self.state = self.OPEN
+                self.retry_at = time.monotonic() + delay
+                return delay
+            return None
+
+    def get_stats(self):
+        """Состояние автомата для статистики клиента."""
+        with self.lock:
+            return {
+                'circuit_state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'circuit_opens': self.total_opens,
+                'retry_in': max(0.0, self.retry_at - time.monotonic()) if self.state == self.OPEN else 0.0
+            }
@@ -0,0 +1,143 @@
+# detection_modes.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _merge_boxes(boxes):
+    """Объединяет пересекающиеся прямоугольники (x0, y0, x1, y1)."""
+    merged = []
+    for box in sorted(boxes):
+        for i, other in enumerate(merged):
+            if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                merged[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                             max(box[2], other[2]), max(box[3], other[3]))
+                break
+        else:
+            merged.append(box)
+    # Объединение могло создать новые пересечения
+    return merged if len(merged) == len(boxes) else _merge_boxes(merged)
+
+
+def _shift(tag, dx, dy):
+    """Перенос координат тега из фрагмента в систему координат исходного кадра."""
+    offset = np.array([dx, dy], dtype=np.float64)
+    tag.corners = tag.corners + offset
+    tag.center = tag.center + offset
+    return tag
+
+
+class TwoStageDetector:
+    """
+    Двухэтапная детекция: грубый поиск на прореженном изображении и
+    точное декодирование в полном разрешении только вокруг кандидатов.
+
+    Грубый детектор (тот же профиль с quad_decimate = coarse_decimate)
+    находит четырехугольники тегов; точный детектор (исходный профиль)
+    запускается на фрагментах вокруг них с отступом, после чего координаты
+    переносятся в систему исходного кадра. Повторяет интерфейс detect(gray).
+    """
+
+    def __init__(self, coarse, fine, padding=0.5):
+        """
+        Args:
+            coarse: Детектор грубого этапа.
+            fine: Детектор точного этапа.
+            padding (float): Отступ вокруг кандидата в долях его размера.
+        """
+        self.coarse = coarse
+        self.fine = fine
+        self.padding = padding
+
+    def detect(self, gray):
+        candidates = self.coarse.detect(gray)
+        if not candidates:
+            return []
+
+        h, w = gray.shape[:2]
+        boxes = []
+        for tag in candidates:
+            x0, y0 = tag.corners.min(axis=0)
+            x1, y1 = tag.corners.max(axis=0)
+            pad = max(16.0, self.padding * max(x1 - x0, y1 - y0))
+            boxes.append((
+                max(0, int(x0 - pad)), max(0, int(y0 - pad)),
+                min(w, int(x1 + pad) + 1), min(h, int(y1 + pad) + 1)
+            ))
+
+        detections = []
+        for x0, y0, x1, y1 in _merge_boxes(boxes):
+            crop = np.ascontiguousarray(gray[y0:y1, x0:x1])
+            detections.extend(_shift(tag, x0, y0) for tag in self.fine.detect(crop))
+        return detections
+
+
+class TiledDetector:
+    """
+    Параллельная детекция на перекрывающихся плитках ROI.
+
+    Плитка tile_size x tile_size, соседние плитки перекрываются на overlap
+    пикселей (не меньше диагонали самого крупного тега), поэтому каждый тег
+    целиком попадает хотя бы в одну плитку. Плитки обрабатываются пулом
+    потоков, у каждого потока свой детектор; дубликаты тегов на стыках
+    объединяются. Повторяет интерфейс detect(gray).
+    """
+
+    def __init__(self, create, tile_size, overlap, workers=4):
+        """
+        Args:
+            create (callable): Создание детектора для потока пула.
+            tile_size (int): Сторона плитки (пикс).
+            overlap (int): Перекрытие соседних плиток (пикс).
+            workers (int): Число потоков пула.
+        """
+        if tile_size <= 0 or not 0 <= 2 * overlap < tile_size:
+            raise ValueError(f"Некорректные размер плитки {tile_size} и перекрытие {overlap}")
+        self.create = create
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='tile')
+
+    def close(self):
+        """Остановка пула потоков плиток (детектор больше не используется)."""
+        self.pool.shutdown(wait=False)
+
+    def _positions(self, length):
+        """Начала плиток вдоль одной оси (последняя плитка прижата к краю)."""
+        if length <= self.tile_size:
+            return [0]
+        step = self.tile_size - self.overlap
+        positions = list(range(0, length - self.tile_size, step))
+        positions.append(length - self.tile_size)
+        return positions
+
+    def _detect_tile(self, gray, x, y):
+        detector = getattr(self.local, 'detector', None)
+        if detector is None:
+            detector = self.local.detector = self.create()
+        tile = np.ascontiguousarray(gray[y:y + self.tile_size, x:x + self.tile_size])
+        return [_shift(tag, x, y) for tag in detector.detect(tile)]
+
+    def detect(self, gray):
+        h, w = gray.shape[:2]
+        futures = [
+            self.pool.submit(self._detect_tile, gray, x, y)
+            for y in self._positions(h)
+            for x in self._positions(w)
+        ]
+
+        detections = []
+        for future in futures:
+            for tag in future.result():
+                # Тег на стыке найден в нескольких плитках - оставляем вариант с большим запасом
+                size = np.ptp(tag.corners, axis=0).max()
+                for i, other in enumerate(detections):
+                    if other.tag_id == tag.tag_id and np.linalg.norm(other.center - tag.center) < max(4.0, size / 4):
+                        if tag.margin > other.margin:
+                            detections[i] = tag
+                        break
+                else:
+                    detections.append(tag)
+        return detections
@@ -0,0 +1,238 @@
+# detection_scheduler.py
+import time
+import threading
+from collections import deque
+from logger_setup import logger
+
+# Классы приоритета: меньшее значение обслуживается первым
+PRIORITIES = {'critical': 0, 'normal': 1, 'low': 2}
+
+# Окно расчета фактической частоты обработки (сек)
+FPS_WINDOW = 10.0
+
+
+class _CameraState:
+    """Состояние камеры в планировщике."""
+
+    def __init__(self, priority, target_fps, vtime, group=None):
+        self.priority = priority
+        self.target_fps = target_fps
+        self.group = group             # Группа пакетной детекции (None - без пакетов)
+        self.vtime = vtime             # Виртуальное время справедливого разделения
+        self.pending = False           # Есть необработанный снимок
+        self.pending_since = 0.0
+        self.busy = False              # Снимок камеры обрабатывается
+        self.shed_frames = 0           # Снимки, замененные новыми до обработки
+        self.completions = deque()     # Время завершения обработки в окне FPS_WINDOW
+
+
+class DetectionScheduler:
+    """
+    Общий пул потоков обработки снимков для всех камер.
+
+    Камеры сообщают о новом снимке через submit(); хранится только признак
+    наличия снимка, поэтому снимок, не дождавшийся обработки, заменяется
+    следующим (сбрасывается). Свободный поток выбирает камеру так:
+    сначала класс приоритета (critical, normal, low), внутри класса - камеру
+    с наименьшим виртуальным временем: каждая обработка сдвигает его на
+    затраченное время обработки, деленное на target_fps, поэтому камеры
+    класса получают долю процессорного времени пропорционально заданной
+    частоте. Камера, возвращающаяся в очередь после простоя, начинает не
+    раньше текущего минимума конкурирующих камер и не получает накопленный
+    запас. При перегрузке снимки низкоприоритетных камер сбрасываются
+    первыми, а критичные камеры сохраняют частоту.
+
+    К выбранной камере добавляются ожидающие камеры той же группы пакетной
+    детекции (до max_batch), чтобы обработать их снимки одним вызовом детектора.
+    """
+
+    def __init__(self, process, workers=2, report_interval=60.0, max_batch=16):
+        """
+        Args:
+            process (callable): Обработка снимков камер process(camera_indices);
+                возвращает индексы камер, снимки которых обработаны (а не отброшены).
+            workers (int): Число потоков обработки.
+            report_interval (float): Период записи в лог фактической частоты камер (сек).
+            max_batch (int): Наибольшее число камер в одном пакете.
+        """
+        self.process = process
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.report_interval = report_interval
+
+        self.condition = threading.Condition()
+        self.cameras = {}
+        self.running = False
+        self.threads = []
+        self.next_report = 0.0
+
+    def start(self):
+        """Запуск потоков обработки."""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.next_report = time.monotonic() + self.report_interval
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'detection-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Планировщик детекции запущен ({self.workers} потоков)")
+
+    def stop(self):
+        """Остановка потоков обработки."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout=2.0)
+        self.threads = []
+
+    def add_camera(self, camera_index, priority='normal', target_fps=4.0, group=None):
+        """
+        Регистрация камеры (или обновление ее параметров).
+
+        Args:
+            group: Ключ группы пакетной детекции (камеры с общим детектором) или None.
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES['normal'])
+        with self.condition:
+            state = self.cameras.get(camera_index)
+            if state:
+                state.priority = rank
+                state.target_fps = target_fps
+                state.group = group
+                return
+            # Новая камера начинает с текущего минимума, чтобы не получить серию кадров вне очереди
+            vtime = min((s.vtime for s in self.cameras.values()), default=0.0)
+            self.cameras[camera_index] = _CameraState(rank, target_fps, vtime, group)
+
+    def remove_camera(self, camera_index):
+        """Удаление камеры из планировщика."""
+        with self.condition:
+            self.cameras.pop(camera_index, None)
+
+    def submit(self, camera_index):
+        """Уведомление о новом снимке камеры (вызывается из потока получения снимков)."""
+        with self.condition:
+            state = self.cameras.get(camera_index)
+            if state is None:
+                return
+            if state.pending:
+                state.shed_frames += 1
+            else:
+                if not state.busy:
+                    # После простоя (или повторного добавления) камера не догоняет остальных вне очереди
+                    active = [s.vtime for s in self.cameras.values() if s is not state and (s.pending or s.busy)]
+                    if active:
+                        state.vtime = max(state.vtime, min(active))
+                state.pending = True
+                state.pending_since = time.monotonic()
+            self.condition.notify()
+
+    def _pick(self):
+        """Выбор камер для обработки (вызывается под блокировкой)."""
+        ready = [
+            ((state.priority, state.vtime, state.pending_since), index)
+            for index, state in self.cameras.items()
+            if state.pending and not state.busy
+        ]
+        if not ready:
+            return []
+        ready.sort()
+        best_index = ready[0][1]
+        group = self.cameras[best_index].group
+        if group is None:
+            return [best_index]
+        # Пакет: камеры той же группы в порядке очереди
+        batch = [index for _, index in ready if self.cameras[index].group == group]
+        return batch[:self.max_batch]
+
+    def _worker_loop(self):
+        while True:
+            with self.condition:
+                indices = []
+                while self.running:
+                    indices = self._pick()
+                    if indices:
+                        break
+                    self.condition.wait(1.0)
+                if not self.running:
+                    return
+                states = {index: self.cameras[index] for index in indices}
+                for state in states.values():
+                    state.pending = False
+                    state.busy = True
+
+            processed = ()
+            started = time.monotonic()
+            try:
+                processed = self.process(indices)
+            except Exception as e:
+                cameras = ', '.join(str(index + 1) for index in indices)
+                logger.warning(f"Ошибка обработки снимка камеры {cameras}: {e}")
+            finally:
+                now = time.monotonic()
+                # Время пакета делится поровну между его камерами
+                cost = (now - started) / len(indices)
+                with self.condition:
+                    for index, state in states.items():
+                        state.busy = False
+                        if index in processed:
+                            state.vtime += cost / max(state.target_fps, 0.001)
+                            state.completions.append(now)
+                            self._achieved_fps(state, now)
+                        if state.pending:
+                            self.condition.notify()
+                    report = now >= self.next_report
+                    if report:
+                        self.next_report = now + self.report_interval
+                if report:
+                    self._log_report()
+
+    def _achieved_fps(self, state, now):
+        """Фактическая частота обработки камеры за окно FPS_WINDOW (вызывается под блокировкой)."""
+        while state.completions and now - state.completions[0] > FPS_WINDOW:
+            state.completions.popleft()
+        return len(state.completions) / FPS_WINDOW
+
+    def get_stats(self, camera_index):
+        """
+        Статистика камеры в планировщике.
+
+        Returns:
+            dict: priority, target_fps, achieved_fps, shed_frames или None для неизвестной камеры.
+        """
+        with self.condition:
+            state = self.cameras.get(camera_index)
+            if state is None:
+                return None
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            return {
+                'priority': names[state.priority],
+                'target_fps': state.target_fps,
+                'achieved_fps': self._achieved_fps(state, time.monotonic()),
+                'shed_frames': state.shed_frames
+            }
+
+    def _log_report(self):
+        """Итог по камерам в лог; отдельное предупреждение - только для отстающих от заданной частоты."""
+        with self.condition:
+            indices = sorted(self.cameras)
+        behind = 0
+        shed = 0
+        for index in indices:
+            stats = self.get_stats(index)
+            if stats is None:
+                continue
+            shed += stats['shed_frames']
+            if stats['achieved_fps'] < stats['target_fps'] * 0.8:
+                behind += 1
+                logger.warning(
+                    f"Камера {index + 1} [{stats['priority']}] отстает: {stats['achieved_fps']:.1f} из "
+                    f"{stats['target_fps']:.1f} FPS, сброшено снимков: {stats['shed_frames']}"
+                )
+        logger.info(
+            f"Планировщик детекции: {len(indices)} камер, отстают {behind}, сброшено снимков всего: {shed}"
+        )
@@ -0,0 +1,102 @@
+# detection_state.py
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Tuple
+
+Corners = Tuple[Tuple[float, float], ...]
+
+
+@dataclass
+class DetectedTag:
+    tag_id: int
+    camera_index: int
+
+
+@dataclass(frozen=True)
+class CameraDetection:
+    """Неизменяемый результат обработки снимка камеры."""
+    tags: Tuple[int, ...]           # ID переданных тегов
+    corners: Tuple[Corners, ...]    # Углы тегов в координатах кадра (в порядке tags)
+    timestamp: float                # time.monotonic() получения снимка
+    seq: int                        # Номер снимка у клиента камеры
+
+
+class DetectionStateStore:
+    """
+    Хранилище результатов детекции по камерам.
+
+    Состояние - неизменяемый словарь неизменяемых записей; запись создает
+    новый словарь и подменяет ссылку на него, поэтому читатели получают
+    согласованный снимок без блокировок. Счетчик версий увеличивается при
+    изменении набора тегов камеры (а также при появлении и удалении камеры);
+    wait_for_change() ждет следующей версии.
+    """
+
+    def __init__(self):
+        self._states = MappingProxyType({})
+        self._version = 0
+        self._write_lock = threading.Lock()  # Только между писателями
+        self._changed = threading.Condition(threading.Lock())
+
+    @property
+    def version(self):
+        return self._version
+
+    def publish(self, camera_index, tags, corners, timestamp, seq):
+        """
+        Публикация результата камеры.
+
+        Returns:
+            bool: True, если набор тегов камеры изменился.
+        """
+        entry = CameraDetection(tuple(tags), tuple(corners), timestamp, seq)
+        with self._write_lock:
+            previous = self._states.get(camera_index)
+            changed = previous is None or previous.tags != entry.tags
+            states = dict(self._states)
+            states[camera_index] = entry
+            self._swap(states, changed)
+        return changed
+
+    def remove(self, camera_index):
+        """Удаление камеры из хранилища."""
+        with self._write_lock:
+            if camera_index not in self._states:
+                return
+            states = dict(self._states)
+            del states[camera_index]
+            self._swap(states, True)
+
+    def _swap(self, states, changed):
+        """Подмена состояния (вызывается под блокировкой писателей)."""
+        self._states = MappingProxyType(states)
+        if changed:
+            with self._changed:
+                self._version += 1
+                self._changed.notify_all()
+
+    def get(self, camera_index):
+        """Последний результат камеры (CameraDetection) или None."""
+        return self._states.get(camera_index)
+
+    def snapshot(self):
+        """
+        Согласованный снимок состояния.
+
+        Returns:
+            tuple: (версия, неизменяемый словарь {индекс камеры: CameraDetection}).
+        """
+        with self._changed:
+            return self._version, self._states
+
+    def wait_for_change(self, version, timeout=None):
+        """
+        Ожидание версии новее version.
+
+        Returns:
+            int: Текущая версия (равна version, если истек таймаут).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout)
+            return self._version
@@ -0,0 +1,97 @@
+# detector_backends.py
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class TagDetection:
+    """Обнаруженный тег в формате, общем для всех движков детекции."""
+    tag_id: int
+    corners: np.ndarray  # 4x2, координаты углов в пикселях
+    center: np.ndarray   # 2, центр тега
+    margin: float        # Запас декодирования (0, если движок его не сообщает)
+
+
+class AprilTagBackend:
+    """Детекция библиотекой pupil_apriltags (эталонная реализация AprilTag)."""
+
+    def __init__(self, profile):
+        from pupil_apriltags import Detector  # Отложенный импорт: ускоряет запуск сервиса
+
+        self.detector = Detector(
+            families=profile.families,
+            nthreads=profile.nthreads,
+            quad_decimate=profile.quad_decimate,
+            quad_sigma=profile.quad_sigma,
+            refine_edges=profile.refine_edges,
+            decode_sharpening=profile.decode_sharpening,
+            debug=0
+        )
+
+    def detect(self, gray):
+        """
+        Args:
+            gray (np.ndarray): Кадр в оттенках серого.
+
+        Returns:
+            list[TagDetection]: Обнаруженные теги.
+        """
+        return [
+            TagDetection(tag.tag_id, tag.corners, tag.center, tag.decision_margin)
+            for tag in self.detector.detect(gray)
+        ]
+
+
+class ArucoBackend:
+    """
+    Детекция AprilTag средствами cv2.aruco (словари DICT_APRILTAG_*).
+
+    Используются параметры профиля quad_decimate и quad_sigma; число потоков
+    задается глобально для OpenCV, поэтому nthreads не применяется.
+    """
+
+    FAMILIES = {
+        'tag16h5': 'DICT_APRILTAG_16h5',
+        'tag25h9': 'DICT_APRILTAG_25h9',
+        'tag36h10': 'DICT_APRILTAG_36h10',
+        'tag36h11': 'DICT_APRILTAG_36h11',
+    }
+
+    def __init__(self, profile):
+        import cv2
+
+        dictionary_name = self.FAMILIES.get(profile.families)
+        if dictionary_name is None:
+            raise ValueError(f"Семейство {profile.families} не поддерживается движком aruco")
+
+        params = cv2.aruco.DetectorParameters()
+        params.aprilTagQuadDecimate = float(profile.quad_decimate)
+        params.aprilTagQuadSigma = float(profile.quad_sigma)
+        if profile.refine_edges:
+            params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_APRILTAG
+        dictionary = cv2.aruco.getPredefinedDictionary(getattr(cv2.aruco, dictionary_name))
+        self.detector = cv2.aruco.ArucoDetector(dictionary, params)
+
+    def detect(self, gray):
+        """
+        Args:
+            gray (np.ndarray): Кадр в оттенках серого.
+
+        Returns:
+            list[TagDetection]: Обнаруженные теги.
+        """
+        corners, ids, _ = self.detector.detectMarkers(gray)
+        if ids is None:
+            return []
+        detections = []
+        for tag_corners, tag_id in zip(corners, ids.flatten()):
+            points = tag_corners.reshape(4, 2).astype(np.float64)
+            detections.append(TagDetection(int(tag_id), points, points.mean(axis=0), 0.0))
+        return detections
+
+
+BACKENDS = {
+    'apriltag': AprilTagBackend,
+    'aruco': ArucoBackend,
+}
@@ -0,0 +1,53 @@
+# detector_factory.py
+from dataclasses import fields, replace
+
+from config_loader import DetectorConfig, resolve_tiling
+from .detector_backends import BACKENDS
+from .detection_modes import TwoStageDetector, TiledDetector
+
+# Площадь тега для плиток профиля, не прошедшего resolve_tiling (max_tag_area камеры по умолчанию)
+DEFAULT_MAX_TAG_AREA = 10000.0
+
+
+def create_detector(profile=None):
+    """
+    Создает детектор AprilTag по профилю параметров.
+
+    Args:
+        profile (DetectorConfig): Профиль детектора (по умолчанию - профиль 'default').
+
+    Returns:
+        Детектор движка profile.backend; detect(gray) возвращает список TagDetection.
+    """
+    profile = profile or DetectorConfig()
+    backend = BACKENDS.get(profile.backend)
+    if backend is None:
+        raise ValueError(f"Неизвестный движок детекции: {profile.backend}")
+
+    if profile.mode == 'two_stage':
+        coarse = backend(replace(profile, quad_decimate=profile.coarse_decimate))
+        return TwoStageDetector(coarse, backend(profile))
+    if profile.mode == 'tiled':
+        if not (profile.tile_size and profile.tile_overlap):
+            profile = resolve_tiling(profile, DEFAULT_MAX_TAG_AREA)
+        # Параллелизм дают плитки, поэтому каждый детектор плитки однопоточный
+        tile_profile = replace(profile, nthreads=1)
+        return TiledDetector(
+            lambda: backend(tile_profile), profile.tile_size, profile.tile_overlap, profile.nthreads
+        )
+    if profile.mode != 'single':
+        raise ValueError(f"Неизвестный режим детекции: {profile.mode}")
+    return backend(profile)
+
+
+def profile_key(profile):
+    """
+    Ключ профиля для кэширования детекторов (без учета имени профиля).
+
+    Args:
+        profile (DetectorConfig): Профиль детектора.
+
+    Returns:
+        tuple: Значения параметров детектора.
+    """
+    return tuple(getattr(profile, f.name) for f in fields(profile) if f.name != 'name')
@@ -0,0 +1,269 @@
+# detector_tuner.py
+import os
+import glob
+import time
+import itertools
+from dataclasses import dataclass, replace
+
+import cv2
+import numpy as np
+
+from config_loader import ConfigLoader, DetectorConfig, resolve_tiling
+from roi.read_roi import RoiCache
+from .detector_factory import create_detector
+from .frame_recorder import read_recording, is_recording
+from .tag_processing import select_largest_tags, DEFAULT_TAG_IDS
+from logger_setup import logger
+
+# Перебираемые параметры детектора (остальные берутся из эталонного профиля)
+TUNING_GRID = {
+    'quad_decimate': [1.0, 1.5, 2.0, 3.0],
+    'quad_sigma': [0.0, 0.8],
+    'decode_sharpening': [0.25, 0.5],
+}
+
+IMAGE_EXTENSIONS = ('*.jpg', '*.jpeg', '*.png', '*.bmp')
+
+
+@dataclass
+class TuningResult:
+    """Результат прогона одного профиля детектора."""
+    profile: DetectorConfig
+    mean_time: float  # Среднее время детекции на кадр (сек)
+    recall: float     # Доля эталонных детекций, найденных профилем
+
+
+def load_frames(path, limit=None):
+    """
+    Загружает записанные кадры камеры.
+
+    Args:
+        path (str): Файл записи FrameRecorder, файл изображения или директория с изображениями.
+        limit (int): Максимальное количество кадров.
+
+    Returns:
+        list[numpy.ndarray]: Кадры BGR.
+    """
+    if is_recording(path):
+        frames = []
+        for _, _, data in read_recording(path):
+            if limit is not None and len(frames) >= limit:
+                break
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                frames.append(frame)
+        return frames
+
+    if os.path.isdir(path):
+        files = sorted(
+            f for pattern in IMAGE_EXTENSIONS
+            for f in glob.glob(os.path.join(path, pattern))
+        )
+    else:
+        files = [path]
+
+    frames = []
+    for filename in files[:limit]:
+        frame = cv2.imread(filename, cv2.IMREAD_COLOR)
+        if frame is None:
+            logger.warning(f"Не удалось прочитать кадр {filename}")
+            continue
+        frames.append(frame)
+    return frames
+
+
+def crop_roi_gray(frame, roi):
+    """Вырезает ROI (с проверкой границ) и переводит в оттенки серого."""
+    h_img, w_img = frame.shape[:2]
+    if not roi:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    x, y = max(0, roi['x']), max(0, roi['y'])
+    w, h = min(roi['w'], w_img - x), min(roi['h'], h_img - y)
+    return cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+
+
+def camera_roi(camera_config, roi_file):
+    """ROI камеры как при обработке: из конфигурации камеры, иначе из файла ROI (None - весь кадр)."""
+    return camera_config.roi or RoiCache(roi_file).get(camera_config.camera_ip)
+
+
+def run_profile(profile, gray_frames, min_tag_area, max_tag_area, tag_ids=DEFAULT_TAG_IDS):
+    """
+    Прогоняет профиль детектора по кадрам.
+
+    Returns:
+        tuple: Список множеств ID тегов по кадрам и среднее время детекции (сек).
+    """
+    detector = create_detector(profile)
+    detector.detect(gray_frames[0])  # Прогрев
+
+    found = []
+    total_time = 0.0
+    for gray in gray_frames:
+        start = time.perf_counter()
+        tags = detector.detect(gray)
+        total_time += time.perf_counter() - start
+        largest_tags, _ = select_largest_tags(tags, min_tag_area, max_tag_area, profile.name, tag_ids)
+        found.append(set(largest_tags.keys()))
+    return found, total_time / len(gray_frames)
+
+
+def tune_detector(frames, roi, camera_config, grid=None, min_recall=1.0):
+    """
+    Подбирает самый быстрый профиль детектора, сохраняющий полноту детекции.
+
+    Эталоном служит консервативный профиль по умолчанию (с числом потоков камеры).
+
+    Args:
+        frames (list[numpy.ndarray]): Записанные кадры камеры.
+        roi (dict): ROI камеры или None.
+        camera_config (CameraConfig): Конфигурация камеры.
+        grid (dict): Перебираемые значения параметров (по умолчанию TUNING_GRID).
+        min_recall (float): Минимально допустимая полнота относительно эталона.
+
+    Returns:
+        tuple: Лучший TuningResult (None, если эталон не нашел тегов или полнота
+            не достигнута) и список всех результатов по возрастанию времени.
+    """
+    if not frames:
+        raise ValueError("Нет кадров для подбора профиля")
+
+    grid = grid or TUNING_GRID
+    gray_frames = [crop_roi_gray(frame, roi) for frame in frames]
+    min_area, max_area = camera_config.min_tag_area, camera_config.max_tag_area
+
+    reference_profile = DetectorConfig(
+        families=camera_config.detector.families,
+        nthreads=camera_config.detector.nthreads,
+        name='reference'
+    )
+    tag_ids = camera_config.tag_ids
+    reference, reference_time = run_profile(reference_profile, gray_frames, min_area, max_area, tag_ids)
+    reference_total = sum(len(ids) for ids in reference)
+    if not reference_total:
+        logger.warning("Эталонный прогон не нашел ни одного тега - профиль не будет рекомендован")
+
+    results = [TuningResult(reference_profile, reference_time, 1.0 if reference_total else 0.0)]
+    names = list(grid.keys())
+    for i, values in enumerate(itertools.product(*(grid[name] for name in names))):
+        profile = replace(reference_profile, name=f"tuned_{i}", **dict(zip(names, values)))
+        found, mean_time = run_profile(profile, gray_frames, min_area, max_area, tag_ids)
+        matched = sum(len(ref & ids) for ref, ids in zip(reference, found))
+        recall = matched / reference_total if reference_total else 0.0
+        results.append(TuningResult(profile, mean_time, recall))
+
+    results.sort(key=lambda r: r.mean_time)
+    best = next((r for r in results if r.recall >= min_recall), None)
+    return best, results
+
+
+def format_profile(profile):
+    """Фрагмент YAML для секции 'detector_profiles'."""
+    return "\n".join([
+        f"  {profile.name}:",
+        f"    nthreads: {profile.nthreads}",
+        f"    quad_decimate: {profile.quad_decimate}",
+        f"    quad_sigma: {profile.quad_sigma}",
+        f"    refine_edges: {profile.refine_edges}",
+        f"    decode_sharpening: {profile.decode_sharpening}",
+        f"    backend: {profile.backend}",
+        f"    mode: {profile.mode}",
+    ])
+
+
+# Сравниваемые варианты параметров профиля: первый вариант - эталон полноты и скорости
+COMPARISONS = {
+    'backend': ('apriltag', 'aruco'),
+    'mode': ('single', 'two_stage', 'tiled'),
+}
+
+
+def compare_variants(frames, roi, camera_config, field, values=None):
+    """
+    Сравнивает варианты одного параметра профиля детектора на кадрах камеры.
+
+    Остальные параметры берутся из профиля камеры; эталоном полноты и скорости
+    служит первый вариант (apriltag для движка, single для режима).
+
+    Returns:
+        tuple: Время эталона (сек) и список TuningResult по возрастанию времени детекции.
+    """
+    if not frames:
+        raise ValueError("Нет кадров для сравнения")
+
+    values = values or COMPARISONS[field]
+    gray_frames = [crop_roi_gray(frame, roi) for frame in frames]
+    min_area, max_area = camera_config.min_tag_area, camera_config.max_tag_area
+    tag_ids = camera_config.tag_ids
+
+    runs = []
+    for value in values:
+        profile = replace(camera_config.detector, name=str(value), **{field: value})
+        profile = resolve_tiling(profile, camera_config.max_tag_area)
+        runs.append((profile,) + run_profile(profile, gray_frames, min_area, max_area, tag_ids))
+
+    reference, reference_time = runs[0][1], runs[0][2]
+    reference_total = sum(len(ids) for ids in reference)
+    results = []
+    for profile, found, mean_time in runs:
+        matched = sum(len(ref & ids) for ref, ids in zip(reference, found))
+        results.append(TuningResult(profile, mean_time, matched / reference_total if reference_total else 0.0))
+    results.sort(key=lambda r: r.mean_time)
+    return reference_time, results
+
+
+def run_comparison(config_path, camera_index, frames_path, field, roi_file='roi/roi.xml'):
+    """Команда сравнения движков ('backend') или режимов ('mode') детекции по записанным кадрам."""
+    _, camera_configs = ConfigLoader(config_path).load()
+    camera_config = next((c for c in camera_configs if c.index == camera_index), None)
+    if camera_config is None:
+        raise ValueError(f"Камера с индексом {camera_index} не найдена в {config_path}")
+
+    frames = load_frames(frames_path)
+    roi = camera_roi(camera_config, roi_file)
+    h, w = frames[0].shape[:2] if frames else (0, 0)
+    print(f"Сравнение '{field}' для {camera_config.name}: {len(frames)} кадров {w}x{h}, ROI: {roi}")
+
+    reference_time, results = compare_variants(frames, roi, camera_config, field)
+    print(f"{field:<10} {'мс/кадр':>9} {'ускорение':>10} {'полнота':>8}")
+    for r in results:
+        speedup = reference_time / r.mean_time if r.mean_time else 0.0
+        print(f"{r.profile.name:<10} {r.mean_time * 1000:>9.1f} {speedup:>9.2f}x {r.recall:>8.2f}")
+
+    if not any(r.recall for r in results):
+        print("Эталонный вариант не нашел тегов - нужны кадры с видимыми тегами")
+        return results
+    best = next((r for r in results if r.recall >= 1.0), None)
+    if best:
+        print(f"\nСамый быстрый вариант без потери тегов: {best.profile.name} "
+              f"(укажите '{field}: {best.profile.name}' в профиле детектора камеры)")
+    return results
+
+
+def run_tuning(config_path, camera_index, frames_path, min_recall=1.0, roi_file='roi/roi.xml'):
+    """Команда подбора профиля детектора для камеры по записанным кадрам."""
+    _, camera_configs = ConfigLoader(config_path).load()
+    camera_config = next((c for c in camera_configs if c.index == camera_index), None)
+    if camera_config is None:
+        raise ValueError(f"Камера с индексом {camera_index} не найдена в {config_path}")
+
+    frames = load_frames(frames_path)
+    roi = camera_roi(camera_config, roi_file)
+    print(f"Подбор профиля для {camera_config.name}: {len(frames)} кадров, ROI: {roi}")
+
+    best, results = tune_detector(frames, roi, camera_config, min_recall=min_recall)
+
+    print(f"{'профиль':<12} {'decimate':>8} {'sigma':>6} {'sharp':>6} {'мс/кадр':>9} {'полнота':>8}")
+    for r in results:
+        p = r.profile
+        print(f"{p.name:<12} {p.quad_decimate:>8} {p.quad_sigma:>6} {p.decode_sharpening:>6} "
+              f"{r.mean_time * 1000:>9.1f} {r.recall:>8.2f}")
+
+    if best is None:
+        print(f"Ни один профиль не достиг полноты {min_recall:.2f} (нужны кадры с видимыми тегами)")
+        return None
+
+    best.profile = replace(best.profile, name=f"camera_{camera_index}")
+    print("\nРекомендуемый профиль (добавьте в detector_profiles и укажите в камере 'detector'):")
+    print(format_profile(best.profile))
+    return best
@@ -0,0 +1,113 @@
+# digest_auth.py
+import os
+import re
+import hashlib
+import threading
+
+_PARAM = re.compile(r'(\w+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^,\s]*))')
+
+_HASHES = {
+    'MD5': hashlib.md5,
+    'SHA-256': hashlib.sha256,
+}
+
+
+def parse_challenge(header):
+    """
+    Параметры вызова Digest из заголовка WWW-Authenticate.
+
+    Returns:
+        dict: realm, nonce, qop, algorithm, opaque, stale... или None, если схема не Digest.
+    """
+    scheme, _, params = header.strip().partition(' ')
+    if scheme.lower() != 'digest':
+        return None
+    return {
+        match.group(1).lower(): match.group(2) if match.group(2) is not None else match.group(3)
+        for match in _PARAM.finditer(params)
+    }
+
+
+class DigestAuth:
+    """
+    HTTP Digest-аутентификация (RFC 7616, qop=auth) с кэшированием nonce.
+
+    После первого вызова 401 nonce сервера сохраняется, и последующие запросы
+    сразу отправляются с заголовком Authorization (счетчик nc увеличивается),
+    без лишнего круга 401 на каждый снимок. Новый вызов (истекший nonce,
+    stale=true) заменяет сохраненный.
+    """
+
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.lock = threading.Lock()
+        self.challenge = None
+        self.nonce_count = 0
+
+    @property
+    def ready(self):
+        """Есть ли сохраненный nonce для заголовка без предварительного 401."""
+        return self.challenge is not None
+
+    def update(self, headers):
+        """
+        Сохранение вызова Digest из заголовков WWW-Authenticate ответа 401.
+
+        Args:
+            headers (list[str]): Значения WWW-Authenticate.
+
+        Returns:
+            bool: True, если найден поддерживаемый вызов Digest.
+        """
+        for header in headers:
+            challenge = parse_challenge(header)
+            if not challenge or 'nonce' not in challenge:
+                continue
+            algorithm = challenge.get('algorithm', 'MD5').upper()
+            if algorithm.removesuffix('-SESS') not in _HASHES:
+                continue
+            qop = [value.strip() for value in challenge.get('qop', '').split(',') if value.strip()]
+            if qop and 'auth' not in qop:
+                continue
+            challenge['algorithm'] = algorithm
+            challenge['qop'] = 'auth' if qop else None
+            with self.lock:
+                self.challenge = challenge
+                self.nonce_count = 0
+            return True
+        return False
+
+    def header(self, method, uri):
+        """Значение заголовка Authorization для запроса (нужен сохраненный вызов)."""
+        with self.lock:
+            challenge = self.challenge
+            self.nonce_count += 1
+            nc = f"{self.nonce_count:08x}"
+
+        algorithm = challenge['algorithm']
+        digest = _HASHES[algorithm.removesuffix('-SESS')]
+
+        def h(value):
+            return digest(value.encode('utf-8')).hexdigest()
+
+        realm, nonce, qop = challenge.get('realm', ''), challenge['nonce'], challenge['qop']
+        cnonce = os.urandom(8).hex()
+        ha1 = h(f"{self.username}:{realm}:{self.password}")
+        if algorithm.endswith('-SESS'):
+            ha1 = h(f"{ha1}:{nonce}:{cnonce}")
+        ha2 = h(f"{method}:{uri}")
+        if qop:
+            response = h(f"{ha1}:{nonce}:{nc}:{cnonce}:{qop}:{ha2}")
+        else:
+            response = h(f"{ha1}:{nonce}:{ha2}")
+
+        parts = [
+            f'username="{self.username}"', f'realm="{realm}"', f'nonce="{nonce}"',
+            f'uri="{uri}"', f'algorithm={algorithm}', f'response="{response}"'
+        ]
+        if challenge.get('opaque') is not None:
+            parts.append(f'opaque="{challenge["opaque"]}"')
+        if qop:
+            parts += [f'qop={qop}', f'nc={nc}', f'cnonce="{cnonce}"']
+        return 'Digest ' + ', '.join(parts)
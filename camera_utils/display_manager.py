@@ -1,70 +1,120 @@
 # display_manager.py (исправленная версия)
 import cv2
+import math
 import threading
-import queue
+import numpy as np
+
+MOSAIC_WINDOW = 'Cameras'
 
 class DisplayManager:
-    def __init__(self, camera_count):
-        self.camera_count = camera_count
+    def __init__(self, mailboxes, frame_event=None, tile_size=None):
+        """
+        Args:
+            mailboxes (dict): Почтовые ящики кадров по индексу камеры (FrameMailbox).
+            frame_event (threading.Event): Событие появления нового кадра любой камеры.
+            tile_size (tuple[int, int]): Размер плитки (ширина, высота) для режима мозаики.
+                В этом режиме ящики должны содержать готовые плитки этого размера.
+        """
+        self.mailboxes = mailboxes
+        self.frame_event = frame_event or threading.Event()
+        self.tile_size = tile_size
         self.stop_event = threading.Event()
-        self.frames = [None] * camera_count
-        self.locks = [threading.Lock() for _ in range(camera_count)]
-        self.windows_initialized = False
-
-    def _init_windows(self):
-        if not self.windows_initialized:
-            for i in range(self.camera_count):
-                cv2.namedWindow(f'Camera {i+1}', cv2.WINDOW_NORMAL)
-                cv2.resizeWindow(f'Camera {i+1}', 800, 600)
-            self.windows_initialized = True
-
-    def start_display(self, output_queue):
+        self.shown_seq = {}
+        self.windows = set()
+
+        # Мозаика: общий холст и текущая раскладка камер
+        self.canvas = None
+        self.layout = []
+        self.columns = 1
+
+    def _init_window(self, idx):
+        if idx not in self.windows:
+            cv2.namedWindow(f'Camera {idx+1}', cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(f'Camera {idx+1}', 800, 600)
+            self.windows.add(idx)
+
+    def start_display(self):
         self.stop_event.clear()
-        self.thread = threading.Thread(
-            target=self._display_worker,
-            args=(output_queue,),
-            daemon=True
-        )
-        self.thread.start()
-
-    def _display_worker(self, output_queue):
-        try:
-            while not self.stop_event.is_set():
-                try:
-                    idx, frame = output_queue.get(timeout=0.1)
-                    with self.locks[idx]:
-                        self.frames[idx] = frame.copy()
-                except queue.Empty:
-                    pass
-                except Exception as e:
-                    print(f"Display worker error: {e}")
-        except Exception as e:
-            print(f"Display worker fatal error: {e}")
-            self.stop_event.set()
+
+    def wait_for_frames(self, timeout=0.1):
+        """Ожидание нового кадра любой камеры (вместо опроса по таймеру)."""
+        return self.frame_event.wait(timeout)
 
     def update_display(self):
         """Этот метод должен вызываться из основного потока"""
-        self._init_windows()
         quit_pressed = False
-        
-        for i in range(self.camera_count):
-            with self.locks[i]:
-                frame = self.frames[i]
-            
-            if frame is not None:
-                cv2.imshow(f'Camera {i+1}', frame)
-        
+
+        # Сбрасываем до чтения ящиков, чтобы не потерять кадр, пришедший во время отрисовки
+        self.frame_event.clear()
+        if self.tile_size:
+            self._update_mosaic()
+        else:
+            self._update_windows()
+
         key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
             quit_pressed = True
         elif key == 27:  # ESC
             quit_pressed = True
-            
+
         return quit_pressed
 
+    def _update_windows(self):
+        """Отдельное окно для каждой камеры."""
+        for idx in self.windows - set(self.mailboxes.keys()):
+            # Камера удалена из конфигурации
+            cv2.destroyWindow(f'Camera {idx+1}')
+            self.windows.discard(idx)
+            self.shown_seq.pop(idx, None)
+
+        for idx, mailbox in list(self.mailboxes.items()):
+            seq, frame = mailbox.get()
+            if frame is None or seq == self.shown_seq.get(idx):
+                continue
+
+            self._init_window(idx)
+            cv2.imshow(f'Camera {idx+1}', frame)
+            self.shown_seq[idx] = seq
+
+    def _init_mosaic(self, layout):
+        """Создание холста мозаики под текущий набор камер."""
+        tile_w, tile_h = self.tile_size
+        self.layout = layout
+        self.columns = max(1, math.ceil(math.sqrt(len(layout))))
+        rows = max(1, math.ceil(len(layout) / self.columns))
+        self.canvas = np.zeros((rows * tile_h, self.columns * tile_w, 3), dtype=np.uint8)
+        self.shown_seq.clear()
+
+        if MOSAIC_WINDOW not in self.windows:
+            cv2.namedWindow(MOSAIC_WINDOW, cv2.WINDOW_NORMAL)
+            self.windows.add(MOSAIC_WINDOW)
+        cv2.resizeWindow(MOSAIC_WINDOW, self.canvas.shape[1], self.canvas.shape[0])
+
+    def _update_mosaic(self):
+        """Одно окно-мозаика: перерисовываются только плитки с новыми кадрами."""
+        layout = sorted(self.mailboxes.keys())
+        if layout != self.layout or self.canvas is None:
+            self._init_mosaic(layout)
+
+        tile_w, tile_h = self.tile_size
+        dirty = False
+        for pos, idx in enumerate(layout):
+            mailbox = self.mailboxes.get(idx)
+            if mailbox is None:
+                continue
+            seq, tile = mailbox.get()
+            if tile is None or seq == self.shown_seq.get(idx):
+                continue
+
+            row, col = divmod(pos, self.columns)
+            self.canvas[row * tile_h:(row + 1) * tile_h, col * tile_w:(col + 1) * tile_w] = tile
+            self.shown_seq[idx] = seq
+            dirty = True
+
+        if dirty:
+            cv2.imshow(MOSAIC_WINDOW, self.canvas)
+
     def stop_display(self):
         self.stop_event.set()
-        if hasattr(self, 'thread'):
-            self.thread.join(timeout=1.0)
-        if self.windows_initialized:
-            cv2.destroyAllWindows()
\ No newline at end of file
+        if self.windows:
+            cv2.destroyAllWindows()
@@ -0,0 +1,49 @@
+# frame_mailbox.py
+import threading
+
+
+class FrameMailbox:
+    """
+    Однослотовый почтовый ящик кадра одной камеры.
+
+    Новый кадр перезаписывает предыдущий (устаревшие кадры не копятся),
+    каждому кадру присваивается порядковый номер. Кадр передается по ссылке,
+    поэтому после публикации его нельзя изменять.
+    """
+
+    def __init__(self, notify_event=None):
+        """
+        Args:
+            notify_event (threading.Event): Общее событие, выставляемое при любом новом кадре.
+        """
+        self.condition = threading.Condition()
+        self.notify_event = notify_event
+        self.seq = 0
+        self.frame = None
+
+    def put(self, frame):
+        """Публикация кадра. Возвращает его порядковый номер."""
+        with self.condition:
+            self.seq += 1
+            self.frame = frame
+            seq = self.seq
+            self.condition.notify_all()
+        if self.notify_event:
+            self.notify_event.set()
+        return seq
+
+    def get(self):
+        """Последний кадр: (номер, кадр); кадр None, если публикаций не было."""
+        with self.condition:
+            return self.seq, self.frame
+
+    def wait_for_newer(self, last_seq, timeout=None):
+        """
+        Ожидание кадра с номером больше last_seq.
+
+        Returns:
+            tuple: (номер, кадр) - при таймауте номер не превышает last_seq.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > last_seq, timeout=timeout)
+            return self.seq, self.frame
@@ -0,0 +1,184 @@
+# frame_recorder.py
+import os
+import mmap
+import struct
+import threading
+from logger_setup import logger
+
+# Заголовок файла: сигнатура, размер области данных, начало (самая старая запись),
+# конец (позиция записи), количество записей, следующий порядковый номер
+HEADER = struct.Struct('<8sQQQQQ')
+HEADER_SIZE = 64
+MAGIC = b'ATRING01'
+
+# Заголовок записи: маркер, длина JPEG, порядковый номер, время снимка (unix)
+RECORD = struct.Struct('<IIQd')
+MARKER_FRAME = 0x314D5246  # 'FRM1'
+MARKER_WRAP = 0x50415257   # 'WRAP' - остаток области пуст, продолжение с начала
+
+
+class FrameRecorder:
+    """
+    Кольцевая запись JPEG-снимков камеры в предвыделенный файл через mmap.
+
+    Размер файла фиксирован: при заполнении новые снимки вытесняют самые старые.
+    Снимки хранятся как есть (без перекодирования) вместе с временем получения.
+    """
+
+    def __init__(self, path, size_mb=256.0):
+        self.path = path
+        self.capacity = int(size_mb * 1024 * 1024) - HEADER_SIZE
+        if self.capacity <= RECORD.size:
+            raise ValueError(f"Слишком маленький размер файла записи: {size_mb} МБ")
+
+        self.lock = threading.Lock()
+        self.head = 0
+        self.tail = 0
+        self.count = 0
+        self.next_seq = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a+b')
+        self.mm = self._map_file()
+
+    def _map_file(self):
+        """Открывает (или создает заново) файл кольцевого буфера."""
+        total_size = HEADER_SIZE + self.capacity
+        self.file.seek(0, os.SEEK_END)
+        existing_size = self.file.tell()
+
+        if existing_size == total_size:
+            mm = mmap.mmap(self.file.fileno(), total_size)
+            magic, capacity, head, tail, count, next_seq = HEADER.unpack_from(mm, 0)
+            if magic == MAGIC and capacity == self.capacity:
+                self.head, self.tail, self.count, self.next_seq = head, tail, count, next_seq
+                logger.info(f"Продолжение записи в {self.path} ({count} снимков)")
+                return mm
+            mm.close()
+
+        self.file.truncate(total_size)
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(self.file.fileno(), 0, total_size)
+        mm = mmap.mmap(self.file.fileno(), total_size)
+        self._write_header(mm)
+        logger.info(f"Создан файл записи {self.path} ({total_size // (1024 * 1024)} МБ)")
+        return mm
+
+    def _write_header(self, mm=None):
+        HEADER.pack_into(
+            mm or self.mm, 0,
+            MAGIC, self.capacity, self.head, self.tail, self.count, self.next_seq
+        )
+
+    def _evict_oldest(self):
+        """Удаляет самую старую запись (или переходит через маркер переноса)."""
+        offset = HEADER_SIZE + self.head
+        if self.capacity - self.head < RECORD.size:
+            self.head = 0
+            return
+        marker, length, _, _ = RECORD.unpack_from(self.mm, offset)
+        if marker != MARKER_FRAME:
+            self.head = 0
+            return
+        self.head += RECORD.size + length
+        self.count -= 1
+        if self.head >= self.capacity:
+            self.head = 0
+
+    def append(self, data, timestamp):
+        """
+        Добавляет снимок в кольцевой буфер.
+
+        Args:
+            data (bytes): Сырые байты JPEG.
+            timestamp (float): Время получения снимка (time.time()).
+
+        Returns:
+            bool: True, если снимок записан.
+        """
+        size = RECORD.size + len(data)
+        if size > self.capacity:
+            logger.warning(f"Снимок {len(data)} байт не помещается в {self.path}")
+            return False
+
+        with self.lock:
+            if self.mm is None:
+                return False
+
+            if self.tail + size > self.capacity:
+                # Освобождаем хвост области и переносим запись в начало
+                while self.count and self.head >= self.tail:
+                    self._evict_oldest()
+                if self.capacity - self.tail >= RECORD.size:
+                    RECORD.pack_into(self.mm, HEADER_SIZE + self.tail, MARKER_WRAP, 0, 0, 0.0)
+                self.tail = 0
+
+            while self.count and self.tail <= self.head < self.tail + size:
+                self._evict_oldest()
+            if not self.count:
+                self.head = self.tail
+
+            offset = HEADER_SIZE + self.tail
+            RECORD.pack_into(self.mm, offset, MARKER_FRAME, len(data), self.next_seq, timestamp)
+            self.mm[offset + RECORD.size:offset + size] = data
+
+            self.tail += size
+            self.count += 1
+            self.next_seq += 1
+            self._write_header()
+        return True
+
+    def close(self):
+        """Сброс данных на диск и закрытие файла."""
+        with self.lock:
+            if self.mm is None:
+                return
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+            self.file.close()
+
+
+def read_recording(path):
+    """
+    Читает снимки из файла кольцевого буфера от самого старого к новому.
+
+    Args:
+        path (str): Путь к файлу, созданному FrameRecorder.
+
+    Yields:
+        tuple: (порядковый номер, время снимка, байты JPEG).
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, capacity, head, _, count, _ = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} не является файлом записи снимков")
+
+            offset = head
+            remaining = count
+            while remaining:
+                if capacity - offset < RECORD.size:
+                    offset = 0
+                    continue
+                marker, length, seq, timestamp = RECORD.unpack_from(mm, HEADER_SIZE + offset)
+                if marker == MARKER_WRAP:
+                    offset = 0
+                    continue
+                if marker != MARKER_FRAME:
+                    raise ValueError(f"Поврежденная запись в {path} (смещение {offset})")
+                start = HEADER_SIZE + offset + RECORD.size
+                yield seq, timestamp, mm[start:start + length]
+                offset += RECORD.size + length
+                remaining -= 1
+
+
+def is_recording(path):
+    """Проверяет, что файл является записью FrameRecorder."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
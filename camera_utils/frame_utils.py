@@ -19,6 +19,19 @@ def crop_frame(frame, roi):
     return frame
 
 
+def decode_jpeg(data):
+    """
+    Декодирует снимок в кадр BGR (JPEG или другой формат, который читает cv2.imdecode).
+
+    Args:
+        data (bytes): Байты снимка.
+
+    Returns:
+        np.ndarray: Кадр или None, если данные повреждены.
+    """
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
 def prepare_text_frame(frame, text_lines):
     """
     Добавляет текст под изображением.
@@ -45,4 +58,30 @@ def prepare_text_frame(frame, text_lines):
         y = frame.shape[0] + (i + 1) * line_height - 10
         cv2.putText(new_frame, line, (10, y), font, font_scale, font_color, line_type)
 
-    return new_frame
\ No newline at end of file
+    return new_frame
+
+
+def make_tile(frame, tile_size, label=None):
+    """
+    Уменьшает кадр до плитки мозаики с сохранением пропорций.
+
+    Args:
+        frame (np.ndarray): Кадр изображения.
+        tile_size (tuple[int, int]): Размер плитки (ширина, высота).
+        label (str): Подпись в левом верхнем углу плитки.
+
+    Returns:
+        np.ndarray: Плитка размера tile_size на черном фоне.
+    """
+    tile_w, tile_h = tile_size
+    h, w = frame.shape[:2]
+    scale = min(tile_w / w, tile_h / h)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+
+    tile = np.zeros((tile_h, tile_w, 3), dtype=np.uint8)
+    x, y = (tile_w - new_w) // 2, (tile_h - new_h) // 2
+    tile[y:y + new_h, x:x + new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
+    if label:
+        cv2.putText(tile, label, (5, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+    return tile
\ No newline at end of file
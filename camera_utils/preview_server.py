@@ -0,0 +1,193 @@
+# preview_server.py
+import cv2
+import html
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from logger_setup import logger
+
+BOUNDARY = 'apriltagframe'
+
+
+class PreviewServer:
+    """
+    HTTP-просмотр обработанных кадров в формате MJPEG.
+
+    Кадры берутся из почтовых ящиков камер; кодирование в JPEG выполняется
+    лишь при подключенных зрителях, один раз на кадр и размер, и результат
+    используется всеми зрителями этого размера. Зрителем считаются и поток
+    MJPEG, и разовый запрос снимка: закодированный кадр размера хранится,
+    пока его кто-то запрашивает.
+    """
+
+    def __init__(self, mailboxes, camera_names, port=8080, host='0.0.0.0', width=640, quality=80):
+        """
+        Args:
+            mailboxes (dict): Почтовые ящики кадров по индексу камеры (FrameMailbox).
+            camera_names (dict): Имена камер по индексу.
+        """
+        self.mailboxes = mailboxes
+        self.camera_names = camera_names
+        self.port = port
+        self.host = host
+        self.default_width = width
+        self.quality = quality
+
+        self.lock = threading.Lock()
+        self.encoded = {}      # (camera_index, width) -> (seq, jpeg)
+        self.encode_locks = {}
+        self.viewers = {}      # (camera_index, width) -> число зрителей
+        self.server = None
+        self.thread = None
+
+    def get_jpeg(self, camera_index, width):
+        """
+        JPEG последнего кадра камеры, уменьшенного до ширины width.
+
+        Returns:
+            tuple: (номер кадра, байты JPEG) или (0, None), если кадров нет.
+        """
+        mailbox = self.mailboxes.get(camera_index)
+        if mailbox is None:
+            return 0, None
+        seq, frame = mailbox.get()
+        if frame is None:
+            return 0, None
+
+        key = (camera_index, width)
+        with self.lock:
+            lock = self.encode_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            cached_seq, jpeg = self.encoded.get(key, (0, None))
+            if cached_seq == seq:
+                return seq, jpeg
+
+            h, w = frame.shape[:2]
+            if width < w:
+                frame = cv2.resize(frame, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                return seq, jpeg
+            jpeg = buffer.tobytes()
+            self.encoded[key] = (seq, jpeg)
+            return seq, jpeg
+
+    def start(self):
+        """Запуск HTTP-сервера в фоновом потоке."""
+        if self.server:
+            return
+        self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Просмотр MJPEG доступен на http://{self.host}:{self.port}/")
+
+    def stop(self):
+        """Остановка HTTP-сервера."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _viewer_connected(self, camera_index, width, delta):
+        key = (camera_index, width)
+        with self.lock:
+            viewers = self.viewers.get(key, 0) + delta
+            if viewers > 0:
+                self.viewers[key] = viewers
+                return
+            # У размера не осталось зрителей - освобождаем его закодированный кадр
+            self.viewers.pop(key, None)
+            self.encoded.pop(key, None)
+            self.encode_locks.pop(key, None)
+
+    def _make_handler(self):
+        preview = self
+
+        class PreviewHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(f"Preview {self.address_string()}: {format % args}")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                query = parse_qs(url.query)
+                try:
+                    width = int(query.get('width', [preview.default_width])[0])
+                    width = max(32, min(width, 4096))
+                    if parts == ['']:
+                        self._send_index(width)
+                    elif len(parts) == 2 and parts[0] in ('stream', 'snapshot'):
+                        camera_index = int(parts[1])
+                        if parts[0] == 'stream':
+                            self._send_stream(camera_index, width)
+                        else:
+                            self._send_snapshot(camera_index, width)
+                    else:
+                        self.send_error(404)
+                except ValueError:
+                    self.send_error(400)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _send_index(self, width):
+                cameras = sorted(preview.mailboxes.keys())
+                items = "".join(
+                    f'<div><h3>{html.escape(preview.camera_names.get(i, f"Camera {i + 1}"))}</h3>'
+                    f'<img src="/stream/{i}?width={width}"></div>'
+                    for i in cameras
+                )
+                body = f"<html><head><meta charset='utf-8'><title>AprilTag</title></head><body>{items}</body></html>"
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_snapshot(self, camera_index, width):
+                preview._viewer_connected(camera_index, width, 1)
+                try:
+                    _, jpeg = preview.get_jpeg(camera_index, width)
+                finally:
+                    preview._viewer_connected(camera_index, width, -1)
+                if jpeg is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(jpeg)))
+                self.end_headers()
+                self.wfile.write(jpeg)
+
+            def _send_stream(self, camera_index, width):
+                mailbox = preview.mailboxes.get(camera_index)
+                if mailbox is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+
+                preview._viewer_connected(camera_index, width, 1)
+                try:
+                    last_seq = 0
+                    while preview.server:
+                        seq, _ = mailbox.wait_for_newer(last_seq, timeout=1.0)
+                        if seq <= last_seq:
+                            continue
+                        last_seq, jpeg = preview.get_jpeg(camera_index, width)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                finally:
+                    preview._viewer_connected(camera_index, width, -1)
+
+        return PreviewHandler
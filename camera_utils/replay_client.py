@@ -0,0 +1,154 @@
+import cv2
+import time
+import threading
+import numpy as np
+from .frame_recorder import read_recording
+from logger_setup import logger
+from diagnostics.tracing import tracer
+
+# Наибольшая пауза между снимками при воспроизведении в исходном темпе (сек):
+# перерывы записи (перезапуск сервиса, ночь) сокращаются до нее
+MAX_REPLAY_GAP = 5.0
+
+class ReplayClient:
+    """Клиент, воспроизводящий записанные снимки вместо камеры.
+
+    Повторяет интерфейс SnapshotClient. В режиме 'original' снимки выдаются
+    с исходными интервалами (перерывы длиннее MAX_REPLAY_GAP сокращаются), в режиме 'max' - сразу после того, как обработчик
+    забрал предыдущий кадр (замер пропускной способности конвейера).
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config.replay.path
+        self.speed = config.replay.speed
+        self.loop = config.replay.loop
+
+        self.last_jpeg = None
+        self.last_capture_time = 0
+        self.frame_count = 0
+        self.lock = threading.Lock()
+        self.running = False
+        self.stop_event = threading.Event()  # Прерывает ожидание следующего снимка при остановке
+        self.thread = None
+        self.new_frame_event = threading.Event()
+        self.frame_callback = None  # Уведомление планировщика обработки о новом снимке
+        self.frame_taken_event = threading.Event()
+
+        # Статистика
+        self.stats = {
+            'replayed_frames': 0,
+            'replay_fps': 0.0
+        }
+
+    def start(self):
+        """Запуск воспроизведения."""
+        if self.running:
+            return
+
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._replay_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Воспроизведение {self.path} для {self.config.name} (скорость: {self.speed})")
+
+    def stop(self):
+        """Остановка воспроизведения."""
+        self.running = False
+        self.stop_event.set()
+        self.frame_taken_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=3.0)
+        logger.info(f"Воспроизведение остановлено для {self.config.name}")
+
+    def _replay_loop(self):
+        """Основной цикл воспроизведения."""
+        while self.running:
+            start_time = time.monotonic()
+            first_timestamp = None
+            previous_timestamp = None
+            skipped = 0.0  # Сокращенная длительность перерывов записи
+            played = 0
+
+            try:
+                for _, timestamp, data in read_recording(self.path):
+                    if not self.running:
+                        break
+
+                    if self.speed == 'max':
+                        # Ждем, пока обработчик заберет предыдущий кадр
+                        while self.running and self.frame_count and not self.frame_taken_event.wait(0.5):
+                            pass
+                    else:
+                        if first_timestamp is None:
+                            first_timestamp = previous_timestamp = timestamp
+                        skipped += max(0.0, timestamp - previous_timestamp - MAX_REPLAY_GAP)
+                        previous_timestamp = timestamp
+                        delay = start_time + (timestamp - first_timestamp) - skipped - time.monotonic()
+                        if delay > 0 and self.stop_event.wait(delay):
+                            break
+
+                    # Снимок передается обработчику как есть, декодирует он сам
+                    capture_time = time.monotonic()
+                    tracer.begin(self.config.index, self.frame_count + 1, capture_time)
+                    with self.lock:
+                        self.frame_taken_event.clear()
+                        self.last_jpeg = data
+                        self.last_capture_time = capture_time
+                        self.frame_count += 1
+                    played += 1
+                    self.stats['replayed_frames'] += 1
+                    self.new_frame_event.set()
+                    if self.frame_callback:
+                        self.frame_callback()
+
+            except Exception as e:
+                logger.error(f"Ошибка воспроизведения {self.path}: {e}")
+                self.running = False
+                break
+
+            elapsed = time.monotonic() - start_time
+            if played and elapsed > 0:
+                self.stats['replay_fps'] = played / elapsed
+            logger.info(
+                f"{self.config.name}: воспроизведено {played} кадров за {elapsed:.2f}с "
+                f"({self.stats['replay_fps']:.1f} FPS)"
+            )
+
+            if not self.loop:
+                break
+
+    def get_jpeg(self):
+        """Последний снимок без декодирования: (номер, time.monotonic() выдачи, байты JPEG) или None."""
+        with self.lock:
+            if self.last_jpeg is None:
+                return None
+            self.frame_taken_event.set()
+            return self.frame_count, self.last_capture_time, self.last_jpeg
+
+    def release_jpeg(self, data):
+        """Снимки не хранятся в переиспользуемых буферах - освобождать нечего."""
+
+    def get_frame(self):
+        """Получение последнего кадра (декодируется при каждом вызове)."""
+        snapshot = self.get_jpeg()
+        if snapshot is None:
+            return None
+        return cv2.imdecode(np.frombuffer(snapshot[2], dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def wait_for_new_frame(self, timeout=None):
+        """Ожидание нового кадра."""
+        return self.new_frame_event.wait(timeout)
+
+    def clear_new_frame_event(self):
+        """Сброс события нового кадра."""
+        self.new_frame_event.clear()
+
+    def is_connected(self):
+        """Проверка наличия воспроизводимых кадров."""
+        with self.lock:
+            return self.last_jpeg is not None and (time.monotonic() - self.last_capture_time) < 5.0
+
+    def get_stats(self):
+        """Получение статистики."""
+        return self.stats.copy()
@@ -0,0 +1,203 @@
+# result_bus.py
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from .detection_state import CameraDetection
+from logger_setup import logger
+
+# Политики переполнения очереди подписчика
+POLICIES = ('drop_oldest', 'drop_newest', 'latest')
+
+
+@dataclass(frozen=True)
+class DetectionEvent:
+    """Событие шины: результат обработки снимка камеры."""
+    camera_index: int
+    camera_name: str
+    detection: CameraDetection
+    changed: bool     # Набор тегов камеры изменился
+    time: float       # time.time() публикации
+
+    def to_dict(self):
+        """Представление для сериализации в JSON."""
+        return {
+            'time': round(self.time, 3),
+            'camera': self.camera_index,
+            'name': self.camera_name,
+            'seq': self.detection.seq,
+            'tags': list(self.detection.tags),
+            'corners': [[list(point) for point in corners] for corners in self.detection.corners],
+            'changed': self.changed
+        }
+
+
+class Subscription:
+    """
+    Подписчик шины: ограниченная очередь событий и поток доставки в приемник.
+
+    Политики переполнения: drop_oldest - вытесняется самое старое событие,
+    drop_newest - отбрасывается новое, latest - хранится только последнее
+    событие каждой камеры (промежуточные заменяются и учитываются отдельно
+    от потерь); при latest queue_size ограничивает число камер в очереди.
+    """
+
+    def __init__(self, sink, name, queue_size=256, policy='drop_oldest', changes_only=False):
+        """
+        Args:
+            sink: Приемник с методами handle(event) и close().
+            name (str): Имя подписчика (для логов и статистики).
+            queue_size (int): Наибольшее число событий в очереди.
+            policy (str): Политика переполнения очереди (POLICIES).
+            changes_only (bool): Получать только события с изменением набора тегов.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Некорректная политика очереди: {policy}")
+        self.sink = sink
+        self.name = name
+        self.queue_size = max(1, queue_size)
+        self.policy = policy
+        self.changes_only = changes_only
+
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.latest = {}
+        self.running = True
+        self.delivered = 0
+        self.dropped = 0   # Потерянные события
+        self.replaced = 0  # Замененные более новым событием той же камеры (latest)
+        self.errors = 0
+        self.thread = threading.Thread(target=self._deliver_loop, name=f'sink-{name}', daemon=True)
+        self.thread.start()
+
+    def offer(self, event):
+        """Постановка события в очередь без ожидания (вызывается издателем)."""
+        if self.changes_only and not event.changed:
+            return
+        with self.condition:
+            if self.policy == 'latest':
+                if self.latest.pop(event.camera_index, None) is not None:
+                    self.replaced += 1
+                elif len(self.latest) >= self.queue_size:
+                    # Очередь заполнена другими камерами - вытесняется самое давнее событие
+                    self.latest.pop(next(iter(self.latest)))
+                    self.dropped += 1
+                self.latest[event.camera_index] = event
+            elif len(self.queue) < self.queue_size:
+                self.queue.append(event)
+            elif self.policy == 'drop_oldest':
+                self.queue.popleft()
+                self.queue.append(event)
+                self.dropped += 1
+            else:
+                self.dropped += 1
+                return
+            self.condition.notify()
+
+    def _take(self):
+        """Следующее событие или None после остановки."""
+        with self.condition:
+            while self.running and not self.queue and not self.latest:
+                self.condition.wait()
+            if not self.running:
+                return None
+            if self.queue:
+                return self.queue.popleft()
+            index = next(iter(self.latest))
+            return self.latest.pop(index)
+
+    def _deliver_loop(self):
+        failing = False
+        while True:
+            event = self._take()
+            if event is None:
+                return
+            try:
+                self.sink.handle(event)
+                self.delivered += 1
+                if failing:
+                    failing = False
+                    logger.info(f"Приемник результатов {self.name} восстановлен")
+            except Exception as e:
+                self.errors += 1
+                # Ошибка пишется в лог один раз до восстановления приемника
+                if not failing:
+                    failing = True
+                    logger.warning(f"Ошибка приемника результатов {self.name}: {e}")
+
+    def close(self, timeout=2.0):
+        """Остановка доставки и закрытие приемника (необработанные события отбрасываются)."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        try:
+            self.sink.close()
+        except Exception as e:
+            logger.warning(f"Ошибка закрытия приемника результатов {self.name}: {e}")
+
+    def get_stats(self):
+        """Счетчики доставки: delivered, dropped, replaced, errors, queued."""
+        with self.condition:
+            return {
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'replaced': self.replaced,
+                'errors': self.errors,
+                'queued': len(self.queue) + len(self.latest)
+            }
+
+
+class ResultBus:
+    """
+    Шина результатов детекции (публикация-подписка внутри процесса).
+
+    Публикация только ставит событие в очереди подписчиков и никогда не ждет
+    приемники: медленный приемник теряет события по своей политике
+    переполнения, не задерживая детекцию.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = ()  # Подмена кортежа при подписке: публикация без блокировки
+
+    def subscribe(self, sink, name=None, queue_size=256, policy='drop_oldest', changes_only=False):
+        """
+        Подписка приемника на события шины.
+
+        Returns:
+            Subscription: Подписка (для отписки и статистики).
+        """
+        subscription = Subscription(
+            sink, name or type(sink).__name__, queue_size, policy, changes_only
+        )
+        with self.lock:
+            self.subscriptions = self.subscriptions + (subscription,)
+        logger.info(f"Приемник результатов {subscription.name} подключен (очередь {queue_size}, {policy})")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Отписка и закрытие приемника."""
+        with self.lock:
+            self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
+        subscription.close()
+
+    def publish(self, camera_index, camera_name, detection, changed):
+        """Публикация результата камеры всем подписчикам."""
+        subscriptions = self.subscriptions
+        if not subscriptions:
+            return
+        event = DetectionEvent(camera_index, camera_name, detection, changed, time.time())
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def close(self):
+        """Отписка и закрытие всех приемников."""
+        for subscription in self.subscriptions:
+            self.unsubscribe(subscription)
+
+    def get_stats(self):
+        """Статистика доставки по имени подписчика."""
+        return {s.name: s.get_stats() for s in self.subscriptions}
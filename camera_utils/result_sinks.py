@@ -0,0 +1,118 @@
+# result_sinks.py
+import os
+import json
+import time
+import socket
+
+from .detection_state import DetectedTag
+from logger_setup import logger
+
+
+class JsonLinesSink:
+    """Запись событий в файл: одно событие JSON на строку."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def handle(self, event):
+        self.file.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink:
+    """
+    Отправка событий JSON-строками на локальный сокет.
+
+    UDP - по датаграмме на событие; TCP - поток строк через постоянное
+    соединение, которое восстанавливается не чаще раза в reconnect_delay сек
+    (события до восстановления отбрасываются).
+    """
+
+    def __init__(self, host, port, protocol='udp', timeout=1.0, reconnect_delay=5.0):
+        self.address = (host, port)
+        self.protocol = protocol
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.sock = None
+        self.retry_at = 0.0
+        if protocol == 'udp':
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _connect(self):
+        """Подключение TCP (не чаще раза в reconnect_delay)."""
+        now = time.monotonic()
+        if now < self.retry_at:
+            raise ConnectionError(f"нет соединения с {self.address[0]}:{self.address[1]}")
+        self.retry_at = now + self.reconnect_delay
+        self.sock = socket.create_connection(self.address, timeout=self.timeout)
+        logger.info(f"Приемник результатов подключен к {self.address[0]}:{self.address[1]}")
+
+    def handle(self, event):
+        data = (json.dumps(event.to_dict(), ensure_ascii=False) + "\n").encode('utf-8')
+        if self.protocol == 'udp':
+            self.sock.sendto(data, self.address)
+            return
+        if self.sock is None:
+            self._connect()
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            self.sock.close()
+            self.sock = None
+            raise
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class ModbusSink:
+    """
+    Дублирование тегов камеры в дополнительную цель Modbus.
+
+    Запись выполняется через ModbusHandler сервиса; приемник ждет ее
+    завершения, поэтому при медленном сервере события копятся в очереди
+    подписчика, а не задерживают детекцию.
+    """
+
+    def __init__(self, modbus_handler, modbus_config, camera_index, timeout=5.0):
+        self.modbus_handler = modbus_handler
+        self.modbus_config = modbus_config
+        self.camera_index = camera_index
+        self.timeout = timeout
+
+    def handle(self, event):
+        if event.camera_index != self.camera_index:
+            return
+        tags = [DetectedTag(tag_id=tag_id, camera_index=event.camera_index) for tag_id in event.detection.tags]
+        future = self.modbus_handler.send_tags(tags, self.modbus_config)
+        if not future.result(timeout=self.timeout):
+            raise ConnectionError(
+                f"запись в {self.modbus_config.modbus_server_ip}:{self.modbus_config.register} не выполнена"
+            )
+
+    def close(self):
+        pass
+
+
+def create_sink(config, modbus_handler):
+    """
+    Создание приемника по конфигурации ResultSinkConfig.
+
+    Returns:
+        Приемник с методами handle(event) и close().
+    """
+    if config.type == 'jsonl':
+        return JsonLinesSink(config.path)
+    if config.type in ('udp', 'tcp'):
+        return SocketSink(config.host, config.port, config.type)
+    if config.type == 'modbus':
+        return ModbusSink(modbus_handler, config.modbus, config.camera)
+    raise ValueError(f"Неизвестный тип приемника результатов: {config.type}")
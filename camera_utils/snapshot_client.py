@@ -4,34 +4,88 @@ import threading
 import numpy as np
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
+from urllib.parse import urlsplit
 import base64
+from .digest_auth import DigestAuth
+from .frame_recorder import FrameRecorder
+from .circuit_breaker import CircuitBreaker
+from .snapshot_scheduler import SnapshotScheduler
 from logger_setup import logger
+from diagnostics.tracing import tracer
+
+# Буферов тела ответа на камеру: опубликованный снимок, снимок у обработчика и принимаемый
+MAX_BUFFERS = 3
 
 class SnapshotClient:
     """Клиент для получения снимков с камеры с синхронизацией."""
     
-    def __init__(self, config):
+    def __init__(self, config, scheduler=None):
+        """
+        Args:
+            config (CameraConfig): Конфигурация камеры.
+            scheduler (SnapshotScheduler): Общее расписание запросов камер;
+                без него камера опрашивается без сдвига фазы.
+        """
         self.config = config
+        self.scheduler = scheduler or SnapshotScheduler()
         self.url = config.snapshot_url
         self.username = config.username
         self.password = config.password
         self.interval = config.interval
         self.timeout = config.timeout
         
-        self.last_frame = None
-        self.last_frame_time = 0
-        self.frame_count = 0
+        # Аутентификация: basic - заголовок Basic; digest - Digest с сохраненным nonce;
+        # auto - Basic, пока камера не ответит вызовом Digest
+        self.auth = config.auth
+        self.digest = DigestAuth(self.username, self.password)
+        self.basic_header = None
+        if self.username and self.password:
+            credentials = base64.b64encode(f"{self.username}:{self.password}".encode()).decode()
+            self.basic_header = f"Basic {credentials}"
+        parts = urlsplit(self.url)
+        self.request_uri = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        
+        # Последний снимок хранится в виде JPEG: декодирует только обработчик
+        # и только самый свежий снимок (перезаписанные не декодируются)
+        self.last_jpeg = None           # memoryview данных во внутреннем буфере
+        self.last_capture_time = 0      # time.monotonic() запроса снимка
+        self.frame_count = 0            # Порядковый номер последнего снимка
         self.error_count = 0
         self.lock = threading.Lock()
         self.running = False
         self.thread = None
         self.new_frame_event = threading.Event()  # Событие для новых кадров
+        self.frame_callback = None  # Уведомление планировщика обработки о новом снимке
+        
+        # Простой: без активности на посту камера опрашивается с интервалом idle_interval;
+        # выход из простоя прерывает ожидание, и снимок запрашивается сразу
+        self.idle = False
+        self.wake_event = threading.Event()
+        
+        # Тело ответа читается в переиспользуемые буферы (размер по Content-Length);
+        # опубликованный буфер и буферы, выданные обработчику, не перезаписываются
+        self.buffers = []
+        self.buffer_leases = {}  # id(буфер) -> число читателей
+        
+        # Автомат защиты: недоступная камера опрашивается с нарастающей паузой
+        self.breaker = CircuitBreaker(
+            failure_threshold=config.failure_threshold,
+            base_delay=max(config.interval, config.timeout),
+            max_delay=config.max_retry_delay
+        )
+        
+        # Кольцевая запись сырых снимков (для воспроизведения инцидентов)
+        self.recorder = None
+        if config.recording:
+            self.recorder = FrameRecorder(config.recording.path, config.recording.size_mb)
         
         # Статистика
         self.stats = {
             'total_requests': 0,
             'successful_requests': 0,
             'failed_requests': 0,
+            'auth_challenges': 0,
+            'idle_periods': 0,
             'avg_response_time': 0
         }
         
@@ -41,6 +95,7 @@ class SnapshotClient:
             return
             
         self.running = True
+        self.scheduler.register(self.config.index)
         self.thread = threading.Thread(target=self._fetch_loop, daemon=True)
         self.thread.start()
         logger.info(f"Snapshot клиент запущен для {self.config.name} (интервал: {self.interval}с)")
@@ -48,86 +103,165 @@ class SnapshotClient:
     def stop(self):
         """Остановка получения снимков."""
         self.running = False
+        self.wake_event.set()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=3.0)
+        self.scheduler.unregister(self.config.index)
+        if self.recorder:
+            self.recorder.close()
         logger.info(f"Snapshot клиент остановлен для {self.config.name}")
         
+    def _sleep_until(self, deadline):
+        """Ожидание момента time.monotonic() с проверкой остановки (прерывается выходом из простоя)."""
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.wake_event.wait(min(remaining, 0.5)):
+                self.wake_event.clear()
+                return
+    
+    @property
+    def current_interval(self):
+        """Текущий период опроса: рабочий или в простое."""
+        return self.config.idle_interval if self.idle else self.interval
+    
+    def set_idle(self, idle):
+        """
+        Переход в простой (редкий опрос) или возврат к рабочему интервалу.
+        
+        Args:
+            idle (bool): True - опрашивать с интервалом idle_interval.
+        """
+        if idle == self.idle:
+            return
+        self.idle = idle
+        if idle:
+            self.stats['idle_periods'] += 1
+            logger.info(f"{self.config.name}: нет активности, опрос раз в {self.config.idle_interval}с")
+        else:
+            self.wake_event.set()
+            logger.info(f"{self.config.name}: активность на посту, опрос раз в {self.interval}с")
+    
     def _fetch_loop(self):
         """Основной цикл получения снимков."""
-        next_time = time.time()
+        # Первый запрос - в слоте камеры, чтобы камеры не опрашивались одновременно
+        next_time = self.scheduler.next_slot(self.config.index, self.current_interval)
         
         while self.running:
             try:
-                start_time = time.time()
+                self._sleep_until(next_time)
+                if not self.running:
+                    break
+                
+                if not self.breaker.allow_request():
+                    # Камера недоступна - ждем пробной попытки в ее слоте
+                    self._sleep_until(time.monotonic() + self.breaker.retry_delay())
+                    next_time = self.scheduler.next_slot(self.config.index, self.current_interval)
+                    continue
+                
+                capture_time = time.monotonic()
                 self.stats['total_requests'] += 1
                 
                 # Получаем снимок
-                frame = self._fetch_snapshot()
+                img_data = self._fetch_snapshot()
                 
-                if frame is not None:
+                if img_data is not None:
+                    # Трасса снимка (для выборки) открывается до уведомления обработчика
+                    trace = tracer.begin(self.config.index, self.frame_count + 1, capture_time)
+                    tracer.span(trace, 'fetch', bytes=len(img_data))
                     with self.lock:
-                        self.last_frame = frame
-                        self.last_frame_time = time.time()
+                        self.last_jpeg = img_data
+                        self.last_capture_time = capture_time
                         self.frame_count += 1
                     self.stats['successful_requests'] += 1
+                    if self.breaker.record_success():
+                        logger.info(f"{self.config.name}: связь восстановлена после {self.error_count} ошибок")
                     self.error_count = 0
                     self.new_frame_event.set()  # Сигнализируем о новом кадре
+                    if self.frame_callback:
+                        self.frame_callback()
                 else:
                     self.error_count += 1
                     self.stats['failed_requests'] += 1
-                    if self.error_count % 10 == 0:
-                        logger.warning(f"{self.config.name}: {self.error_count} ошибок подряд")
+                    retry_delay = self.breaker.record_failure()
+                    if retry_delay is not None:
+                        logger.warning(
+                            f"{self.config.name}: камера недоступна ({self.error_count} ошибок подряд), "
+                            f"повтор через {retry_delay:.1f}с"
+                        )
                 
                 # Обновляем статистику
-                response_time = time.time() - start_time
+                now = time.monotonic()
+                response_time = now - capture_time
                 self.stats['avg_response_time'] = (
                     self.stats['avg_response_time'] * 0.9 + response_time * 0.1
                 )
                 
-                # Точное соблюдение интервала
-                next_time += self.interval
-                sleep_time = next_time - time.time()
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                else:
-                    next_time = time.time()
-                    logger.debug(f"{self.config.name}: отставание {abs(sleep_time):.3f}с")
+                # Следующий слот камеры; пропущенные из-за долгого запроса слоты не догоняются
+                lag = now - (next_time + self.current_interval)
+                if lag > 0:
+                    logger.debug(f"{self.config.name}: отставание {lag:.3f}с")
+                next_time = self.scheduler.next_slot(self.config.index, self.current_interval, now)
                     
             except Exception as e:
                 logger.error(f"Критическая ошибка в Snapshot клиенте {self.config.name}: {e}")
                 time.sleep(1)
+                next_time = self.scheduler.next_slot(self.config.index, self.current_interval)
     
+    def _authorization(self):
+        """Заголовок Authorization для очередного запроса (или None)."""
+        if not (self.username and self.password):
+            return None
+        if self.auth == 'basic' or (self.auth == 'auto' and not self.digest.ready):
+            return self.basic_header
+        # Digest: с сохраненным nonce - сразу, иначе первый запрос получит вызов 401
+        return self.digest.header('GET', self.request_uri) if self.digest.ready else None
+
+    def _open(self):
+        """
+        Запрос снимка с аутентификацией.
+
+        На ответ 401 с вызовом Digest nonce сохраняется и запрос повторяется
+        один раз; следующие запросы используют сохраненный nonce без 401.
+        """
+        for attempt in range(2):
+            request = Request(self.url)
+            authorization = self._authorization()
+            if authorization:
+                request.add_header("Authorization", authorization)
+            request.add_header("User-Agent", "AprilTag-Detector/2.0")
+            try:
+                return urlopen(request, timeout=self.timeout)
+            except HTTPError as e:
+                if e.code != 401 or attempt or self.auth == 'basic' or not self.password:
+                    raise
+                if not self.digest.update(e.headers.get_all('WWW-Authenticate') or []):
+                    raise
+                self.stats['auth_challenges'] += 1
+                if self.auth == 'auto' and self.stats['auth_challenges'] == 1:
+                    logger.info(f"{self.config.name}: камера требует Digest-аутентификацию")
+
     def _fetch_snapshot(self):
         """Получение одного снимка с камеры."""
         try:
-            # Создаем запрос с базовой аутентификацией
-            request = Request(self.url)
-            
-            # Добавляем Basic Auth заголовок
-            if self.username and self.password:
-                credentials = base64.b64encode(
-                    f"{self.username}:{self.password}".encode()
-                ).decode()
-                request.add_header("Authorization", f"Basic {credentials}")
-            
-            # Добавляем User-Agent
-            request.add_header("User-Agent", "AprilTag-Detector/2.0")
-            
             # Выполняем запрос
-            response = urlopen(request, timeout=self.timeout)
+            response = self._open()
             
             if response.status == 200:
-                # Читаем данные
-                img_data = response.read()
+                # Читаем данные в свободный буфер
+                img_data = self._read_body(response)
+                if img_data is None:
+                    return None
                 
-                # Конвертируем в numpy array
-                img_array = np.frombuffer(img_data, dtype=np.uint8)
-                frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                if self.recorder:
+                    self.recorder.append(img_data, time.time())
                 
-                if frame is not None:
-                    return frame
-                else:
-                    logger.debug(f"{self.config.name}: ошибка декодирования изображения")
+                # Декодирует обработчик (любой формат cv2.imdecode: JPEG, PNG, BMP);
+                # неразборчивые данные учитываются им в decode_errors
+                if len(img_data):
+                    return img_data
+                logger.debug(f"{self.config.name}: пустой ответ")
             else:
                 logger.debug(f"{self.config.name}: HTTP {response.status}")
                 
@@ -143,12 +277,81 @@ class SnapshotClient:
             
         return None
     
-    def get_frame(self):
-        """Получение последнего кадра."""
+    def _acquire_buffer(self, size):
+        """Свободный буфер не меньше size байт: не опубликованный и не выданный обработчику."""
         with self.lock:
-            if self.last_frame is not None:
-                return self.last_frame.copy()
-        return None
+            published = self.last_jpeg.obj if self.last_jpeg is not None else None
+            for i, buffer in enumerate(self.buffers):
+                if buffer is published or self.buffer_leases.get(id(buffer)):
+                    continue
+                if len(buffer) < size:
+                    # Запас на колебания размера снимков
+                    buffer = self.buffers[i] = bytearray(size + size // 4)
+                return buffer
+            buffer = bytearray(size + size // 4)
+            if len(self.buffers) < MAX_BUFFERS:
+                self.buffers.append(buffer)
+            return buffer  # Все буферы заняты - временный буфер вне пула
+
+    def _read_body(self, response):
+        """
+        Чтение тела ответа через readinto в переиспользуемый буфер.
+
+        Returns:
+            memoryview: Данные снимка или None, если тело получено не полностью.
+        """
+        length = response.headers.get('Content-Length')
+        if not length or not length.isdigit():
+            # Без Content-Length размер заранее неизвестен - обычное чтение
+            return memoryview(response.read())
+
+        expected = int(length)
+        view = memoryview(self._acquire_buffer(expected))[:expected]
+        size = 0
+        while size < expected:
+            count = response.readinto(view[size:])
+            if not count:
+                logger.debug(f"{self.config.name}: получено {size} из {expected} байт")
+                return None
+            size += count
+        return view
+
+    def get_jpeg(self):
+        """
+        Последний снимок без декодирования.
+        
+        Данные - представление во внутреннем буфере клиента; буфер не
+        перезаписывается, пока его не освободит release_jpeg().
+        
+        Returns:
+            tuple: (порядковый номер, time.monotonic() запроса, данные JPEG) или None.
+        """
+        with self.lock:
+            if self.last_jpeg is None:
+                return None
+            key = id(self.last_jpeg.obj)
+            self.buffer_leases[key] = self.buffer_leases.get(key, 0) + 1
+            return self.frame_count, self.last_capture_time, self.last_jpeg
+    
+    def release_jpeg(self, data):
+        """Освобождение буфера снимка, полученного из get_jpeg()."""
+        with self.lock:
+            key = id(data.obj)
+            count = self.buffer_leases.get(key, 0) - 1
+            if count > 0:
+                self.buffer_leases[key] = count
+            else:
+                self.buffer_leases.pop(key, None)
+    
+    def get_frame(self):
+        """Получение последнего кадра (декодируется при каждом вызове)."""
+        snapshot = self.get_jpeg()
+        if snapshot is None:
+            return None
+        try:
+            return cv2.imdecode(np.frombuffer(snapshot[2], dtype=np.uint8), cv2.IMREAD_COLOR)
+        finally:
+            self.release_jpeg(snapshot[2])
     
     def wait_for_new_frame(self, timeout=None):
         """Ожидание нового кадра."""
@@ -160,9 +363,14 @@ class SnapshotClient:
     
     def is_connected(self):
         """Проверка подключения."""
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return False
         with self.lock:
-            return self.last_frame is not None and (time.time() - self.last_frame_time) < 5.0
+            return self.last_jpeg is not None and (time.monotonic() - self.last_capture_time) < 5.0
     
     def get_stats(self):
         """Получение статистики."""
-        return self.stats.copy()
\ No newline at end of file
+        stats = self.stats.copy()
+        stats['idle'] = self.idle
+        stats.update(self.breaker.get_stats())
+        return stats
\ No newline at end of file
@@ -0,0 +1,66 @@
+# snapshot_scheduler.py
+import math
+import time
+import threading
+
+
+class SnapshotScheduler:
+    """
+    Общее расписание запросов снимков для всех камер.
+
+    Камеры с одинаковым интервалом без расписания опрашиваются одновременно,
+    и нагрузка (запрос, декодирование, детекция) приходит пиками. Планировщик
+    назначает каждой камере сдвиг фазы внутри ее периода, равномерно по числу
+    зарегистрированных камер. Моменты запросов отсчитываются от общей точки
+    time.monotonic(), поэтому не накапливают дрейф.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.t0 = time.monotonic()
+        self.cameras = []      # Индексы камер в порядке фаз
+        self.phases = {}       # Индекс камеры -> доля периода [0, 1)
+
+    def register(self, camera_index):
+        """Добавление камеры в расписание (фазы всех камер пересчитываются)."""
+        with self.lock:
+            if camera_index not in self.cameras:
+                self.cameras.append(camera_index)
+                self.cameras.sort()
+                self._update_phases()
+
+    def unregister(self, camera_index):
+        """Удаление камеры из расписания."""
+        with self.lock:
+            if camera_index in self.cameras:
+                self.cameras.remove(camera_index)
+                self._update_phases()
+
+    def _update_phases(self):
+        count = len(self.cameras)
+        self.phases = {index: pos / count for pos, index in enumerate(self.cameras)}
+
+    def phase(self, camera_index):
+        """Сдвиг фазы камеры в долях периода."""
+        with self.lock:
+            return self.phases.get(camera_index, 0.0)
+
+    def next_slot(self, camera_index, interval, now=None):
+        """
+        Ближайший момент запроса камеры после now.
+
+        Args:
+            camera_index (int): Индекс камеры.
+            interval (float): Период опроса камеры (сек).
+            now (float): Текущее время time.monotonic().
+
+        Returns:
+            float: Время time.monotonic() следующего запроса.
+        """
+        if now is None:
+            now = time.monotonic()
+        start = self.t0 + self.phase(camera_index) * interval
+        if interval <= 0:
+            return now
+        periods = math.floor((now - start) / interval) + 1
+        return start + max(periods, 0) * interval
@@ -2,13 +2,16 @@
 import cv2
 from logger_setup import logger
 
+# ID тегов, передаваемые по умолчанию (если в конфигурации камеры не задан tag_ids)
+DEFAULT_TAG_IDS = (1, 2, 3, 4)
+
 def draw_tag(frame, tag):
     """
     Рисует контур и центр AprilTag на кадре.
 
     Args:
         frame (numpy.ndarray): Кадр изображения.
-        tag (AprilTag): Объект тега с координатами и центром.
+        tag (TagDetection): Объект тега с координатами и центром.
     """
     corners = tag.corners.astype(int)
     for j in range(4):
@@ -28,7 +31,7 @@ def calculate_tag_area(tag):
     Вычисляет площадь четырехугольника, образованного углами тега.
 
     Args:
-        tag (AprilTag): Объект тега с координатами углов.
+        tag (TagDetection): Объект тега с координатами углов.
 
     Returns:
         float: Площадь тега.
@@ -41,30 +44,29 @@ def calculate_tag_area(tag):
         (y[0] * x[1] + y[1] * x[2] + y[2] * x[3] + y[3] * x[0])
     )
 
-def process_frame(frame, detector, min_tag_area=100.0, max_tag_area=10000.0, camera_name="Unknown"):
+def select_largest_tags(tags, min_tag_area=100.0, max_tag_area=10000.0, camera_name="Unknown",
+                        tag_ids=DEFAULT_TAG_IDS):
     """
-    Обрабатывает кадр: конвертирует в оттенки серого, детектирует AprilTags,
-    выбирает самые крупные теги с ID 1-4 и рисует их на кадре.
+    Выбирает самые крупные теги с разрешенными ID, прошедшие фильтр по площади.
 
     Args:
-        frame (numpy.ndarray): Исходный кадр изображения.
-        detector (AprilTagDetector): Объект детектора AprilTag.
+        tags (list[TagDetection]): Результаты детектора.
         min_tag_area (float): Минимальная площадь тега для фильтрации.
         max_tag_area (float): Максимальная площадь тега для фильтрации.
         camera_name (str): Название камеры для логирования.
+        tag_ids (Collection[int]): Разрешенные ID тегов; None - любые ID.
 
     Returns:
-        tuple: Кадр с отрисованными тегами и словарь с самыми крупными тегами по ID.
+        tuple: Словарь с самыми крупными тегами по ID и список строк с описанием найденных тегов.
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    tags = detector.detect(gray)
     largest_tags = {}
+    largest_areas = {}
 
     detected_tags_info = []  # Для сбора информации о найденных тегах
 
     for tag in tags:
         tag_id = tag.tag_id
-        if tag_id not in [1, 2, 3, 4]:
+        if tag_ids is not None and tag_id not in tag_ids:
             continue
         
         area = calculate_tag_area(tag)
@@ -76,11 +78,32 @@ def process_frame(frame, detector, min_tag_area=100.0, max_tag_area=10000.0, cam
             
         detected_tags_info.append(f"ID {tag_id} (площадь: {area:.1f})")
             
-        if (
-            tag_id not in largest_tags or
-            area > calculate_tag_area(largest_tags[tag_id])
-        ):
+        if tag_id not in largest_tags or area > largest_areas[tag_id]:
             largest_tags[tag_id] = tag
+            largest_areas[tag_id] = area
+
+    return largest_tags, detected_tags_info
+
+def annotate_tags(frame, tags, min_tag_area=100.0, max_tag_area=10000.0, camera_name="Unknown",
+                  tag_ids=DEFAULT_TAG_IDS):
+    """
+    Выбирает самые крупные теги с разрешенными ID из результатов детектора,
+    записывает их в лог и рисует на кадре.
+
+    Args:
+        frame (numpy.ndarray): Кадр, в системе координат которого заданы теги.
+        tags (list[TagDetection]): Результаты детектора.
+        min_tag_area (float): Минимальная площадь тега для фильтрации.
+        max_tag_area (float): Максимальная площадь тега для фильтрации.
+        camera_name (str): Название камеры для логирования.
+        tag_ids (Collection[int]): Разрешенные ID тегов; None - любые ID.
+
+    Returns:
+        tuple: Кадр с отрисованными тегами и словарь с самыми крупными тегами по ID.
+    """
+    largest_tags, detected_tags_info = select_largest_tags(
+        tags, min_tag_area, max_tag_area, camera_name, tag_ids
+    )
 
     # Логируем информацию о найденных тегах
     if detected_tags_info:
@@ -91,4 +114,25 @@ def process_frame(frame, detector, min_tag_area=100.0, max_tag_area=10000.0, cam
     for tag in largest_tags.values():
         draw_tag(frame, tag)
 
-    return frame, largest_tags
\ No newline at end of file
+    return frame, largest_tags
+
+def process_frame(frame, detector, min_tag_area=100.0, max_tag_area=10000.0, camera_name="Unknown",
+                  tag_ids=DEFAULT_TAG_IDS):
+    """
+    Обрабатывает кадр: конвертирует в оттенки серого, детектирует AprilTags,
+    выбирает самые крупные теги с разрешенными ID и рисует их на кадре.
+
+    Args:
+        frame (numpy.ndarray): Исходный кадр изображения.
+        detector: Детектор из create_detector (любой движок детекции).
+        min_tag_area (float): Минимальная площадь тега для фильтрации.
+        max_tag_area (float): Максимальная площадь тега для фильтрации.
+        camera_name (str): Название камеры для логирования.
+        tag_ids (Collection[int]): Разрешенные ID тегов; None - любые ID.
+
+    Returns:
+        tuple: Кадр с отрисованными тегами и словарь с самыми крупными тегами по ID.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    tags = detector.detect(gray)
+    return annotate_tags(frame, tags, min_tag_area, max_tag_area, camera_name, tag_ids)
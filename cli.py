@@ -1,7 +1,5 @@
 import time
 import logging
-from config_loader import ConfigLoader
-from camera_utils.camera_processing import CameraProcessor
 
 def setup_logging():
     logging.basicConfig(
@@ -13,6 +11,12 @@ def setup_logging():
     )
 
 def console_worker(config_path='config.yaml'):
+    # Обработка (cv2, numpy, pymodbus) и диагностика импортируются при запуске сервиса, а не при импорте модуля
+    from config_loader import ConfigLoader
+    from config_watcher import ConfigWatcher
+    from camera_utils.camera_processing import CameraProcessor
+    from diagnostics.profiler import install_signal_handlers
+
     setup_logging()
     logger = logging.getLogger(__name__)
     
@@ -20,9 +24,19 @@ def console_worker(config_path='config.yaml'):
         # Загрузка конфигурации
         config_loader = ConfigLoader(config_path)
         status_configs, camera_configs = config_loader.load()  
+        service_config = config_loader.load_service_config()
         
         # Инициализация процессора
-        processor = CameraProcessor(camera_configs, roi_file='roi/roi.xml')
+        processor = CameraProcessor(
+            camera_configs,
+            roi_file='roi/roi.xml',
+            preview_config=service_config.preview,
+            detection_workers=service_config.detection_workers,
+            detection_batch_size=service_config.detection_batch_size,
+            result_sinks=service_config.result_sinks,
+            tracing=service_config.tracing,
+            memory_watchdog=service_config.memory_watchdog
+        )
         
         # Запуск heartbeat для всех конфигураций
         processor.modbus_handler.start_heartbeat(status_configs)
@@ -31,21 +45,51 @@ def console_worker(config_path='config.yaml'):
         processor.start_processing()
         logger.info("Сервис запущен в консольном режиме")
         
+        # Профилирование без перезапуска: SIGUSR1 - профиль в logs/, SIGUSR2 - стеки потоков
+        install_signal_handlers(duration=service_config.profile_duration)
+        
+        # Применение изменений config.yaml без перезапуска
+        watcher = ConfigWatcher(config_path, processor.apply_config)
+        watcher.start()
+        
         try:
+            last_state = None
+            next_memory_report = time.monotonic() + 60
             while processor.is_running():
                 # В консольном режиме просто ждем и логируем обнаруженные теги
                 time.sleep(1)
                 
+                # Сообщаем о смене состояния готовности
+                readiness = processor.get_readiness()
+                if readiness['state'] != last_state:
+                    last_state = readiness['state']
+                    if last_state == 'ready':
+                        logger.info(f"Сервис готов: первые результаты записаны в Modbus через {readiness['ready_after']:.2f}с")
+                    else:
+                        logger.info(f"Состояние сервиса: {last_state}, ожидаются камеры: {', '.join(readiness['waiting'])}")
+                
+                # Раз в минуту - память процесса (если включено наблюдение memory_watchdog)
+                if time.monotonic() >= next_memory_report:
+                    next_memory_report = time.monotonic() + 60
+                    memory = processor.get_memory_stats()
+                    if memory and memory['rss_mb'] is not None:
+                        logger.info(
+                            f"Память: RSS {memory['rss_mb']:.0f} МБ (при запуске {memory['rss_start_mb']:.0f} МБ), "
+                            f"рост {memory['growth_mb_per_hour']:+.1f} МБ/ч, предупреждений {memory['growth_warnings']}"
+                        )
+                
                 # Логируем обнаруженные теги
-                for cam_idx, tags in processor.last_sent_tags.items():
-                    if tags:
-                        logger.info(f"Камера {cam_idx + 1}: Обнаружены теги {tags}")
+                _, states = processor.detection_state.snapshot()
+                for cam_idx, state in states.items():
+                    if state.tags:
+                        logger.info(f"Камера {cam_idx + 1}: Обнаружены теги {list(state.tags)}")
                     else:
                         logger.debug(f"Камера {cam_idx + 1}: Теги не обнаружены")
                         
         except KeyboardInterrupt:
             logger.info("Получен сигнал прерывания, останавливаю сервис...")
         finally:
+            watcher.stop()
             processor.stop_processing()
             logger.info("Сервис остановлен")
             
@@ -1,6 +1,7 @@
+import math
 import yaml
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from dataclasses import dataclass, field, fields, replace
+from typing import List, Dict, Any, Optional, Tuple
 
 @dataclass
 class ModbusStatusConfig:
@@ -13,7 +14,39 @@ class ModbusStatusConfig:
 class ModbusConfig:
     """Конфигурация Modbus для отправки тегов."""
     modbus_server_ip: str  # IP сервера Modbus
-    register: int          # Регистр для записи тегов
+    register: int          # Регистр для записи тегов (первый из register_count)
+    encoding: str = 'bitmask'  # bitmask - ID 1-16 в одном регистре; bitset - бит на ID 0..; list - число тегов и их ID
+    register_count: int = 1    # Число последовательных регистров (bitset, list)
+
+@dataclass
+class DetectorConfig:
+    """Профиль параметров детектора AprilTag."""
+    families: str = 'tag36h11'
+    nthreads: int = 2               # Меньше потоков для стабильности
+    quad_decimate: float = 1.0
+    quad_sigma: float = 0.0
+    refine_edges: int = 1
+    decode_sharpening: float = 0.25
+    backend: str = 'apriltag'       # Движок детекции: apriltag (pupil_apriltags) | aruco (cv2.aruco)
+    mode: str = 'single'            # single - один проход; two_stage - грубый поиск и точная детекция фрагментов;
+                                    # tiled - параллельная детекция на перекрывающихся плитках (nthreads потоков)
+    coarse_decimate: float = 4.0    # Прореживание грубого этапа (two_stage)
+    tile_size: int = 0              # Сторона плитки (tiled); 0 - по max_tag_area камеры
+    tile_overlap: int = 0           # Перекрытие плиток (tiled); 0 - по max_tag_area камеры
+    name: str = 'default'           # Имя профиля (для логов и тюнера)
+
+@dataclass
+class RecordingConfig:
+    """Кольцевая запись сырых снимков камеры на диск."""
+    path: str              # Файл кольцевого буфера
+    size_mb: float = 256.0  # Фиксированный бюджет диска
+
+@dataclass
+class ReplayConfig:
+    """Воспроизведение записанных снимков вместо опроса камеры."""
+    path: str                 # Файл, записанный RecordingConfig
+    speed: str = 'original'   # 'original' - исходный темп, 'max' - максимальная скорость
+    loop: bool = False        # Повторять запись по кругу
 
 @dataclass
 class CameraConfig:
@@ -27,19 +60,89 @@ class CameraConfig:
     modbus: ModbusConfig  # Без значения по умолчанию - должно быть ПЕРЕД полями с значениями по умолчанию
     interval: float = 0.25  # Интервал между снимками (сек)
     timeout: float = 2.0    # Таймаут запроса
+    auth: str = 'auto'      # Аутентификация: auto (Basic, Digest по вызову камеры) | basic | digest
+    failure_threshold: int = 3       # Ошибок подряд до перехода камеры в режим редкого опроса
+    max_retry_delay: float = 60.0    # Максимальная пауза между попытками (сек)
+    max_frame_age: float = 1.0       # Снимки старше (сек) отбрасываются без декодирования; 0 - без ограничения
+    priority: str = 'normal'         # Класс приоритета обработки: critical | normal | low
+    tag_ids: Optional[Tuple[int, ...]] = (1, 2, 3, 4)  # Передаваемые ID тегов; None - любые
+    batch: bool = False              # Пакетная детекция вместе с камерами того же профиля (малые ROI)
+    idle_after: float = 0.0          # Без тегов и движения дольше (сек) - редкий опрос; 0 - всегда рабочий интервал
+    idle_interval: float = 2.0       # Интервал между снимками в простое (сек)
+    motion_threshold: float = 3.0    # Движение: среднее изменение яркости уменьшенного ROI (0-255)
     min_tag_area: float = 100.0
     max_tag_area: float = 10000.0
+    detector: DetectorConfig = field(default_factory=DetectorConfig)
+    roi: Optional[Dict[str, int]] = None  # ROI {x, y, w, h}; если не задан - из roi.xml
+    recording: Optional[RecordingConfig] = None
+    replay: Optional[ReplayConfig] = None
+
+@dataclass
+class PreviewConfig:
+    """HTTP-просмотр обработанных кадров (MJPEG)."""
+    port: int = 8080
+    host: str = '0.0.0.0'
+    width: int = 640      # Ширина кадра по умолчанию
+    quality: int = 80     # Качество JPEG
+
+@dataclass
+class ResultSinkConfig:
+    """Приемник шины результатов детекции."""
+    type: str                       # jsonl | udp | tcp | modbus
+    name: str = ''                  # Имя для логов и статистики (по умолчанию - тип)
+    queue_size: int = 256           # Наибольшее число событий в очереди приемника
+    policy: str = 'drop_oldest'     # При переполнении: drop_oldest | drop_newest | latest (последнее по камере)
+    changes_only: bool = False      # Только события с изменением набора тегов
+    path: str = ''                  # Файл (jsonl)
+    host: str = '127.0.0.1'         # Адрес (udp, tcp)
+    port: int = 0
+    camera: int = 0                 # Индекс камеры, теги которой дублируются (modbus)
+    modbus: Optional[ModbusConfig] = None  # Цель записи (modbus)
+
+@dataclass
+class TracingConfig:
+    """Трассировка пути снимков (выгрузка в формате Chrome trace events)."""
+    sample_rate: float = 0.01        # Доля трассируемых снимков
+    path: str = 'logs/trace.json'    # Файл трасс (открывается в Perfetto / chrome://tracing)
+    max_events: int = 100000         # Наибольшее число хранимых событий (старые вытесняются)
+    export_interval: float = 30.0    # Период выгрузки в файл (сек)
+
+@dataclass
+class MemoryWatchdogConfig:
+    """Наблюдение за памятью: RSS и места выделений tracemalloc."""
+    interval: float = 300.0          # Период замеров (сек)
+    path: str = 'logs/memory.log'    # Файл замеров (с ротацией по размеру)
+    max_size_mb: float = 10.0        # Размер файла до ротации (МБ)
+    backup_count: int = 3            # Число хранимых старых файлов
+    top: int = 10                    # Мест выделения в каждом замере
+    tracemalloc_frames: int = 1      # Глубина стека tracemalloc (0 - только RSS)
+    growth_window: float = 21600.0   # Окно оценки роста RSS (сек)
+    growth_warn_mb: float = 100.0    # Рост RSS за окно, при котором выводится предупреждение (МБ)
+
+@dataclass
+class ServiceConfig:
+    """Общие настройки сервиса (необязательные секции конфигурации)."""
+    preview: Optional[PreviewConfig] = None
+    detection_workers: int = 2  # Потоков обработки снимков (общий пул для всех камер)
+    detection_batch_size: int = 16  # Наибольшее число камер в одном пакете детекции
+    result_sinks: List[ResultSinkConfig] = field(default_factory=list)  # Приемники шины результатов
+    tracing: Optional[TracingConfig] = None
+    profile_duration: float = 30.0  # Длительность профилирования по SIGUSR1 (консольный режим, сек)
+    memory_watchdog: Optional[MemoryWatchdogConfig] = None
 
 class ConfigLoader:
     """Загрузчик конфигурации из YAML файла."""
 
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, strict: bool = False):
         """Инициализация загрузчика.
         
         Args:
             config_path: Путь к YAML файлу конфигурации
+            strict: Ошибка в конфигурации любой камеры отменяет загрузку всего файла
+                (перезагрузка на лету: камера с опечаткой не должна считаться удаленной)
         """
         self.config_path = config_path
+        self.strict = strict
 
     def load(self) -> tuple[List[ModbusStatusConfig], List[CameraConfig]]:
         """Загрузка и парсинг конфигурации.
@@ -61,6 +164,38 @@ class ConfigLoader:
         
         return heartbeat_configs, camera_configs
 
+    def load_service_config(self) -> ServiceConfig:
+        """Загрузка общих настроек сервиса.
+
+        Returns:
+            Настройки сервиса; отсутствующие секции остаются None
+        """
+        with open(self.config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+
+        preview = config.get('preview')
+        tracing = config.get('tracing')
+        memory = config.get('memory_watchdog')
+        return ServiceConfig(
+            preview=PreviewConfig(
+                port=int(preview.get('port', 8080)),
+                host=str(preview.get('host', '0.0.0.0')),
+                width=int(preview.get('width', 640)),
+                quality=int(preview.get('quality', 80))
+            ) if preview else None,
+            detection_workers=int(config.get('detection_workers', 2)),
+            detection_batch_size=int(config.get('detection_batch_size', 16)),
+            result_sinks=[self._load_result_sink(sink) for sink in config.get('result_sinks') or []],
+            tracing=TracingConfig(
+                sample_rate=float(tracing.get('sample_rate', 0.01)),
+                path=str(tracing.get('path', 'logs/trace.json')),
+                max_events=int(tracing.get('max_events', 100000)),
+                export_interval=float(tracing.get('export_interval', 30.0))
+            ) if tracing else None,
+            profile_duration=float(config.get('profile_duration', 30.0)),
+            memory_watchdog=self._load_memory_watchdog(memory)
+        )
+
     def _load_heartbeat_configs(self, config: Dict[str, Any]) -> List[ModbusStatusConfig]:
         """Загрузка конфигураций heartbeat."""
         if 'modbus_status' not in config:
@@ -80,13 +215,19 @@ class ConfigLoader:
         if 'cameras' not in config:
             raise ValueError("Отсутствует секция 'cameras' в конфигурации")
 
+        detector_profiles = self._load_detector_profiles(config)
+
         camera_configs = []
+        indices = set()
         for cam in config['cameras']:
             try:
                 # Валидация обязательных полей
                 required = ['name', 'camera_ip', 'snapshot_url', 'username', 'password', 'index', 'modbus']
                 if not all(field in cam for field in required):
                     raise ValueError("Отсутствуют обязательные поля в конфигурации камеры")
+                # Камеры различаются по индексу: повтор молча заменил бы одну камеру другой
+                if int(cam['index']) in indices:
+                    raise ValueError(f"Индекс камеры {cam['index']} уже занят другой камерой")
 
                 camera_configs.append(
                     CameraConfig(
@@ -96,21 +237,220 @@ class ConfigLoader:
                         username=str(cam['username']),
                         password=str(cam['password']),
                         index=int(cam['index']),
-                        modbus=ModbusConfig(
-                            modbus_server_ip=str(cam['modbus']['modbus_server_ip']),
-                            register=int(cam['modbus']['register'])
-                        ),
+                        modbus=self._load_modbus_config(cam['modbus']),
                         interval=float(cam.get('interval', 0.25)),
                         timeout=float(cam.get('timeout', 2.0)),
+                        auth=self._load_auth(cam.get('auth', 'auto')),
+                        failure_threshold=int(cam.get('failure_threshold', 3)),
+                        max_retry_delay=float(cam.get('max_retry_delay', 60.0)),
+                        max_frame_age=float(cam.get('max_frame_age', 1.0)),
+                        priority=self._load_priority(cam.get('priority', 'normal')),
+                        tag_ids=self._load_tag_ids(cam.get('tag_ids', [1, 2, 3, 4])),
+                        batch=bool(cam.get('batch', False)),
+                        idle_after=float(cam.get('idle_after', 0.0)),
+                        idle_interval=max(float(cam.get('idle_interval', 2.0)), float(cam.get('interval', 0.25))),
+                        motion_threshold=float(cam.get('motion_threshold', 3.0)),
                         min_tag_area=float(cam.get('min_tag_area', 100.0)),
-                        max_tag_area=float(cam.get('max_tag_area', 10000.0))
+                        max_tag_area=float(cam.get('max_tag_area', 10000.0)),
+                        detector=resolve_tiling(
+                            self._resolve_detector(cam.get('detector'), detector_profiles),
+                            float(cam.get('max_tag_area', 10000.0))
+                        ),
+                        roi={k: int(cam['roi'][k]) for k in ('x', 'y', 'w', 'h')} if cam.get('roi') else None,
+                        recording=self._load_recording_config(cam.get('recording')),
+                        replay=self._load_replay_config(cam.get('replay'))
                     )
                 )
+                indices.add(camera_configs[-1].index)
             except (ValueError, TypeError, KeyError) as e:
+                name = cam.get('name', '?') if isinstance(cam, dict) else '?'
+                if self.strict:
+                    raise ValueError(f"Ошибка в конфигурации камеры {name}: {e}") from e
                 print(f"Ошибка загрузки конфигурации камеры: {e}")
                 continue
 
         if not camera_configs:
             raise ValueError("Не найдено ни одной валидной конфигурации камеры")
                 
-        return camera_configs
\ No newline at end of file
+        return camera_configs
+
+    def load_detector_profiles(self) -> Dict[str, DetectorConfig]:
+        """Загрузка именованных профилей детектора без конфигурации камер."""
+        with open(self.config_path, 'r') as f:
+            config = yaml.safe_load(f) or {}
+        return self._load_detector_profiles(config)
+
+    def _load_detector_profiles(self, config: Dict[str, Any]) -> Dict[str, DetectorConfig]:
+        """Загрузка именованных профилей детектора (секция 'detector_profiles').
+
+        Профиль 'default' существует всегда; его можно переопределить в конфигурации.
+        """
+        profiles = {'default': DetectorConfig()}
+        for name, params in (config.get('detector_profiles') or {}).items():
+            profiles[str(name)] = _build_detector_config(params or {}, DetectorConfig(name=str(name)))
+        return profiles
+
+    def _resolve_detector(self, value: Any, profiles: Dict[str, DetectorConfig]) -> DetectorConfig:
+        """Профиль детектора для камеры.
+
+        Args:
+            value: Имя профиля, словарь параметров (с необязательным ключом
+                'profile' для наследования) или None для профиля 'default'
+            profiles: Загруженные именованные профили
+        """
+        if value is None:
+            return profiles['default']
+        if isinstance(value, str):
+            if value not in profiles:
+                raise ValueError(f"Неизвестный профиль детектора: {value}")
+            return profiles[value]
+        if isinstance(value, dict):
+            base_name = str(value.get('profile', 'default'))
+            if base_name not in profiles:
+                raise ValueError(f"Неизвестный профиль детектора: {base_name}")
+            return _build_detector_config(value, profiles[base_name])
+        raise ValueError(f"Некорректное значение 'detector': {value!r}")
+
+
+    def _load_recording_config(self, value: Any) -> Optional[RecordingConfig]:
+        """Загрузка параметров записи снимков камеры."""
+        if not value:
+            return None
+        return RecordingConfig(
+            path=str(value['path']),
+            size_mb=float(value.get('size_mb', 256.0))
+        )
+
+    def _load_replay_config(self, value: Any) -> Optional[ReplayConfig]:
+        """Загрузка параметров воспроизведения записи."""
+        if not value:
+            return None
+        speed = str(value.get('speed', 'original'))
+        if speed not in ('original', 'max'):
+            raise ValueError(f"Некорректная скорость воспроизведения: {speed}")
+        return ReplayConfig(
+            path=str(value['path']),
+            speed=speed,
+            loop=bool(value.get('loop', False))
+        )
+
+    def _load_modbus_config(self, value: Dict[str, Any]) -> ModbusConfig:
+        """Загрузка цели Modbus камеры и способа кодирования тегов."""
+        encoding = str(value.get('encoding', 'bitmask'))
+        if encoding not in ('bitmask', 'bitset', 'list'):
+            raise ValueError(f"Некорректное кодирование тегов Modbus: {encoding}")
+        # По умолчанию: bitset - все ID семейства tag36h11 (0-586), list - число тегов и до 4 ID
+        default_count = {'bitset': 37, 'list': 5}.get(encoding, 1)
+        register_count = 1 if encoding == 'bitmask' else int(value.get('register_count', default_count))
+        if not 1 <= register_count <= 123:
+            raise ValueError(f"Некорректное число регистров Modbus: {register_count}")
+        return ModbusConfig(
+            modbus_server_ip=str(value['modbus_server_ip']),
+            register=int(value['register']),
+            encoding=encoding,
+            register_count=register_count
+        )
+
+    def _load_result_sink(self, value: Dict[str, Any]) -> ResultSinkConfig:
+        """Загрузка и проверка приемника шины результатов."""
+        sink_type = str(value['type'])
+        if sink_type not in ('jsonl', 'udp', 'tcp', 'modbus'):
+            raise ValueError(f"Некорректный тип приемника результатов: {sink_type}")
+        policy = str(value.get('policy', 'latest' if sink_type == 'modbus' else 'drop_oldest'))
+        if policy not in ('drop_oldest', 'drop_newest', 'latest'):
+            raise ValueError(f"Некорректная политика очереди приемника: {policy}")
+        if sink_type == 'jsonl' and not value.get('path'):
+            raise ValueError("Для приемника jsonl не задан path")
+        if sink_type in ('udp', 'tcp') and not value.get('port'):
+            raise ValueError(f"Для приемника {sink_type} не задан port")
+        return ResultSinkConfig(
+            type=sink_type,
+            name=str(value.get('name', sink_type)),
+            queue_size=int(value.get('queue_size', 256)),
+            policy=policy,
+            changes_only=bool(value.get('changes_only', sink_type == 'modbus')),
+            path=str(value.get('path', '')),
+            host=str(value.get('host', '127.0.0.1')),
+            port=int(value.get('port', 0)),
+            camera=int(value.get('camera', 0)),
+            modbus=self._load_modbus_config(value['modbus']) if sink_type == 'modbus' else None
+        )
+
+    def _load_memory_watchdog(self, value: Any) -> Optional[MemoryWatchdogConfig]:
+        """Загрузка параметров наблюдения за памятью (true - значения по умолчанию)."""
+        if not value:
+            return None
+        if value is True:
+            return MemoryWatchdogConfig()
+        config = MemoryWatchdogConfig(
+            interval=float(value.get('interval', 300.0)),
+            path=str(value.get('path', 'logs/memory.log')),
+            max_size_mb=float(value.get('max_size_mb', 10.0)),
+            backup_count=int(value.get('backup_count', 3)),
+            top=int(value.get('top', 10)),
+            tracemalloc_frames=int(value.get('tracemalloc_frames', 1)),
+            growth_window=float(value.get('growth_window', 21600.0)),
+            growth_warn_mb=float(value.get('growth_warn_mb', 100.0))
+        )
+        if config.interval <= 0 or config.growth_window < config.interval:
+            raise ValueError("Некорректные периоды наблюдения за памятью: нужно 0 < interval <= growth_window")
+        return config
+
+    def _load_tag_ids(self, value: Any) -> Optional[Tuple[int, ...]]:
+        """Загрузка списка передаваемых ID тегов ('all' - любые ID)."""
+        if value == 'all':
+            return None
+        return tuple(sorted({int(tag_id) for tag_id in value}))
+
+    def _load_auth(self, value: Any) -> str:
+        """Проверка способа аутентификации камеры."""
+        auth = str(value)
+        if auth not in ('auto', 'basic', 'digest'):
+            raise ValueError(f"Некорректный способ аутентификации камеры: {auth}")
+        return auth
+
+    def _load_priority(self, value: Any) -> str:
+        """Проверка класса приоритета обработки камеры."""
+        priority = str(value)
+        if priority not in ('critical', 'normal', 'low'):
+            raise ValueError(f"Некорректный приоритет камеры: {priority}")
+        return priority
+
+
+def resolve_tiling(profile: DetectorConfig, max_tag_area: float) -> DetectorConfig:
+    """Размер и перекрытие плиток режима tiled по максимальной площади тега камеры.
+
+    Перекрытие не меньше диагонали самого крупного тега (1.5 стороны с запасом),
+    плитка - не меньше четырех перекрытий и не меньше 512 пикселей. Заданные
+    в профиле значения проверяются: тег площадью до max_tag_area должен целиком
+    попадать хотя бы в одну плитку.
+
+    Raises:
+        ValueError: Если перекрытие меньше диагонали тега или не меньше половины плитки
+    """
+    if profile.mode != 'tiled':
+        return profile
+    min_overlap = int(math.ceil(1.5 * math.sqrt(max_tag_area)))
+    overlap = profile.tile_overlap or min_overlap
+    tile_size = profile.tile_size or max(512, 4 * overlap)
+    if overlap < min_overlap:
+        raise ValueError(
+            f"Перекрытие плиток {overlap} меньше диагонали тега площадью {max_tag_area:.0f} ({min_overlap})"
+        )
+    if 2 * overlap >= tile_size:
+        raise ValueError(f"Перекрытие плиток {overlap} должно быть меньше половины плитки {tile_size}")
+    return replace(profile, tile_size=tile_size, tile_overlap=overlap)
+
+
+def _build_detector_config(params: Dict[str, Any], base: DetectorConfig) -> DetectorConfig:
+    """Создание профиля детектора из словаря поверх базового профиля."""
+    overrides = {}
+    for f in fields(DetectorConfig):
+        if f.name in params:
+            overrides[f.name] = type(getattr(base, f.name))(params[f.name])
+    profile = replace(base, **overrides)
+    if profile.backend not in ('apriltag', 'aruco'):
+        raise ValueError(f"Некорректный движок детекции: {profile.backend}")
+    if profile.mode not in ('single', 'two_stage', 'tiled'):
+        raise ValueError(f"Некорректный режим детекции: {profile.mode}")
+    return profile
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import threading
+from config_loader import ConfigLoader
+from logger_setup import logger
+
+class ConfigWatcher:
+    """Отслеживание изменений файла конфигурации и применение их на лету."""
+
+    def __init__(self, config_path: str, on_change, interval: float = 2.0):
+        """Инициализация наблюдателя.
+        
+        Args:
+            config_path: Путь к YAML файлу конфигурации
+            on_change: Вызывается с (status_configs, camera_configs) после
+                успешной загрузки измененного файла
+            interval: Период проверки файла (сек)
+        """
+        self.config_path = config_path
+        self.on_change = on_change
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_state = self._file_state()
+
+    def _file_state(self):
+        """Время изменения и размер файла (None, если файл недоступен)."""
+        try:
+            stat = os.stat(self.config_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        """Запуск наблюдения в фоновом потоке."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Отслеживание изменений {self.config_path} (период {self.interval}с)")
+
+    def stop(self):
+        """Остановка наблюдения."""
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=self.interval + 1.0)
+
+    def _watch_loop(self):
+        while not self.stop_event.wait(self.interval):
+            state = self._file_state()
+            if state is None or state == self.last_state:
+                continue
+            self.last_state = state
+            self.reload()
+
+    def reload(self):
+        """Загрузка файла и применение изменений.
+        
+        Ошибочная конфигурация (в том числе ошибка в описании одной камеры)
+        не применяется: продолжает работать предыдущая.
+        """
+        try:
+            status_configs, camera_configs = ConfigLoader(self.config_path, strict=True).load()
+        except Exception as e:
+            logger.warning(f"Конфигурация {self.config_path} не применена: {e}")
+            return
+
+        try:
+            self.on_change(status_configs, camera_configs)
+            logger.info(f"Конфигурация {self.config_path} применена")
+        except Exception as e:
+            logger.error(f"Ошибка применения конфигурации: {e}")
@@ -0,0 +1,23 @@
+import importlib
+
+# Модули загружаются при первом обращении к имени: импорт трассировки
+# в обработке кадров не загружает профилировщик и наблюдение за памятью
+_EXPORTS = {
+    'Tracer': '.tracing',
+    'tracer': '.tracing',
+    'SamplingProfiler': '.profiler',
+    'dump_stacks': '.profiler',
+    'install_signal_handlers': '.profiler',
+    'MemoryWatchdog': '.memory_watchdog',
+    'read_rss': '.memory_watchdog'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
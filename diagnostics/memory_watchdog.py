@@ -0,0 +1,230 @@
+# memory_watchdog.py
+import os
+import time
+import logging
+import threading
+import tracemalloc
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from logger_setup import logger
+
+
+def read_rss():
+    """
+    Резидентная память процесса (байт).
+
+    Returns:
+        int: RSS из /proc/self/status (Linux), пиковая RSS из getrusage на
+            других Unix или None, если получить не удалось.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # ru_maxrss: килобайты в Linux, байты в macOS
+        scale = 1 if os.uname().sysname == 'Darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    except (ImportError, AttributeError):
+        return None
+
+
+def _growth_per_hour(samples):
+    """Наклон прямой (метод наименьших квадратов) по замерам (время, байт) в байтах за час."""
+    count = len(samples)
+    mean_t = sum(t for t, _ in samples) / count
+    mean_v = sum(v for _, v in samples) / count
+    variance = sum((t - mean_t) ** 2 for t, _ in samples)
+    if variance == 0:
+        return 0.0
+    covariance = sum((t - mean_t) * (v - mean_v) for t, v in samples)
+    return covariance / variance * 3600
+
+
+class MemoryWatchdog:
+    """
+    Наблюдение за памятью при многонедельной работе.
+
+    Раз в interval секунд замеряет RSS процесса и (если tracemalloc_frames > 0)
+    снимок tracemalloc; в файл path с ротацией пишет RSS, объем отслеживаемых
+    выделений и места выделений с наибольшим ростом с прошлого замера и с
+    запуска. Рост оценивается наклоном RSS за последние growth_window секунд:
+    если он устойчиво превышает growth_warn_mb за окно, в основной журнал
+    выводится предупреждение (не чаще раза за окно) с главными источниками роста.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.owns_tracemalloc = False  # tracemalloc запущен наблюдением (а не другим кодом)
+        self.samples = deque()  # (time.monotonic(), RSS) за окно growth_window
+        self.started_at = None
+        self.baseline = None
+        self.previous = None
+        self.last_warning = None
+        self.stats = {
+            'rss_mb': None,
+            'rss_start_mb': None,
+            'traced_mb': None,
+            'growth_mb_per_hour': 0.0,
+            'growth_warnings': 0,
+            'samples': 0,
+            'top_growth': []
+        }
+
+        self.file_logger = logging.getLogger('memory_watchdog')
+        self.file_logger.setLevel(logging.INFO)
+        self.file_logger.propagate = False
+        self.file_handler = None
+
+    def start(self):
+        """Запуск tracemalloc и потока замеров."""
+        if self.thread:
+            return
+        directory = os.path.dirname(self.config.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file_handler = RotatingFileHandler(
+            self.config.path,
+            maxBytes=int(self.config.max_size_mb * 1024 * 1024),
+            backupCount=self.config.backup_count,
+            encoding='utf-8'
+        )
+        self.file_handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s'))
+        self.file_logger.addHandler(self.file_handler)
+
+        if self.config.tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.config.tracemalloc_frames)
+            self.owns_tracemalloc = True
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._watch_loop, name='memory-watchdog', daemon=True)
+        self.thread.start()
+        logger.info(
+            f"Наблюдение за памятью: замер раз в {self.config.interval:.0f}с, "
+            f"предупреждение при росте более {self.config.growth_warn_mb:.0f} МБ "
+            f"за {self.config.growth_window / 3600:.1f}ч, файл {self.config.path}"
+        )
+
+    def stop(self):
+        """Остановка замеров и tracemalloc (если его запустило наблюдение)."""
+        if not self.thread:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=2.0)
+        self.thread = None
+        if self.owns_tracemalloc:
+            self.owns_tracemalloc = False
+            tracemalloc.stop()
+        self.file_logger.removeHandler(self.file_handler)
+        self.file_handler.close()
+
+    def _watch_loop(self):
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"Ошибка замера памяти: {e}")
+            if self.stop_event.wait(self.config.interval):
+                break
+
+    def check(self):
+        """
+        Один замер: RSS, снимок tracemalloc, запись в файл и проверка роста.
+
+        Returns:
+            dict: Статистика после замера (как get_stats).
+        """
+        now = time.monotonic()
+        rss = read_rss()
+        snapshot = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ))
+
+        lines = []
+        top_growth = []
+        if snapshot is not None:
+            if self.baseline is None:
+                self.baseline = snapshot
+            if self.previous is not None:
+                lines.append("  Рост с прошлого замера:")
+                lines += self._format_diff(snapshot.compare_to(self.previous, 'lineno'))
+            diff_since_start = snapshot.compare_to(self.baseline, 'lineno')
+            lines.append("  Рост с запуска:")
+            lines += self._format_diff(diff_since_start)
+            top_growth = [
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size_diff / 1024:+.0f} КБ"
+                for stat in diff_since_start[:self.config.top] if stat.size_diff >= 1024
+            ]
+            self.previous = snapshot
+
+        with self.lock:
+            if rss is not None:
+                if self.started_at is None:
+                    self.started_at = now
+                self.samples.append((now, rss))
+                while self.samples and now - self.samples[0][0] > self.config.growth_window:
+                    self.samples.popleft()
+                covered = now - self.started_at >= self.config.growth_window
+                growth = _growth_per_hour(self.samples) if len(self.samples) >= 3 else 0.0
+                self.stats['rss_mb'] = rss / 1048576
+                if self.stats['rss_start_mb'] is None:
+                    self.stats['rss_start_mb'] = self.stats['rss_mb']
+                self.stats['growth_mb_per_hour'] = growth / 1048576
+            else:
+                covered, growth = False, 0.0
+            if snapshot is not None:
+                self.stats['traced_mb'] = tracemalloc.get_traced_memory()[0] / 1048576
+            self.stats['top_growth'] = top_growth
+            self.stats['samples'] += 1
+            stats = dict(self.stats)
+
+        header = f"RSS {stats['rss_mb'] or 0:.1f} МБ"
+        if stats['traced_mb'] is not None:
+            header += f", tracemalloc {stats['traced_mb']:.1f} МБ"
+        header += f", рост {stats['growth_mb_per_hour']:+.2f} МБ/ч"
+        self.file_logger.info("\n".join([header] + lines))
+
+        # Предупреждение только при устойчивом росте за полное окно и не чаще раза за окно
+        window_growth = growth * self.config.growth_window / 3600 / 1048576
+        if covered and window_growth >= self.config.growth_warn_mb and (
+            self.last_warning is None or now - self.last_warning >= self.config.growth_window
+        ):
+            self.last_warning = now
+            with self.lock:
+                self.stats['growth_warnings'] += 1
+            sources = "; ".join(top_growth[:3]) or "нет данных tracemalloc"
+            logger.warning(
+                f"Устойчивый рост памяти: {window_growth:.0f} МБ за {self.config.growth_window / 3600:.1f}ч "
+                f"(RSS {stats['rss_mb']:.0f} МБ, при запуске {stats['rss_start_mb']:.0f} МБ). "
+                f"Главные источники: {sources}"
+            )
+        return stats
+
+    def _format_diff(self, diff):
+        """Строки файла для мест выделения с наибольшим ростом."""
+        lines = [f"    {stat}" for stat in diff[:self.config.top] if stat.size_diff > 0]
+        return lines or ["    нет"]
+
+    def get_stats(self):
+        """
+        Статистика памяти.
+
+        Returns:
+            dict: rss_mb, rss_start_mb, traced_mb (None без tracemalloc),
+                growth_mb_per_hour, growth_warnings, samples, top_growth.
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            stats['top_growth'] = list(stats['top_growth'])
+            return stats
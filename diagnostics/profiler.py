@@ -0,0 +1,157 @@
+# profiler.py
+import os
+import sys
+import time
+import signal
+import threading
+import traceback
+from collections import Counter
+from datetime import datetime
+
+from logger_setup import logger, LOG_DIR
+
+
+def _frame_label(code):
+    """Подпись функции в стеке: имя, файл и строка определения."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Выборочный профилировщик всех потоков процесса.
+
+    С периодом interval снимает стеки всех потоков (sys._current_frames) в
+    течение duration секунд и сохраняет в каталог directory:
+    profile_<время>.folded - свернутые стеки (поток;функция;...;функция число),
+    которые открываются в speedscope или flamegraph.pl, и profile_<время>.txt -
+    сводку по потокам и функциям с наибольшим собственным и полным временем.
+    Не требует внешних инструментов и перезапуска процесса.
+    """
+
+    def __init__(self, directory=LOG_DIR, duration=30.0, interval=0.01):
+        self.directory = directory
+        self.duration = duration
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """
+        Запуск сеанса профилирования в отдельном потоке.
+
+        Returns:
+            bool: False, если сеанс уже идет.
+        """
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return False
+            self.thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+            self.thread.start()
+        return True
+
+    def run(self):
+        """
+        Сеанс профилирования (блокирует вызывающий поток на duration секунд).
+
+        Returns:
+            str: Путь к файлу свернутых стеков.
+        """
+        logger.info(f"Профилирование всех потоков на {self.duration:.0f}с")
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + self.duration
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[tuple(reversed(labels))] += 1
+            samples += 1
+            time.sleep(self.interval)
+        elapsed = time.monotonic() - started
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"profile_{datetime.now():%Y%m%d_%H%M%S}")
+        with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(self._summary(stacks, samples, elapsed))
+        logger.info(f"Профиль сохранен: {base}.folded, {base}.txt ({samples} выборок)")
+        return f"{base}.folded"
+
+    @staticmethod
+    def _summary(stacks, samples, elapsed, top=30):
+        """Сводка профиля: выборки по потокам, собственное и полное время функций."""
+        by_thread, own, total = Counter(), Counter(), Counter()
+        for stack, count in stacks.items():
+            by_thread[stack[0]] += count
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+
+        lines = [f"Выборок: {samples} за {elapsed:.1f}с", "", "Потоки (доля выборок, в которых поток активен):"]
+        lines += [f"  {name}: {count / max(samples, 1):.0%}" for name, count in by_thread.most_common()]
+        for title, counter in (("Собственное время", own), ("Полное время", total)):
+            lines += ["", f"{title} (доля от всех стеков потоков):"]
+            stack_count = max(sum(stacks.values()), 1)
+            lines += [f"  {count / stack_count:6.1%}  {label}" for label, count in counter.most_common(top)]
+        return "\n".join(lines) + "\n"
+
+
+def dump_stacks(directory=LOG_DIR):
+    """
+    Запись текущих стеков всех потоков в stacks_<время>.txt.
+
+    Returns:
+        str: Путь к файлу.
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"Поток {names.get(ident, ident)} ({ident}):\n")
+        lines.extend(traceback.format_stack(frame))
+        lines.append("\n")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"stacks_{datetime.now():%Y%m%d_%H%M%S}.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    logger.info(f"Стеки {len(names)} потоков сохранены в {path}")
+    return path
+
+
+def install_signal_handlers(directory=LOG_DIR, duration=30.0):
+    """
+    Профилирование работающего процесса по сигналам:
+    SIGUSR1 - сеанс профилирования на duration секунд, SIGUSR2 - стеки потоков.
+
+    Вызывается из главного потока. Returns: False, если сигналы не поддерживаются (Windows).
+    """
+    if not hasattr(signal, 'SIGUSR1'):
+        logger.warning("Профилирование по сигналам недоступно на этой платформе")
+        return False
+
+    profiler = SamplingProfiler(directory, duration)
+
+    def on_profile(signum, frame):
+        if not profiler.start():
+            logger.info("Профилирование уже выполняется")
+
+    def on_stacks(signum, frame):
+        try:
+            dump_stacks(directory)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить стеки потоков: {e}")
+
+    signal.signal(signal.SIGUSR1, on_profile)
+    signal.signal(signal.SIGUSR2, on_stacks)
+    logger.info(f"Профилирование по сигналам: kill -USR1 {os.getpid()} (профиль), kill -USR2 {os.getpid()} (стеки)")
+    return True
@@ -0,0 +1,173 @@
+# tracing.py
+import os
+import json
+import time
+import random
+import threading
+from collections import OrderedDict, deque
+
+from logger_setup import logger
+
+# Наибольшее число одновременно незавершенных трасс (брошенные вытесняются)
+MAX_ACTIVE_TRACES = 1000
+
+
+class _Trace:
+    """Трасса одного снимка: идентификатор, ключ (камера, номер снимка) и конец последнего участка."""
+
+    __slots__ = ('trace_id', 'key', 'last')
+
+    def __init__(self, trace_id, key, last):
+        self.trace_id = trace_id
+        self.key = key
+        self.last = last
+
+
+class Tracer:
+    """
+    Трассировка пути снимка от запроса камеры до записи в ПЛК.
+
+    Для доли снимков sample_rate клиент снимков открывает трассу (begin),
+    обработчик и Modbus находят ее по камере и номеру снимка (lookup) и
+    добавляют участки (span): каждый участок длится от конца предыдущего до
+    текущего момента. События хранятся в памяти (не больше max_events) и
+    выгружаются в JSON формата Chrome trace events (chrome://tracing, Perfetto):
+    по дорожке на камеру. Без трассировки (sample_rate = 0) вызовы
+    сводятся к проверке одного поля.
+    """
+
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.path = 'logs/trace.json'
+        self.export_interval = 30.0
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=100000)
+        self.active = OrderedDict()  # (индекс камеры, номер снимка) -> _Trace
+        self.next_id = 1
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def configure(self, config):
+        """Применение настроек TracingConfig."""
+        self.sample_rate = max(0.0, min(1.0, config.sample_rate))
+        self.path = config.path
+        self.export_interval = config.export_interval
+        with self.lock:
+            self.events = deque(self.events, maxlen=config.max_events)
+        logger.info(f"Трассировка снимков: {self.sample_rate:.1%} снимков, файл {self.path}")
+
+    def start(self):
+        """Запуск периодической выгрузки трасс в файл."""
+        if self.sample_rate <= 0 or self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._export_loop, name='trace-export', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Остановка периодической выгрузки и выгрузка накопленных трасс."""
+        if not self.thread:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=2.0)
+        self.thread = None
+        self.export()
+
+    def _export_loop(self):
+        while not self.stop_event.wait(self.export_interval):
+            self.export()
+
+    def begin(self, camera_index, seq, start):
+        """
+        Открытие трассы снимка (с вероятностью sample_rate).
+
+        Args:
+            camera_index (int): Индекс камеры.
+            seq (int): Номер снимка у клиента камеры.
+            start (float): time.monotonic() начала запроса снимка.
+
+        Returns:
+            Трасса или None, если снимок не попал в выборку.
+        """
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        with self.lock:
+            trace = _Trace(self.next_id, (camera_index, seq), start)
+            self.next_id += 1
+            self.active[trace.key] = trace
+            if len(self.active) > MAX_ACTIVE_TRACES:
+                self.active.popitem(last=False)
+        return trace
+
+    def lookup(self, camera_index, seq):
+        """Открытая трасса снимка или None."""
+        if self.sample_rate <= 0:
+            return None
+        with self.lock:
+            return self.active.get((camera_index, seq))
+
+    def span(self, trace, name, end=None, **args):
+        """
+        Участок трассы от конца предыдущего участка до end (по умолчанию - сейчас).
+
+        Args:
+            trace: Трасса из begin/lookup или None (ничего не записывается).
+            name (str): Название участка.
+            end (float): time.monotonic() окончания участка.
+            **args: Дополнительные поля события.
+        """
+        if trace is None:
+            return
+        end = time.monotonic() if end is None else end
+        start = min(trace.last, end)
+        trace.last = end
+        args['trace'] = trace.trace_id
+        event = {
+            'name': name,
+            'cat': 'frame',
+            'ph': 'X',
+            'ts': round(start * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': 1,
+            'tid': trace.key[0] + 1,
+            'args': args
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def finish(self, trace):
+        """Закрытие трассы: последующие участки снимка не записываются."""
+        if trace is None:
+            return
+        with self.lock:
+            if self.active.get(trace.key) is trace:
+                del self.active[trace.key]
+
+    def export(self, path=None):
+        """
+        Выгрузка накопленных событий в JSON формата Chrome trace events.
+
+        Returns:
+            str: Путь к файлу.
+        """
+        path = path or self.path
+        with self.lock:
+            events = list(self.events)
+        tracks = sorted({event['tid'] for event in events})
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': f"Camera {tid}"}}
+            for tid in tracks
+        ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Запись во временный файл и замена: файл всегда можно открыть целиком
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+        os.replace(temp_path, path)
+        return path
+
+
+# Общий трассировщик процесса (по умолчанию выключен)
+tracer = Tracer()
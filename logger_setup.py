@@ -2,6 +2,7 @@
 import sys
 import logging
 import os
+import threading
 from logging.handlers import TimedRotatingFileHandler
 from logging import StreamHandler, Formatter
 from datetime import datetime, timedelta
@@ -60,7 +61,8 @@ def setup_logger():
     logger.handlers = []
     logger.propagate = False  # Важно: отключаем распространение
     os.makedirs(LOG_DIR, exist_ok=True)
-    cleanup_old_logs()
+    # Очистка старых логов не должна задерживать запуск сервиса
+    threading.Thread(target=cleanup_old_logs, name='log-cleanup', daemon=True).start()
 
     logger.setLevel(logging.DEBUG)
     formatter = Formatter(fmt=LOG_FORMAT)
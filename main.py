@@ -2,10 +2,6 @@ import os
 os.environ['QT_QPA_PLATFORM'] = 'xcb'
 
 import argparse
-import time
-from config_loader import ConfigLoader
-from camera_utils.camera_processing import CameraProcessor
-from camera_utils.display_manager import DisplayManager
 
 def parse_args():
     parser = argparse.ArgumentParser(description='AprilTag Detection System')
@@ -13,34 +9,91 @@ def parse_args():
                        help='Run in console mode (for Docker)')
     parser.add_argument('--config', default='config.yaml',
                        help='Path to config file (default: config.yaml)')
+    parser.add_argument('--mosaic', action='store_true',
+                       help='Show all cameras in one mosaic window')
+    parser.add_argument('--tile-size', default='480x270', metavar='WxH',
+                       help='Mosaic tile size (default: 480x270)')
+    parser.add_argument('--tune-detector', type=int, metavar='CAMERA_INDEX',
+                       help='Tune detector profile for camera on recorded frames and exit')
+    parser.add_argument('--compare-backends', type=int, metavar='CAMERA_INDEX',
+                       help='Compare detector backends for camera on recorded frames and exit')
+    parser.add_argument('--compare-modes', type=int, metavar='CAMERA_INDEX',
+                       help='Compare single-pass, two-stage and tiled detection for camera on recorded frames and exit')
+    parser.add_argument('--frames', default='recordings',
+                       help='Recorded frames for tuning and comparisons: recording file, image file or directory (default: recordings)')
+    parser.add_argument('--plan-capacity', action='store_true',
+                       help='Measure sustainable cameras per core on synthetic cameras, print JSON report and exit')
+    parser.add_argument('--sample', default='test/tag_1.jpg',
+                       help='Sample image for synthetic cameras (default: test/tag_1.jpg)')
+    parser.add_argument('--resolutions', default='1280x720,1920x1080', metavar='WxH[,WxH...]',
+                       help='Synthetic camera resolutions (default: 1280x720,1920x1080)')
+    parser.add_argument('--profiles', metavar='NAME[,NAME...]',
+                       help='Detector profiles to measure (default: all from config)')
+    parser.add_argument('--fps', type=float, default=4.0,
+                       help='Target FPS per synthetic camera (default: 4)')
+    parser.add_argument('--report',
+                       help='Also write capacity report JSON to this file')
+    parser.add_argument('--min-recall', type=float, default=1.0,
+                       help='Minimal recall vs reference run when tuning (default: 1.0)')
     return parser.parse_args()
 
-def gui_main(config_path):
+def parse_tile_size(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+def gui_main(config_path, tile_size=None):
+    # cv2, numpy и детекторы импортируются только для выбранного режима,
+    # а не для служебных команд (--plan-capacity, --tune-detector и др.)
+    from config_loader import ConfigLoader
+    from config_watcher import ConfigWatcher
+    from camera_utils.camera_processing import CameraProcessor
+    from camera_utils.display_manager import DisplayManager
+
     try:
         # Загрузка конфигурации
         config_loader = ConfigLoader(config_path)
         status_configs, camera_configs = config_loader.load()  
+        service_config = config_loader.load_service_config()
         
         # Инициализация процессора
-        processor = CameraProcessor(camera_configs, roi_file='roi/roi.xml')
+        processor = CameraProcessor(
+            camera_configs,
+            roi_file='roi/roi.xml',
+            preview_config=service_config.preview,
+            detection_workers=service_config.detection_workers,
+            detection_batch_size=service_config.detection_batch_size,
+            result_sinks=service_config.result_sinks,
+            tracing=service_config.tracing,
+            memory_watchdog=service_config.memory_watchdog,
+            tile_size=tile_size
+        )
         
         # Запуск heartbeat для всех конфигураций
         processor.modbus_handler.start_heartbeat(status_configs)
         
-        display = DisplayManager(len(camera_configs))
+        if tile_size:
+            display = DisplayManager(processor.tile_mailboxes, processor.frame_event, tile_size)
+        else:
+            display = DisplayManager(processor.mailboxes, processor.frame_event)
         
         # Запуск обработки
         processor.start_processing()
-        display.start_display(processor.output_queue)
+        display.start_display()
+        
+        # Применение изменений config.yaml без перезапуска
+        watcher = ConfigWatcher(config_path, processor.apply_config)
+        watcher.start()
         
         try:
             while processor.is_running():
+                # Перерисовка по появлению новых кадров, а не по таймеру
+                display.wait_for_frames(timeout=0.1)
                 if display.update_display():
                     break
-                time.sleep(0.01)
         except KeyboardInterrupt:
             print("\nОстановка по запросу пользователя...")
         finally:
+            watcher.stop()
             processor.stop_processing()
             display.stop_display()
             
@@ -52,8 +105,27 @@ def gui_main(config_path):
 if __name__ == "__main__":
     args = parse_args()
     
-    if args.console:
+    if args.plan_capacity:
+        from camera_utils.capacity_planner import run_capacity_plan
+        run_capacity_plan(
+            args.config,
+            sample_path=args.sample,
+            resolutions=[parse_tile_size(value) for value in args.resolutions.split(',')],
+            profile_names=args.profiles.split(',') if args.profiles else None,
+            fps=args.fps,
+            report_path=args.report
+        )
+    elif args.compare_backends is not None:
+        from camera_utils.detector_tuner import run_comparison
+        run_comparison(args.config, args.compare_backends, args.frames, 'backend')
+    elif args.compare_modes is not None:
+        from camera_utils.detector_tuner import run_comparison
+        run_comparison(args.config, args.compare_modes, args.frames, 'mode')
+    elif args.tune_detector is not None:
+        from camera_utils.detector_tuner import run_tuning
+        run_tuning(args.config, args.tune_detector, args.frames, args.min_recall)
+    elif args.console:
         from cli import console_worker
         console_worker(args.config)
     else:
-        gui_main(args.config)
\ No newline at end of file
+        gui_main(args.config, parse_tile_size(args.tile_size) if args.mosaic else None)
\ No newline at end of file
@@ -1,17 +1,21 @@
-from pymodbus.client import AsyncModbusTcpClient
-from pymodbus.exceptions import ModbusException, ModbusIOException
+from typing import List, Union
 from logger_setup import logger
 
+# pymodbus импортируется при первой записи: загрузка библиотеки идет в потоке
+# цикла событий Modbus параллельно с запуском камер
+
 
 def check_response(response):
     """Только проверка без логирования"""
+    from pymodbus.exceptions import ModbusException, ModbusIOException
+
     if isinstance(response, ModbusIOException):
         raise ModbusException(f"Ошибка ввода-вывода: {response}")
     if hasattr(response, 'isError') and response.isError():
         raise ModbusException(f"Устройство вернуло ошибку: {response}")
 
 async def write_modbus(
-    value: int,
+    value: Union[int, List[int]],
     address: int,
     host: str,
     port: int = 502,
@@ -20,11 +24,15 @@ async def write_modbus(
     Записывает значение в Modbus-регистр по TCP.
 
     Параметры:
-        value: значение для записи (целое число)
-        address: адрес Modbus-регистра
+        value: значение для записи (целое число) или список значений
+            последовательных регистров (одна транзакция write_registers)
+        address: адрес Modbus-регистра (первого из записываемых)
         host: IP-адрес устройства
         port: порт Modbus-TCP (по умолчанию 502)
     """
+    from pymodbus.client import AsyncModbusTcpClient
+    from pymodbus.exceptions import ModbusException
+
     logger.debug(f"Подключение к {host}:{port}...")
 
     try:
@@ -39,10 +47,16 @@ async def write_modbus(
             logger.debug(f"Запись {value} в регистр {address}...")
 
             # Простая запись без unit/slave параметра
-            response = await client.write_register(
-                address=address,
-                value=value,
-            )
+            if isinstance(value, list):
+                response = await client.write_registers(
+                    address=address,
+                    values=value,
+                )
+            else:
+                response = await client.write_register(
+                    address=address,
+                    value=value,
+                )
             check_response(response)
             logger.info(f"Выполнена запись значения: {value} в регистр {address}")
 
@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from config_loader import ModbusStatusConfig, ModbusConfig
 from network.modbus_client import write_modbus
 from logger_setup import logger
+from diagnostics.tracing import tracer
 
 @dataclass
 class HeartbeatTask:
@@ -24,41 +25,53 @@ class ModbusHandler:
         self.loop = asyncio.new_event_loop()
         self.lock = threading.Lock()
         self.last_sent_tags = {}
+        self.status_configs: List[ModbusStatusConfig] = []
         self._thread = threading.Thread()  # Инициализация пустым потоком
         self._thread.daemon = True
 
-    async def _send_tags_async(self, tags: List, modbus_cfg: ModbusConfig):
+    async def _send_tags_async(self, tags: List, modbus_cfg: ModbusConfig, trace=None) -> bool:
         """Асинхронная отправка тегов на Modbus сервер."""
+        tracer.span(trace, 'modbus_wait')
         try:
-            modbus_value = self._encode_tags(tags)
+            modbus_value = self._encode_tags(tags, modbus_cfg)
             logger.info(f"Отправка тегов на {modbus_cfg.modbus_server_ip}:{modbus_cfg.register}")
             await write_modbus(
-                value=modbus_value,
+                value=modbus_value if len(modbus_value) > 1 else modbus_value[0],
                 address=modbus_cfg.register,
                 host=modbus_cfg.modbus_server_ip
             )
+            tracer.span(trace, 'modbus_write', register=modbus_cfg.register)
+            return True
         except Exception as e:
+            tracer.span(trace, 'modbus_write', error=str(e))
             print(f"Ошибка отправки тегов: {str(e)}")
+            return False
+        finally:
+            tracer.finish(trace)
 
-    def send_tags(self, tags: List, modbus_cfg: ModbusConfig):
+    def send_tags(self, tags: List, modbus_cfg: ModbusConfig, trace=None):
         """Синхронная обертка для отправки тегов.
         
         Args:
             tags: Список обнаруженных тегов
             modbus_cfg: Конфигурация Modbus для отправки
+            trace: Трасса снимка, результат которого записывается (или None)
+            
+        Returns:
+            concurrent.futures.Future с результатом записи (True при успехе)
         """
-        asyncio.run_coroutine_threadsafe(
-            self._send_tags_async(tags, modbus_cfg),
+        return asyncio.run_coroutine_threadsafe(
+            self._send_tags_async(tags, modbus_cfg, trace),
             self.loop
         )
 
-    async def _send_heartbeats(self, status_configs: List[ModbusStatusConfig]):
+    async def _send_heartbeats(self):
         """Управление отправкой heartbeat для всех конфигураций."""
         while self.active:
             try:
                 current_time = time.time()
                 
-                for cfg in status_configs:
+                for cfg in self.status_configs:
                     key = f"{cfg.modbus_server_ip}:{cfg.register}"
                     
                     if key not in self.heartbeat_tasks:
@@ -92,6 +105,7 @@ class ModbusHandler:
         Args:
             status_configs: Список конфигураций heartbeat
         """
+        self.status_configs = list(status_configs)
         if not hasattr(self, '_thread') or not self._thread.is_alive():
             self._thread = threading.Thread(
                 target=self._run_event_loop,
@@ -100,29 +114,78 @@ class ModbusHandler:
             self._thread.start()
             
             asyncio.run_coroutine_threadsafe(
-                self._send_heartbeats(status_configs),
+                self._send_heartbeats(),
                 self.loop
             )
 
-    def _encode_tags(self, tags: List) -> int:
-        """Кодирование списка тегов в битовую маску.
+    def update_heartbeat(self, status_configs: List[ModbusStatusConfig]):
+        """Замена конфигураций heartbeat без остановки отправки.
+        
+        Args:
+            status_configs: Новый список конфигураций heartbeat
+        """
+        self.status_configs = list(status_configs)
+        keys = {f"{cfg.modbus_server_ip}:{cfg.register}" for cfg in status_configs}
+        for key in list(self.heartbeat_tasks.keys()):
+            if key not in keys:
+                del self.heartbeat_tasks[key]
+        for cfg in status_configs:
+            task = self.heartbeat_tasks.get(f"{cfg.modbus_server_ip}:{cfg.register}")
+            if task:
+                task.interval = cfg.interval
+
+    def _encode_tags(self, tags: List, modbus_cfg: ModbusConfig) -> List[int]:
+        """Кодирование списка тегов в значения последовательных регистров.
+        
+        Способы кодирования (modbus_cfg.encoding):
+            bitmask - один регистр, бит (ID - 1) для ID 1-16;
+            bitset - бит ID в регистрах по 16 бит: регистр ID // 16, бит ID % 16;
+            list - первый регистр - число тегов, далее ID по возрастанию.
         
         Args:
             tags: Список тегов для кодирования
+            modbus_cfg: Конфигурация Modbus камеры
             
         Returns:
-            Числовое значение битовой маски
+            Значения регистров (modbus_cfg.register_count штук)
         """
-        if not tags:
-            return 0
-        value = 0
-        for tag in tags:
-            if 1 <= tag.tag_id <= 32:
-                value |= 1 << (tag.tag_id - 1)
-        return value
+        values = [0] * modbus_cfg.register_count
+        tag_ids = sorted({tag.tag_id for tag in tags})
+        
+        if modbus_cfg.encoding == 'list':
+            capacity = modbus_cfg.register_count - 1
+            if len(tag_ids) > capacity:
+                logger.warning(
+                    f"Тегов {len(tag_ids)} больше, чем помещается в {modbus_cfg.register_count} регистров - "
+                    f"передаются первые {capacity}"
+                )
+                tag_ids = tag_ids[:capacity]
+            values[0] = len(tag_ids)
+            values[1:1 + len(tag_ids)] = tag_ids
+            return values
+        
+        offset = 1 if modbus_cfg.encoding == 'bitmask' else 0
+        for tag_id in tag_ids:
+            bit = tag_id - offset
+            if 0 <= bit < 16 * modbus_cfg.register_count:
+                values[bit // 16] |= 1 << (bit % 16)
+            else:
+                logger.warning(f"Тег ID {tag_id} не помещается в кодирование {modbus_cfg.encoding}")
+        return values
 
     def stop(self):
-        """Остановка всех Modbus операций."""
+        """Остановка всех Modbus операций, потока и цикла событий."""
         self.active = False
         if self.loop.is_running():
-            self.loop.call_soon_threadsafe(self.loop.stop)
\ No newline at end of file
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        if self.loop.is_running() or self.loop.is_closed():
+            return
+        # Незавершенные операции (heartbeat, записи) отменяются до закрытия цикла
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
\ No newline at end of file
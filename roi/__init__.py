@@ -1,6 +1,7 @@
-from .read_roi import load_roi_for_ip, extract_ip_from_url
+from .read_roi import load_roi_for_ip, extract_ip_from_url, RoiCache
 
 __all__ = [
     'load_roi_for_ip',
-    'extract_ip_from_url'
+    'extract_ip_from_url',
+    'RoiCache'
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import cv2
+import threading
 
 def ip_to_key(ip):
     return "ip_" + ip.replace(".", "_").replace(":", "_")
@@ -27,6 +28,29 @@ def load_roi_for_ip(ip, filename):
     fs.release()
     return roi
 
+class RoiCache:
+    """Кэш ROI из файла: файл перечитывается только при изменении."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.rois = {}
+
+    def get(self, ip):
+        try:
+            mtime = os.path.getmtime(self.filename)
+        except OSError:
+            mtime = None
+
+        with self.lock:
+            if mtime != self.mtime:
+                self.mtime = mtime
+                self.rois = {}
+            if ip not in self.rois:
+                self.rois[ip] = load_roi_for_ip(ip, self.filename) if mtime is not None else None
+            return self.rois[ip]
+
 def extract_ip_from_url(url):
     return url.split("@")[-1].split("/")[0]
 
@@ -0,0 +1,9 @@
+# conftest.py
+import os
+import sys
+
+# Модули проекта импортируются от корня репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ручные скрипты проверки камер (нужны PyQt5 и живые потоки RTSP), не тесты pytest
+collect_ignore = ['main_test.py', 'min_test.py', 'output_img.py']
@@ -0,0 +1,70 @@
+# test_batch_packing.py
+import numpy as np
+import pytest
+
+from camera_utils.batch_packing import pack_rois, route_detections, PADDING, FILL_VALUE
+from camera_utils.detector_backends import TagDetection
+
+
+def _crops():
+    sizes = [(120, 200), (40, 60), (90, 90), (200, 50), (10, 300)]
+    return [np.full(size, i + 1, dtype=np.uint8) for i, size in enumerate(sizes)]
+
+
+def _tag(tag_id, x, y, side=10):
+    corners = np.array([[x, y], [x + side, y], [x + side, y + side], [x, y + side]], dtype=np.float64)
+    return TagDetection(tag_id, corners, corners.mean(axis=0), 10.0)
+
+
+def test_pack_keeps_crops_separate_and_intact():
+    crops = _crops()
+    canvas, placements = pack_rois(crops)
+
+    assert len(placements) == len(crops)
+    for crop, (x, y, w, h) in zip(crops, placements):
+        assert (h, w) == crop.shape
+        assert x >= PADDING and y >= PADDING
+        assert x + w + PADDING <= canvas.shape[1] and y + h + PADDING <= canvas.shape[0]
+        np.testing.assert_array_equal(canvas[y:y + h, x:x + w], crop)
+
+    # Между фрагментами не меньше зазора
+    for i, (x0, y0, w0, h0) in enumerate(placements):
+        for x1, y1, w1, h1 in placements[i + 1:]:
+            assert (x0 + w0 + PADDING <= x1 or x1 + w1 + PADDING <= x0 or
+                    y0 + h0 + PADDING <= y1 or y1 + h1 + PADDING <= y0)
+
+    # Все вне фрагментов заполнено нейтральным фоном
+    mask = np.ones(canvas.shape, dtype=bool)
+    for x, y, w, h in placements:
+        mask[y:y + h, x:x + w] = False
+    assert (canvas[mask] == FILL_VALUE).all()
+
+
+def test_pack_single_crop():
+    crop = np.zeros((30, 40), dtype=np.uint8)
+    canvas, placements = pack_rois([crop])
+    assert placements == [(PADDING, PADDING, 40, 30)]
+    assert canvas.shape == (30 + 2 * PADDING, 40 + 2 * PADDING)
+
+
+def test_route_detections_to_crops():
+    crops = _crops()
+    _, placements = pack_rois(crops)
+    x0, y0 = placements[0][:2]
+    x2, y2 = placements[2][:2]
+    tags = [_tag(1, x0 + 5, y0 + 7), _tag(2, x2 + 80, y2 + 80)]
+
+    routed = route_detections(tags, placements)
+
+    assert [[tag.tag_id for tag in crop_tags] for crop_tags in routed] == [[1], [], [2], [], []]
+    np.testing.assert_allclose(routed[0][0].corners[0], [5.0, 7.0])
+    np.testing.assert_allclose(routed[2][0].center, [85.0, 85.0])
+
+
+@pytest.mark.parametrize('dx, dy', [(-5, 20), (20, -5)])
+def test_route_drops_tags_crossing_gap(dx, dy):
+    crops = _crops()
+    _, placements = pack_rois(crops)
+    x, y = placements[1][:2]
+    routed = route_detections([_tag(3, x + dx, y + dy)], placements)
+    assert all(not crop_tags for crop_tags in routed)
@@ -0,0 +1,81 @@
+# test_circuit_breaker.py
+import pytest
+
+import camera_utils.circuit_breaker as circuit_breaker
+from camera_utils.circuit_breaker import CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, base_delay=1.0, jitter=0.0)
+    assert breaker.record_failure() is None
+    assert breaker.record_failure() is None
+    assert breaker.allow_request()
+    assert breaker.record_failure() == 1.0
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.retry_delay() == 1.0
+    # Повторные ошибки в разомкнутом состоянии паузу не меняют
+    assert breaker.record_failure() is None
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=2.0, jitter=0.0)
+    breaker.record_failure()
+    clock.now += 2.0
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.record_success()
+    assert breaker.get_stats()['consecutive_failures'] == 0
+
+
+def test_backoff_doubles_up_to_max(clock):
+    breaker = CircuitBreaker(failure_threshold=2, base_delay=1.0, max_delay=5.0, jitter=0.0)
+    breaker.record_failure()
+    delays = [breaker.record_failure()]
+    for _ in range(4):
+        clock.now += delays[-1]
+        assert breaker.allow_request()
+        # Ошибка пробного запроса размыкает автомат сразу, без порога
+        delays.append(breaker.record_failure())
+    assert delays == [1.0, 2.0, 4.0, 5.0, 5.0]
+    stats = breaker.get_stats()
+    assert stats['circuit_state'] == CircuitBreaker.OPEN
+    assert stats['circuit_opens'] == 5
+    assert stats['retry_in'] == 5.0
+
+
+def test_success_resets_backoff(clock):
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=1.0, jitter=0.0)
+    breaker.record_failure()
+    clock.now += 1.0
+    breaker.allow_request()
+    assert breaker.record_failure() == 2.0
+    clock.now += 2.0
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.record_failure() == 1.0
+
+
+def test_jitter_bounds(clock):
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=10.0, jitter=0.2)
+    for _ in range(20):
+        delay = breaker.record_failure()
+        assert 8.0 <= delay <= 12.0
+        breaker.record_success()
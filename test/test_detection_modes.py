@@ -0,0 +1,107 @@
+# test_detection_modes.py
+import numpy as np
+import pytest
+
+from config_loader import DetectorConfig, resolve_tiling
+from camera_utils.detection_modes import TiledDetector
+from camera_utils.detector_backends import TagDetection
+from camera_utils.detector_factory import create_detector
+
+
+def _tag(tag_id, x, y, side=20, margin=50.0):
+    corners = np.array([[x, y], [x + side, y], [x + side, y + side], [x, y + side]], dtype=np.float64)
+    return TagDetection(tag_id, corners, corners.mean(axis=0), margin)
+
+
+class _FakeDetector:
+    """Возвращает теги, целиком попавшие в плитку, в координатах плитки."""
+
+    def __init__(self, tags, origins):
+        self.tags = tags
+        self.origins = origins
+
+    def detect(self, tile):
+        x, y = self.origins.pop(0)
+        h, w = tile.shape[:2]
+        found = []
+        for tag_id, tx, ty, side, margin in self.tags:
+            if x <= tx and tx + side <= x + w and y <= ty and ty + side <= y + h:
+                # Запас декодирования зависит от плитки, чтобы проверить выбор лучшего варианта
+                found.append(_tag(tag_id, tx - x, ty - y, side, margin + x + y))
+        return found
+
+
+@pytest.mark.parametrize('length', [1, 99, 100, 101, 250, 399, 1000])
+def test_positions_cover_axis(length):
+    detector = TiledDetector(lambda: None, tile_size=100, overlap=30, workers=1)
+    positions = detector._positions(length)
+    detector.close()
+
+    assert positions[0] == 0
+    assert positions[-1] == max(0, length - 100)
+    for previous, current in zip(positions, positions[1:]):
+        assert 0 < current - previous <= 100 - 30
+
+
+@pytest.mark.parametrize('tile_size, overlap', [(0, 0), (100, 50), (100, 80), (100, -1)])
+def test_invalid_geometry_rejected(tile_size, overlap):
+    with pytest.raises(ValueError):
+        TiledDetector(lambda: None, tile_size=tile_size, overlap=overlap)
+
+
+def test_seam_duplicates_merged():
+    # Тег 1 на стыке плиток (попадает в обе), тег 2 только в правой плитке
+    tags = [(1, 80, 10, 20, 10.0), (2, 150, 50, 20, 10.0)]
+    positions = [(0, 0), (80, 0)]
+    # Один поток пула обрабатывает плитки в порядке отправки
+    detector = TiledDetector(lambda: _FakeDetector(tags, positions), tile_size=120, overlap=40, workers=1)
+    assert [(x, y) for y in detector._positions(100) for x in detector._positions(200)] == positions
+
+    detections = detector.detect(np.zeros((100, 200), dtype=np.uint8))
+    detector.close()
+
+    assert sorted(tag.tag_id for tag in detections) == [1, 2]
+    seam = next(tag for tag in detections if tag.tag_id == 1)
+    assert seam.margin == 90.0  # Вариант правой плитки с большим запасом
+    np.testing.assert_allclose(seam.center, [90.0, 20.0])
+
+
+def test_same_id_far_apart_kept():
+    tags = [(3, 5, 5, 20, 10.0), (3, 170, 70, 20, 10.0)]
+    detector = TiledDetector(lambda: _FakeDetector(tags, [(0, 0), (80, 0)]), tile_size=120, overlap=40, workers=1)
+
+    detections = detector.detect(np.zeros((100, 200), dtype=np.uint8))
+    detector.close()
+
+    assert len(detections) == 2
+
+
+def test_create_tiled_detector_default_geometry():
+    detector = create_detector(DetectorConfig(mode='tiled'))
+    assert isinstance(detector, TiledDetector)
+    assert detector.tile_size > detector.overlap > 0
+    detector.close()
+
+
+@pytest.mark.parametrize('tile_size, tile_overlap', [(64, 64), (300, 150)])
+def test_create_tiled_detector_rejects_large_overlap(tile_size, tile_overlap):
+    with pytest.raises(ValueError):
+        create_detector(DetectorConfig(mode='tiled', tile_size=tile_size, tile_overlap=tile_overlap))
+
+
+def test_resolve_tiling_fills_missing_values():
+    profile = resolve_tiling(DetectorConfig(mode='tiled'), 10000.0)
+    assert (profile.tile_size, profile.tile_overlap) == (600, 150)
+    profile = resolve_tiling(DetectorConfig(mode='tiled', tile_size=1024), 400.0)
+    assert (profile.tile_size, profile.tile_overlap) == (1024, 30)
+    assert resolve_tiling(DetectorConfig(), 1e9) == DetectorConfig()
+
+
+@pytest.mark.parametrize('params, max_tag_area', [
+    ({'tile_size': 1024, 'tile_overlap': 100}, 10000.0),  # Перекрытие меньше диагонали тега
+    ({'tile_size': 256}, 10000.0),                        # Перекрытие 150 - больше половины плитки
+    ({'tile_size': 512, 'tile_overlap': 256}, 100.0),
+])
+def test_resolve_tiling_rejects_tags_not_fitting_one_tile(params, max_tag_area):
+    with pytest.raises(ValueError):
+        resolve_tiling(DetectorConfig(mode='tiled', **params), max_tag_area)
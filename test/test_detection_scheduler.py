@@ -0,0 +1,111 @@
+# test_detection_scheduler.py
+import threading
+import time
+
+from camera_utils.detection_scheduler import DetectionScheduler
+
+
+def _scheduler(process=lambda indices: indices, **kwargs):
+    return DetectionScheduler(process, workers=1, report_interval=3600, **kwargs)
+
+
+def test_priority_classes_picked_first():
+    scheduler = _scheduler()
+    scheduler.add_camera(0, 'low')
+    scheduler.add_camera(1, 'normal')
+    scheduler.add_camera(2, 'critical')
+    for index in (0, 1, 2):
+        scheduler.submit(index)
+    assert scheduler._pick() == [2]
+    scheduler.cameras[2].pending = False
+    assert scheduler._pick() == [1]
+    scheduler.cameras[1].pending = False
+    assert scheduler._pick() == [0]
+
+
+def test_fair_share_by_virtual_time():
+    scheduler = _scheduler()
+    scheduler.add_camera(0)
+    scheduler.add_camera(1)
+    scheduler.cameras[0].vtime = 2.0
+    scheduler.cameras[1].vtime = 1.0
+    scheduler.submit(1)
+    scheduler.submit(0)
+    assert scheduler._pick() == [1]
+
+
+def test_idle_camera_clamped_to_active_minimum():
+    scheduler = _scheduler()
+    for index in (0, 1, 2):
+        scheduler.add_camera(index)
+    scheduler.cameras[0].vtime = 10.0
+    scheduler.cameras[1].vtime = 12.0
+    scheduler.submit(0)
+    scheduler.submit(1)
+    # Камера 2 простаивала с устаревшим vtime = 0 и не должна получить серию кадров вне очереди
+    scheduler.submit(2)
+    assert scheduler.cameras[2].vtime == 10.0
+    assert scheduler._pick() == [0]
+
+
+def test_readded_camera_starts_at_minimum():
+    scheduler = _scheduler()
+    scheduler.add_camera(0)
+    scheduler.cameras[0].vtime = 5.0
+    scheduler.add_camera(1)
+    assert scheduler.cameras[1].vtime == 5.0
+
+
+def test_batch_groups_pending_cameras():
+    scheduler = _scheduler(max_batch=2)
+    scheduler.add_camera(0, group='a')
+    scheduler.add_camera(1, group='b')
+    scheduler.add_camera(2, group='a')
+    scheduler.add_camera(3, group='a')
+    for index in range(4):
+        scheduler.submit(index)
+    assert scheduler._pick() == [0, 2]
+
+
+def test_pending_frames_shed_while_busy():
+    gate = threading.Event()
+    processed = []
+
+    def process(indices):
+        gate.wait(5)
+        processed.extend(indices)
+        return indices
+
+    scheduler = _scheduler(process)
+    scheduler.add_camera(0, 'critical')
+    scheduler.add_camera(1, 'low')
+    scheduler.start()
+    try:
+        scheduler.submit(0)
+        deadline = time.monotonic() + 2
+        while not scheduler.cameras[0].busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Пока поток занят, новые снимки заменяют необработанные
+        for _ in range(3):
+            scheduler.submit(1)
+            scheduler.submit(0)
+        gate.set()
+        deadline = time.monotonic() + 2
+        while len(processed) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+
+    assert processed == [0, 0, 1]
+    assert scheduler.get_stats(0)['shed_frames'] == 2
+    assert scheduler.get_stats(1)['shed_frames'] == 2
+    assert scheduler.get_stats(0)['achieved_fps'] > 0
+
+
+def test_removed_camera_ignored():
+    scheduler = _scheduler()
+    scheduler.add_camera(0)
+    scheduler.remove_camera(0)
+    scheduler.submit(0)
+    assert scheduler._pick() == []
+    assert scheduler.get_stats(0) is None
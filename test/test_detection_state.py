@@ -0,0 +1,68 @@
+# test_detection_state.py
+import threading
+import time
+
+from camera_utils.detection_state import DetectionStateStore
+
+
+def _publish(store, camera, tags, seq=1):
+    return store.publish(camera, tags, [((0.0, 0.0),) * 4 for _ in tags], time.monotonic(), seq)
+
+
+def test_version_changes_only_with_tag_set():
+    store = DetectionStateStore()
+    assert _publish(store, 0, [1, 2])
+    version = store.version
+    assert not _publish(store, 0, [1, 2], seq=2)
+    assert store.version == version
+    assert store.get(0).seq == 2
+    assert _publish(store, 0, [1], seq=3)
+    assert store.version == version + 1
+
+
+def test_snapshot_is_immutable_and_consistent():
+    store = DetectionStateStore()
+    _publish(store, 0, [1])
+    version, states = store.snapshot()
+    _publish(store, 1, [2])
+    assert list(states) == [0]
+    assert store.snapshot()[0] == version + 1
+    try:
+        states[5] = None
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("снимок состояния должен быть неизменяемым")
+
+
+def test_wait_for_change_times_out_without_change():
+    store = DetectionStateStore()
+    _publish(store, 0, [1])
+    version = store.version
+    started = time.monotonic()
+    assert store.wait_for_change(version, timeout=0.1) == version
+    assert time.monotonic() - started >= 0.09
+
+
+def test_wait_for_change_returns_immediately_for_old_version():
+    store = DetectionStateStore()
+    _publish(store, 0, [1])
+    assert store.wait_for_change(None, timeout=5) == store.version
+
+
+def test_wait_for_change_wakes_on_publish_and_remove():
+    store = DetectionStateStore()
+    _publish(store, 0, [1])
+    for change in (lambda: _publish(store, 0, [2]), lambda: store.remove(0)):
+        version = store.version
+        timer = threading.Timer(0.05, change)
+        timer.start()
+        started = time.monotonic()
+        assert store.wait_for_change(version, timeout=5) == version + 1
+        assert time.monotonic() - started < 2
+        timer.join()
+    assert store.get(0) is None
+    # Удаление неизвестной камеры не меняет версию
+    version = store.version
+    store.remove(0)
+    assert store.version == version
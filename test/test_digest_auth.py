@@ -0,0 +1,68 @@
+# test_digest_auth.py
+import pytest
+
+import camera_utils.digest_auth as digest_auth
+from camera_utils.digest_auth import DigestAuth, parse_challenge
+
+# Пример RFC 7616, раздел 3.9.1
+REALM = 'http-auth@example.org'
+NONCE = '7ypf/xlj9XXwfDPEoM4URrv/xwf94BcCAzFZH4GiTo0v'
+OPAQUE = 'FQhe/qaU925kfnzjCev0ciny7QMkPqMAFRtzCUYo5tdS'
+CNONCE = 'f2/wE4q74E6zIJEtWaHKaf5wv/H5QzzpXusqGemxURZJ'
+URI = '/dir/index.html'
+
+
+class _FixedNonce:
+    def hex(self):
+        return CNONCE
+
+
+@pytest.fixture(autouse=True)
+def fixed_cnonce(monkeypatch):
+    monkeypatch.setattr(digest_auth.os, 'urandom', lambda size: _FixedNonce())
+
+
+def _challenge(algorithm, nonce=NONCE):
+    return (
+        f'Digest realm="{REALM}", qop="auth, auth-int", algorithm={algorithm}, '
+        f'nonce="{nonce}", opaque="{OPAQUE}"'
+    )
+
+
+@pytest.mark.parametrize('algorithm, response', [
+    ('MD5', '8ca523f5e9506fed4657c9700eebdbec'),
+    ('SHA-256', '753927fa0e85d155564e2e272a28d1802ca10daf4496794697cf8db5856cb6c1'),
+])
+def test_rfc7616_example(algorithm, response):
+    auth = DigestAuth('Mufasa', 'Circle of Life')
+    assert auth.update([_challenge(algorithm)])
+    params = parse_challenge(auth.header('GET', URI))
+    assert params['response'] == response
+    assert params['username'] == 'Mufasa'
+    assert params['realm'] == REALM
+    assert params['nonce'] == NONCE
+    assert params['opaque'] == OPAQUE
+    assert params['qop'] == 'auth'
+    assert params['nc'] == '00000001'
+    assert params['cnonce'] == CNONCE
+
+
+def test_nonce_count_increments_and_resets():
+    auth = DigestAuth('Mufasa', 'Circle of Life')
+    assert not auth.ready
+    auth.update([_challenge('MD5')])
+    assert auth.ready
+    assert parse_challenge(auth.header('GET', URI))['nc'] == '00000001'
+    assert parse_challenge(auth.header('GET', URI))['nc'] == '00000002'
+
+    # Новый вызов (например, stale=true) заменяет nonce и сбрасывает счетчик
+    auth.update([_challenge('MD5', nonce='new-nonce') + ', stale=true'])
+    params = parse_challenge(auth.header('GET', URI))
+    assert params['nonce'] == 'new-nonce'
+    assert params['nc'] == '00000001'
+
+
+def test_unsupported_challenges_ignored():
+    auth = DigestAuth('Mufasa', 'Circle of Life')
+    assert not auth.update(['Basic realm="cam"', _challenge('SHA-512-256')])
+    assert not auth.ready
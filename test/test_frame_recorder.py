@@ -0,0 +1,82 @@
+# test_frame_recorder.py
+from camera_utils.frame_recorder import (
+    FrameRecorder, read_recording, is_recording, HEADER_SIZE, RECORD
+)
+
+# Кольцо на 4 КБ данных: несколько десятков снимков вызывают перенос
+RING_SIZE_MB = (4096 + HEADER_SIZE) / (1024 * 1024)
+
+
+def _frame(seq, size=100):
+    return bytes([seq % 256]) * size
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'ring.bin')
+    recorder = FrameRecorder(path, size_mb=1)
+    frames = [(b'\xff\xd8' + _frame(i, 10 + i) + b'\xff\xd9', 1000.0 + i) for i in range(5)]
+    for data, timestamp in frames:
+        assert recorder.append(data, timestamp)
+    recorder.close()
+
+    assert is_recording(path)
+    records = [(seq, timestamp, bytes(data)) for seq, timestamp, data in read_recording(path)]
+    assert records == [(i, timestamp, data) for i, (data, timestamp) in enumerate(frames)]
+
+
+def test_wrap_evicts_oldest(tmp_path):
+    path = str(tmp_path / 'ring.bin')
+    recorder = FrameRecorder(path, size_mb=RING_SIZE_MB)
+    assert recorder.capacity == 4096
+    total = 100  # 100 * (24 + 100) байт - кольцо заполняется трижды
+    for seq in range(total):
+        assert recorder.append(_frame(seq), float(seq))
+    recorder.close()
+
+    records = list(read_recording(path))
+    seqs = [seq for seq, _, _ in records]
+    assert seqs[-1] == total - 1
+    assert seqs == list(range(seqs[0], total))
+    assert 0 < seqs[0]
+    assert len(records) * (RECORD.size + 100) <= 4096
+    for seq, timestamp, data in records:
+        assert timestamp == float(seq)
+        assert bytes(data) == _frame(seq)
+
+
+def test_variable_sizes_across_wrap(tmp_path):
+    path = str(tmp_path / 'ring.bin')
+    recorder = FrameRecorder(path, size_mb=RING_SIZE_MB)
+    sizes = [50 + (seq * 37) % 700 for seq in range(60)]
+    for seq, size in enumerate(sizes):
+        assert recorder.append(_frame(seq, size), float(seq))
+    recorder.close()
+
+    records = list(read_recording(path))
+    assert [seq for seq, _, _ in records] == list(range(records[0][0], len(sizes)))
+    for seq, _, data in records:
+        assert bytes(data) == _frame(seq, sizes[seq])
+
+
+def test_oversized_frame_rejected(tmp_path):
+    recorder = FrameRecorder(str(tmp_path / 'ring.bin'), size_mb=RING_SIZE_MB)
+    assert not recorder.append(b'\0' * 4096, 0.0)
+    recorder.close()
+
+
+def test_reopen_continues_ring(tmp_path):
+    path = str(tmp_path / 'ring.bin')
+    recorder = FrameRecorder(path, size_mb=RING_SIZE_MB)
+    for seq in range(40):
+        recorder.append(_frame(seq), float(seq))
+    recorder.close()
+
+    recorder = FrameRecorder(path, size_mb=RING_SIZE_MB)
+    assert recorder.next_seq == 40
+    for seq in range(40, 50):
+        recorder.append(_frame(seq), float(seq))
+    recorder.close()
+
+    records = list(read_recording(path))
+    assert [seq for seq, _, _ in records] == list(range(records[0][0], 50))
+    assert bytes(records[-1][2]) == _frame(49)
@@ -0,0 +1,51 @@
+# test_modbus_encoding.py
+from types import SimpleNamespace
+
+import pytest
+
+from config_loader import ModbusConfig
+from network.modbus_handler import ModbusHandler
+
+
+def _tags(*tag_ids):
+    return [SimpleNamespace(tag_id=tag_id) for tag_id in tag_ids]
+
+
+@pytest.fixture
+def handler():
+    handler = ModbusHandler()
+    yield handler
+    handler.loop.close()
+
+
+def test_bitmask(handler):
+    cfg = ModbusConfig('127.0.0.1', 100)
+    assert handler._encode_tags(_tags(1, 16), cfg) == [0x8001]
+    assert handler._encode_tags(_tags(3, 3), cfg) == [0b100]
+    assert handler._encode_tags([], cfg) == [0]
+
+
+def test_bitmask_out_of_range_skipped(handler):
+    cfg = ModbusConfig('127.0.0.1', 100)
+    assert handler._encode_tags(_tags(0, 2, 17), cfg) == [0b10]
+
+
+def test_bitset_across_registers(handler):
+    cfg = ModbusConfig('127.0.0.1', 100, encoding='bitset', register_count=3)
+    assert handler._encode_tags(_tags(0, 15, 16, 47), cfg) == [0x8001, 0x0001, 0x8000]
+
+
+def test_bitset_out_of_range_skipped(handler):
+    cfg = ModbusConfig('127.0.0.1', 100, encoding='bitset', register_count=2)
+    assert handler._encode_tags(_tags(5, 32, 100), cfg) == [1 << 5, 0]
+
+
+def test_list(handler):
+    cfg = ModbusConfig('127.0.0.1', 100, encoding='list', register_count=5)
+    assert handler._encode_tags(_tags(42, 7, 300, 7), cfg) == [3, 7, 42, 300, 0]
+    assert handler._encode_tags([], cfg) == [0, 0, 0, 0, 0]
+
+
+def test_list_overflow_truncated(handler):
+    cfg = ModbusConfig('127.0.0.1', 100, encoding='list', register_count=3)
+    assert handler._encode_tags(_tags(9, 4, 1, 6), cfg) == [2, 1, 4]
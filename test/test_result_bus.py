@@ -0,0 +1,128 @@
+# test_result_bus.py
+import threading
+import time
+
+import pytest
+
+from camera_utils.detection_state import CameraDetection
+from camera_utils.result_bus import ResultBus, Subscription, DetectionEvent
+
+
+class _BlockingSink:
+    """Приемник, который держит первое событие до release(), остальные принимает сразу."""
+
+    def __init__(self, fail=False):
+        self.events = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.fail = fail
+        self.closed = False
+
+    def handle(self, event):
+        self.started.set()
+        self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError('сбой приемника')
+        self.events.append(event)
+
+    def close(self):
+        self.closed = True
+
+
+def _event(camera, seq, changed=True):
+    return DetectionEvent(camera, f'cam{camera}', CameraDetection((), (), 0.0, seq), changed, time.time())
+
+
+def _blocked(policy, queue_size, changes_only=False):
+    """Подписка, поток доставки которой занят первым событием (seq 0 камеры 99)."""
+    sink = _BlockingSink()
+    subscription = Subscription(sink, 'test', queue_size=queue_size, policy=policy, changes_only=changes_only)
+    subscription.offer(_event(99, 0))
+    assert sink.started.wait(2)
+    return sink, subscription
+
+
+def _drain(sink, subscription, count):
+    sink.gate.set()
+    deadline = time.monotonic() + 2
+    while len(sink.events) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    subscription.close()
+    return [(event.camera_index, event.detection.seq) for event in sink.events[1:]]
+
+
+def test_drop_oldest():
+    sink, subscription = _blocked('drop_oldest', 3)
+    for seq in range(1, 6):
+        subscription.offer(_event(0, seq))
+    stats = subscription.get_stats()
+    assert (stats['queued'], stats['dropped']) == (3, 2)
+    assert _drain(sink, subscription, 4) == [(0, 3), (0, 4), (0, 5)]
+
+
+def test_drop_newest():
+    sink, subscription = _blocked('drop_newest', 3)
+    for seq in range(1, 6):
+        subscription.offer(_event(0, seq))
+    assert subscription.get_stats()['dropped'] == 2
+    assert _drain(sink, subscription, 4) == [(0, 1), (0, 2), (0, 3)]
+
+
+def test_latest_replaces_per_camera():
+    sink, subscription = _blocked('latest', 8)
+    for seq in range(1, 4):
+        subscription.offer(_event(0, seq))
+        subscription.offer(_event(1, seq))
+    stats = subscription.get_stats()
+    assert (stats['queued'], stats['replaced'], stats['dropped']) == (2, 4, 0)
+    assert sorted(_drain(sink, subscription, 3)) == [(0, 3), (1, 3)]
+
+
+def test_latest_bounded_by_queue_size():
+    sink, subscription = _blocked('latest', 2)
+    for camera in range(4):
+        subscription.offer(_event(camera, 1))
+    stats = subscription.get_stats()
+    assert (stats['queued'], stats['dropped'], stats['replaced']) == (2, 2, 0)
+    assert _drain(sink, subscription, 3) == [(2, 1), (3, 1)]
+
+
+def test_changes_only_filters_unchanged():
+    sink, subscription = _blocked('drop_oldest', 8, changes_only=True)
+    subscription.offer(_event(0, 1, changed=False))
+    subscription.offer(_event(0, 2, changed=True))
+    assert _drain(sink, subscription, 2) == [(0, 2)]
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        Subscription(_BlockingSink(), 'test', policy='drop_all')
+
+
+def test_sink_errors_do_not_stop_delivery():
+    sink = _BlockingSink(fail=True)
+    sink.gate.set()
+    subscription = Subscription(sink, 'test')
+    for seq in range(3):
+        subscription.offer(_event(0, seq))
+    deadline = time.monotonic() + 2
+    while subscription.get_stats()['errors'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert subscription.get_stats()['errors'] == 3
+    subscription.close()
+
+
+def test_bus_publishes_to_all_and_closes():
+    bus = ResultBus()
+    sinks = [_BlockingSink(), _BlockingSink()]
+    for sink in sinks:
+        sink.gate.set()
+        bus.subscribe(sink, queue_size=4)
+    bus.publish(0, 'cam0', CameraDetection((1,), (), 0.0, 7), True)
+    deadline = time.monotonic() + 2
+    while any(not sink.events for sink in sinks) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    bus.close()
+    assert [sink.events[0].detection.tags for sink in sinks] == [(1,), (1,)]
+    assert all(sink.closed for sink in sinks)
+    assert bus.get_stats() == {}
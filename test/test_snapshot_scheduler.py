@@ -0,0 +1,57 @@
+# test_snapshot_scheduler.py
+import pytest
+
+from camera_utils.snapshot_scheduler import SnapshotScheduler
+
+
+def test_phases_spread_evenly():
+    scheduler = SnapshotScheduler()
+    for index in (3, 0, 1, 2):
+        scheduler.register(index)
+    assert [scheduler.phase(index) for index in range(4)] == [0.0, 0.25, 0.5, 0.75]
+
+
+def test_phases_recomputed_on_unregister():
+    scheduler = SnapshotScheduler()
+    for index in range(4):
+        scheduler.register(index)
+    scheduler.unregister(1)
+    scheduler.unregister(1)
+    assert [scheduler.phase(index) for index in (0, 2, 3)] == pytest.approx([0.0, 1 / 3, 2 / 3])
+    assert scheduler.phase(1) == 0.0
+
+
+def test_register_is_idempotent():
+    scheduler = SnapshotScheduler()
+    scheduler.register(0)
+    scheduler.register(1)
+    scheduler.register(0)
+    assert scheduler.cameras == [0, 1]
+    assert scheduler.phase(1) == 0.5
+
+
+def test_next_slot_follows_phase_grid():
+    scheduler = SnapshotScheduler()
+    scheduler.register(0)
+    scheduler.register(1)
+    t0 = scheduler.t0
+    # Камера 1 сдвинута на половину периода 1.0 с
+    assert scheduler.next_slot(0, 1.0, now=t0 + 0.1) == pytest.approx(t0 + 1.0)
+    assert scheduler.next_slot(1, 1.0, now=t0 + 0.1) == pytest.approx(t0 + 0.5)
+    assert scheduler.next_slot(1, 1.0, now=t0 + 0.5) == pytest.approx(t0 + 1.5)
+    # Пропущенные слоты не догоняются: следующий слот после now
+    assert scheduler.next_slot(0, 1.0, now=t0 + 7.3) == pytest.approx(t0 + 8.0)
+
+
+def test_next_slot_is_drift_free():
+    scheduler = SnapshotScheduler()
+    scheduler.register(0)
+    now = scheduler.t0
+    for _ in range(1000):
+        now = scheduler.next_slot(0, 0.25, now=now + 0.01)
+    assert now == pytest.approx(scheduler.t0 + 250.0)
+
+
+def test_zero_interval_returns_now():
+    scheduler = SnapshotScheduler()
+    assert scheduler.next_slot(0, 0.0, now=5.0) == 5.0